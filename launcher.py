@@ -42,7 +42,7 @@ class DependencyChecker:
             ("PIL", "pillow"),
             ("pyrtools", "pyrtools"),
             ("pandas", "pandas"),
-            ("fpdf", "fpdf")
+            ("fpdf", "fpdf2")
         ]
         
         # Dependencia opcional (actualmente ninguna)
@@ -229,7 +229,7 @@ def main():
             ("PIL", "pillow"),
             ("pyrtools", "pyrtools"),
             ("pandas", "pandas"),
-            ("fpdf", "fpdf")
+            ("fpdf", "fpdf2")
         ]
         
         missing = []
@@ -5,14 +5,14 @@ import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import threading
 import queue
 import time
 import datetime
+import threading
 import os
 import csv
+import json
 from collections import deque
-import scipy.signal as signal
 from PIL import Image, ImageTk
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import multiprocessing
@@ -31,68 +31,149 @@ except ImportError:
     print("O ejecuta: python launcher.py para instalación automática ")
     sys.exit(1)
 
-from skimage import img_as_float, img_as_ubyte
-import copy
+from src.magnify import create_engine, MAGNIFICATION_ENGINES, PYRAMID_BACKENDS, PRECISIONS
+from src.temporal_filter import TEMPORAL_FILTERS
+from src.utils import load_config, PerformanceMonitor
+from src.pipeline import Pipeline
+from src.frame_pool import FramePool
+from src.preview import PreviewRenderer
+from src.profiling import StageProfiler
+from src.sources import open_source, parse_rate, RawFrameRecorder, RAW_FRAMES_EXTENSION
+from src.capture_modes import parse_capture_mode, FAST_MODE
+from src.spectrum import HighpassWeights
+from src.roi_channels import RoiChannel, roi_grays
+from src.sparse_flow import SparseTracker, DEFAULT_PARAMS as SPARSE_FLOW_DEFAULTS
+from src.live_plot import BlitLivePlot, ClassicLivePlot
+from src.optimizer import grid_search_alpha_lambda
+from src.recorder import (BinaryRecorder, RECORDING_EXTENSION, COLUMNS as RECORDING_COLUMNS,
+                          CALIBRATED_COLUMNS)
 
 class MotionMagnificationGUI:
-    def optimize_alpha_lambda(self, frame, roi, alpha_range=None, lambda_range=None, metric='energy'):
+    def optimize_alpha_lambda(self, frame, roi, alpha_range=None, lambda_range=None, metric='energy',
+                              on_result=None):
         """
         Busca los mejores valores de alpha y lambda_c para maximizar la energía de movimiento en la ROI.
+        Con el monitoreo en marcha pide al canal en optimización (o el mostrado) un clip de los
+        próximos optimizer_clip_frames frames: el hilo de cálculo copia el motor justo antes del
+        primer frame del clip y la rejilla se evalúa sobre esa copia y ese clip. El motor en vivo
+        y las variables Tk no se modifican (se llama desde otro hilo; bloquea hasta tener el clip).
         Args:
-            frame: Frame de entrada (BGR)
+            frame: Frame de entrada (BGR), usado como clip de un frame sin monitoreo en marcha
             roi: (x, y, w, h)
             alpha_range: lista o np.arange de valores alpha
             lambda_range: lista o np.arange de valores lambda_c
             metric: 'energy' (por defecto)
+            on_result: función opcional (dict) llamada por cada par evaluado
         Returns:
             dict con 'best_alpha', 'best_lambda', 'best_metric', 'results' (lista de dicts)
         """
-        import numpy as np
-        if alpha_range is None:
-            alpha_range = np.linspace(50, 300, 6)  # Ejemplo: [50, 100, ..., 300]
-        if lambda_range is None:
-            lambda_range = np.linspace(20, 120, 6)
-        x, y, w, h = roi
-        roi_img = frame[y:y+h, x:x+w]
-        gray = cv2.cvtColor(roi_img, cv2.COLOR_BGR2GRAY)
-        best_metric = -np.inf
-        best_alpha = None
-        best_lambda = None
-        results = []
-        for alpha in alpha_range:
-            for lambd in lambda_range:
-                self.alpha.set(alpha)
-                self.lambda_c.set(lambd)
-                if self.magnify_engine:
-                    magnified = self.magnify_engine.Magnify(gray)
-                else:
-                    magnified = gray
-                # Métrica: energía total del movimiento (varianza de la diferencia)
-                diff = cv2.absdiff(magnified, gray)
-                energy = np.var(diff)
-                results.append({'alpha': alpha, 'lambda': lambd, 'energy': energy})
-                if energy > best_metric:
-                    best_metric = energy
-                    best_alpha = alpha
-                    best_lambda = lambd
-        # Restaurar valores óptimos
-        self.alpha.set(best_alpha)
-        self.lambda_c.set(best_lambda)
-        self.log_message(f"Optimización alpha/lambda: alpha={best_alpha}, lambda={best_lambda}, energía={best_metric:.2f}")
-        return {'best_alpha': best_alpha, 'best_lambda': best_lambda, 'best_metric': best_metric, 'results': results}
+        if metric != 'energy':
+            raise ValueError(f"Métrica no soportada: {metric}")
+        channel = self.optimization_channel or self.active_channel
+        if channel is None or channel.engine is None:
+            raise RuntimeError("No hay motor de magnificación (selecciona una ROI)")
+        if self.is_running:
+            capture = channel.request_clip()
+            while not capture.done.wait(0.2):
+                if not self.is_running or channel not in self.channels:
+                    raise RuntimeError("Monitoreo detenido antes de completar el clip de optimización")
+            engine, clip = capture.engine, capture.frames
+        else:
+            # Sin pipeline no hay Magnify concurrente: grid_search_alpha_lambda clona el motor
+            x, y, w, h = roi
+            engine = channel.engine
+            clip = [cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY)]
+        return grid_search_alpha_lambda(engine, clip, alpha_range, lambda_range,
+                                        max_workers=self.max_workers, on_result=on_result)
+    
+    def optimization_worker(self, frame, roi):
+        """Hilo de fondo de la optimización alpha/lambda; publica resultados en optimization_queue"""
+        try:
+            result = self.optimize_alpha_lambda(
+                frame, roi, on_result=lambda entry: self.optimization_queue.put(('par', entry)))
+            self.optimization_queue.put(('fin', result))
+        except Exception as e:
+            self.optimization_queue.put(('error', e))
+    
+    def poll_optimization(self):
+        """Recoge los resultados de la optimización en el hilo de Tk"""
+        try:
+            while True:
+                message = self.optimization_queue.get_nowait()
+                if message[0] == 'par':
+                    entry = message[1]
+                    self.log_message(f"  alpha={entry['alpha']:.0f}, lambda={entry['lambda']:.0f}: "
+                                     f"energía={entry['energy']:.2f}")
+                    continue
+                self.optimization_thread = None
+                channel, self.optimization_channel = self.optimization_channel, None
+                if message[0] == 'error':
+                    self.log_message(f"Error en optimización alpha/lambda: {message[1]}")
+                    messagebox.showerror("Error", f"Error en optimización: {message[1]}")
+                    return
+                result = message[1]
+                # Aplicar valores óptimos al motor en vivo (sin reiniciar su filtro temporal)
+                if channel is not None and channel in self.channels:
+                    channel.engine.set_params(alpha=result['best_alpha'], lambda_c=result['best_lambda'])
+                self.alpha.set(result['best_alpha'])
+                self.lambda_c.set(result['best_lambda'])
+                self.log_message(f"Optimización alpha/lambda ({channel.name if channel else '-'}): alpha={result['best_alpha']}, "
+                                 f"lambda={result['best_lambda']}, energía={result['best_metric']:.2f}")
+                messagebox.showinfo("Optimización completa", f"Alpha óptimo: {result['best_alpha']}\n"
+                                    f"Lambda óptimo: {result['best_lambda']}\nEnergía: {result['best_metric']:.2f}")
+                return
+        except queue.Empty:
+            pass
+        if self.root.winfo_exists():
+            self.root.after(100, self.poll_optimization)
     def get_effective_fps(self):
         """Devuelve el FPS efectivo considerando el salto de frames."""
         skip = max(1, self.skip_frames.get())
         return self.fps.get() / skip
+    
+    @property
+    def active_channel(self):
+        """Canal mostrado en las gráficas (None si no hay ROI)"""
+        channels = self.channels
+        if not channels:
+            return None
+        return channels[min(self.display_channel, len(channels) - 1)]
+    
+    @property
+    def roi(self):
+        channel = self.active_channel
+        return channel.roi if channel else None
+    
+    @property
+    def magnify_engine(self):
+        channel = self.active_channel
+        return channel.engine if channel else None
+    
+    @property
+    def signal_buffer(self):
+        return (self.active_channel or self._idle_channel).signal_buffer
+    
+    @property
+    def spectrum(self):
+        return (self.active_channel or self._idle_channel).spectrum
+    
+    @property
+    def roi_mean_buffer(self):
+        return (self.active_channel or self._idle_channel).roi_mean_buffer
+    
     def on_closing(self):
         """Maneja el evento de cierre de la ventana principal."""
         import sys
         try:
             self.is_running = False
+            if getattr(self, 'pipeline', None) is not None:
+                self.pipeline.stop(timeout=2.0)
             if hasattr(self, 'camera') and self.camera:
                 self.camera.release()
-            if hasattr(self, 'csv_file') and self.csv_file:
-                self.csv_file.close()
+            for channel in getattr(self, 'channels', []):
+                channel.close_recording()
+            if getattr(self, 'raw_recorder', None):
+                self.raw_recorder.close()
             cv2.destroyAllWindows()
         except Exception as e:
             self.log_message(f"Error al cerrar la aplicación: {str(e)}")
@@ -108,11 +189,25 @@ class MotionMagnificationGUI:
         # Agregar manejo de cierre de ventana
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
+        # Configuración (config.json mezclado con los valores por defecto)
+        self.config = load_config()
+        
         # Variables de control
         self.camera = None
         self.is_running = False
         self.selected_camera = tk.IntVar(value=0)
+        # Fuente alternativa a la cámara (video, imágenes, 'synthetic', .rawframes); vacía = cámara
+        defaults = self.config['default_settings']
+        self.frame_source = tk.StringVar(value=defaults.get('frame_source', ''))
+        source_rate = defaults.get('source_rate')
+        self.source_rate = tk.StringVar(value='nativa' if source_rate is None else str(source_rate))
+        self.source_loop = tk.BooleanVar(value=defaults.get('source_loop', True))
+        # Modo de captura de la cámara ('' = por defecto, 'rapido' o AxH@FPS:FOURCC) y ventana ROI del sensor
+        self.capture_mode = tk.StringVar(value=defaults.get('capture_mode', ''))
+        self.capture_roi_window = tk.BooleanVar(value=defaults.get('capture_roi_window', False))
+        self.capture_roi_padding = defaults.get('capture_roi_padding', 32)
         self.fps = tk.DoubleVar(value=30.0)
+        self.user_fps = None  # FPS del usuario mientras la fuente impone su frecuencia nominal
         self.alpha = tk.DoubleVar(value=200.0)
         self.lambda_c = tk.DoubleVar(value=80.0)
         self.fl = tk.DoubleVar(value=0.5)
@@ -136,21 +231,35 @@ class MotionMagnificationGUI:
         # Queue para comunicación entre threads
         self.message_queue = queue.Queue()
         self.data_queue = queue.Queue()
-        self.video_queue = queue.Queue()
         
-        # Buffer para datos
-        self.signal_buffer = deque(maxlen=300)
+        # Canales de análisis, uno por ROI: motor, buffer de señal, espectro incremental,
+        # clip del optimizador y archivos de grabación propios (ver src/roi_channels.py)
+        self.channels = []
+        self.max_rois = self.config['processing_settings'].get('max_rois', 8)
+        self.signal_buffer_size = 300
+        self.optimizer_clip_frames = self.config['processing_settings'].get('optimizer_clip_frames', 30)
+        # Canal mostrado en las gráficas y destino de la optimización, el auto-ajuste y los
+        # parámetros en caliente; sin ROI las gráficas leen los buffers vacíos de _idle_channel
+        self.display_channel = 0
+        self._idle_channel = RoiChannel('', (0, 0, 0, 0), None, self.signal_buffer_size, 1)
+        self.optimization_thread = None
+        self.optimization_queue = None
+        self.optimization_channel = None
+        self.auto_tune_thread = None
+        self.auto_tune_queue = None
+        self.auto_tune_channel = None
+        self.fft_highpass = HighpassWeights()
         self.frame_count = 0
         
-        # Variables para grabación CSV
+        # Variables para grabación (CSV o binaria por bloques, un archivo por canal)
         self.is_recording = False
-        self.csv_file = None
-        self.csv_writer = None
+        # Frames crudos de la fuente (antes del overlay), reproducibles como fuente .rawframes
+        self.record_raw_frames = tk.BooleanVar(value=False)
+        self.raw_recorder = None
         self.recording_filename = ""
-        
-        # Variables para ROI
-        self.roi = None
-        self.magnify_engine = None
+        self.recording_base = ""
+        self.recording_extension = ".csv"
+        self.recording_files = 0  # Archivos de canal abiertos en la grabación actual
         
         
         # --- Variables para filtrado de ruido en video ---
@@ -167,8 +276,9 @@ class MotionMagnificationGUI:
         # Buffer de frames para suavizado temporal
         self.frame_buffer = deque(maxlen=5)
         
-        # Variables para video display
-        self.current_frame = None
+        # Último frame crudo capturado (PooledFrame compartido, ver current_frame_copy)
+        self._current_frame = None
+        self._current_frame_lock = threading.Lock()
         
         # --- Variables para optimización y procesamiento paralelo ---
         # ThreadPoolExecutor para procesamiento paralelo
@@ -179,19 +289,64 @@ class MotionMagnificationGUI:
         self.pyramid_cache = {}
         self.flow_cache = {}
         
-        # Buffer de frames para procesamiento asíncrono
-        self.frame_processing_queue = queue.Queue(maxsize=10)
-        self.processed_frame_queue = queue.Queue(maxsize=5)
+        # Pipeline captura -> cálculo -> salida (buffers acotados drop-oldest)
+        self.pipeline = None
+        self.source_opening = False  # Hilo de apertura de la fuente en curso (start_monitoring)
+        self.pipeline_capacity = 4
+        self.pipeline_report_interval = 300  # Frames entre resúmenes de latencia en consola
+        # Buffers de frame reciclados entre captura, pipeline, optimizador y visualización.
+        # Por defecto cubre los frames en vuelo: buffers del pipeline + etapas + vista previa
+        self.frame_pool = None
+        self.frame_pool_size = (self.config['processing_settings'].get('frame_pool_size')
+                                or 3 * self.pipeline_capacity + 10)
         
         # Control de rendimiento
         self.processing_times = deque(maxlen=10)  # Para monitoreo de rendimiento
+        # Tiempos por etapa (captura, conversión, pirámide, filtro, ...) con p50/p95/p99
+        self.profiler = StageProfiler(self.config['processing_settings'].get('profiling_window', 1000))
+        self.performance_monitor = PerformanceMonitor()
+        # Vista previa: reducción y overlays del último frame en un hilo propio, al ritmo de la
+        # pantalla y solo con la pestaña de video visible (ver src/preview.py)
+        preview_fps = self.config['gui_settings'].get('preview_fps', 20)
+        self.preview = PreviewRenderer(draw=self.draw_overlay, max_fps=preview_fps, profiler=self.profiler,
+                                       on_error=lambda e: self.log_message(f"Error actualizando video: {str(e)}"))
+        self.preview_interval = max(10, int(1000 / preview_fps))
+        self._preview_photo = None
+        self._last_sink_time = None
         self.adaptive_quality = False  # Desactivado para evitar salto automático de frames
         
         # Flags de optimización
         self.use_parallel_processing = tk.BooleanVar(value=True)
         
-        # Método de vibración: 'brillo' o 'flujo'
+        # Backend de pirámide para Magnify ('pyrtools' u 'opencv'), leído de config.json
+        self.pyramid_backend = tk.StringVar(
+            value=self.config['processing_settings'].get('pyramid_backend', 'pyrtools'))
+        # Motor de magnificación ('lineal' o 'riesz', por fase)
+        self.magnification_engine = tk.StringVar(
+            value=self.config['processing_settings'].get('magnification_engine', 'lineal'))
+        # Precisión del motor ('float64' o 'float32')
+        self.precision = tk.StringVar(
+            value=self.config['processing_settings'].get('precision', 'float64'))
+        # Filtro temporal ('primer_orden' o banco apilado de orden configurable) y su orden
+        self.temporal_filter = tk.StringVar(
+            value=self.config['processing_settings'].get('temporal_filter', 'primer_orden'))
+        self.temporal_filter_order = tk.IntVar(
+            value=self.config['processing_settings'].get('temporal_filter_order', 2))
+        self.temporal_filter_taps = self.config['processing_settings'].get('temporal_filter_taps', 31)
+        # Formato de grabación: 'csv' (fila a fila) o 'binario' (bloques .npy con fsync periódico)
+        self.recording_format = tk.StringVar(
+            value=self.config['file_settings'].get('recording_format', 'csv'))
+        # Gráficas: blitting (modo rápido) o redibujado completo, e intervalo de refresco
+        self.fast_plotting = tk.BooleanVar(
+            value=self.config['gui_settings'].get('fast_plotting', True))
+        self.graph_update_interval = self.config['gui_settings'].get('graph_update_interval', 100)
+        
+        # Método de vibración: 'brillo', 'flujo' (Farneback denso) o 'flujo_sparse' (Lucas-Kanade)
         self.vibration_method = tk.StringVar(value='brillo')
+        # 'flujo_sparse': eje del desplazamiento con signo usado como señal
+        self.sparse_axis = tk.StringVar(value=self.config['default_settings'].get('sparse_flow_axis', 'y'))
+        self.sparse_flow_params = self.config['processing_settings'].get('sparse_flow_params',
+                                                                         SPARSE_FLOW_DEFAULTS)
         self.setup_ui()
         self.update_console()
         # Iniciar actualización de video con delay
@@ -240,37 +395,157 @@ class MotionMagnificationGUI:
         notebook.add(report_tab, text="Reporte Estadístico")
         self.setup_report_tab(report_tab)
 
+        # --- Pestaña 4: Rendimiento por etapa ---
+        performance_tab = ttk.Frame(notebook)
+        notebook.add(performance_tab, text="Rendimiento")
+        self.setup_performance_tab(performance_tab)
+
     def setup_report_tab(self, parent):
         """Configura la pestaña de generación de reportes PDF estadísticos."""
         label = ttk.Label(parent, text="Generar reporte PDF estadístico de archivos CSV de señal.", font=("Arial", 12))
         label.pack(pady=20)
 
-        btn = ttk.Button(parent, text="Seleccionar archivos CSV y generar reporte", command=self.handle_generate_report)
-        btn.pack(pady=10)
+        self.report_button = ttk.Button(parent, text="Seleccionar archivos CSV y generar reporte", command=self.handle_generate_report)
+        self.report_button.pack(pady=10)
+        self.report_thread = None
+        self.report_queue = None
 
         self.report_status = ttk.Label(parent, text="", foreground="blue")
         self.report_status.pack(pady=10)
 
+    def setup_performance_tab(self, parent):
+        """Configura la pestaña de tiempos por etapa (p50/p95/p99 de la ventana reciente)."""
+        ttk.Label(parent, text=f"Tiempos por etapa (últimas {self.profiler.capacity} muestras de cada una)",
+                  font=("Arial", 12)).pack(pady=(10, 5))
+        self.performance_summary = ttk.Label(parent, text="Sin datos: inicia el monitoreo", foreground="blue")
+        self.performance_summary.pack(pady=5)
+
+        columns = ('muestras', 'media', 'p50', 'p95', 'p99', 'max', 'ultima')
+        headings = ('Muestras', 'Media (ms)', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Máx (ms)', 'Última (ms)')
+        self.performance_tree = ttk.Treeview(parent, columns=columns, height=12)
+        self.performance_tree.heading('#0', text='Etapa')
+        self.performance_tree.column('#0', width=180)
+        for column, heading in zip(columns, headings):
+            self.performance_tree.heading(column, text=heading)
+            self.performance_tree.column(column, width=100, anchor='e')
+        self.performance_tree.pack(fill='x', padx=10, pady=5)
+
+        button_row = ttk.Frame(parent)
+        button_row.pack(pady=5)
+        ttk.Button(button_row, text="Exportar JSON", command=self.export_performance_snapshot).pack(side='left', padx=5)
+        ttk.Button(button_row, text="Reiniciar", command=self.profiler.reset).pack(side='left', padx=5)
+        self.root.after(1000, self.update_performance_tab)
+
+    def performance_snapshot(self):
+        """Instantánea JSON de tiempos por etapa, pipeline y configuración del motor"""
+        extra = {'performance': self.performance_monitor.get_performance_stats(),
+                 'settings': {'target_fps': self.fps.get(), 'pyramid_backend': self.pyramid_backend.get(),
+                              'engine': self.magnification_engine.get(),
+                              'precision': self.precision.get(),
+                              'temporal_filter': self.temporal_filter.get(),
+                              'temporal_filter_order': self.temporal_filter_order.get(), 'rois': [list(c.roi) for c in self.channels],
+                              'parallel': self.use_parallel_processing.get(), 'workers': self.max_workers}}
+        if self.pipeline is not None:
+            extra['pipeline'] = self.pipeline.stats()
+        if self.frame_pool is not None:
+            extra['frame_pool'] = self.frame_pool.stats()
+        extra['preview'] = {'rendered': self.preview.rendered, 'skipped': self.preview.skipped,
+                            'active': self.preview.active}
+        return self.profiler.snapshot(extra)
+
+    def update_performance_tab(self):
+        """Refresca la tabla de tiempos una vez por segundo"""
+        if not self.root.winfo_exists():
+            return
+        summary = self.profiler.summary()
+        for name, stats in summary.items():
+            values = (stats['count'],) + tuple(f"{stats[key]:.2f}" for key in
+                                               ('mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'last_ms'))
+            if self.performance_tree.exists(name):
+                self.performance_tree.item(name, values=values)
+            else:
+                self.performance_tree.insert('', 'end', iid=name, text=name, values=values)
+        if self.pipeline is not None:
+            stats = self.pipeline.stats()
+            perf = self.performance_monitor.get_performance_stats()
+            self.performance_summary.config(
+                text=f"Salida: {perf['avg_fps']:.1f} FPS | Extremo a extremo p95: "
+                     f"{stats['end_to_end']['p95_ms']:.1f} ms | Descartados: {sum(stats['dropped'].values())} "
+                     f"| Buffers de frame: {self.frame_pool.allocated}")
+        self.root.after(1000, self.update_performance_tab)
+
+    def export_performance_snapshot(self):
+        path = filedialog.asksaveasfilename(
+            title='Guardar instantánea de rendimiento', defaultextension='.json',
+            initialfile=f"rendimiento_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            filetypes=[('JSON', '*.json')])
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.performance_snapshot(), f, indent=2, ensure_ascii=False)
+            self.log_message(f"Instantánea de rendimiento guardada: {path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo guardar la instantánea: {e}")
+
     def handle_generate_report(self):
+        if self.report_thread is not None and self.report_thread.is_alive():
+            messagebox.showinfo("Reporte", "Ya hay una generación de reportes en curso")
+            return
         file_paths = filedialog.askopenfilenames(
             title='Selecciona uno o más archivos CSV',
             filetypes=[('Archivos CSV', '*.csv')]
         )
         if not file_paths:
             return
-        self.report_status.config(text="Generando reportes, por favor espera...")
-        self.root.update_idletasks()
+        self.report_status.config(text=f"Generando reportes (0/{len(file_paths)}), por favor espera...",
+                                  foreground="blue")
+        self.report_button.config(state='disabled')
+        # Generación en segundo plano (pool de procesos); el progreso vuelve por cola
+        self.report_queue = queue.Queue()
+        self.report_thread = threading.Thread(target=self.report_worker, args=(file_paths,), daemon=True)
+        self.report_thread.start()
+        self.root.after(100, self.poll_report_progress)
+    
+    def report_worker(self, file_paths):
+        """Hilo de fondo: genera los reportes y publica progreso y resultado en report_queue"""
+        def on_progress(done, total, path, pdf_path, error):
+            self.report_queue.put(('progreso', done, total, path, error))
         try:
-            pdfs = generar_reportes_para_archivos(file_paths)
-            if pdfs:
-                msg = "Reportes generados:\n" + "\n".join(pdfs)
-                self.report_status.config(text=msg, foreground="green")
-                messagebox.showinfo("Listo", msg)
-            else:
-                self.report_status.config(text="No se generaron reportes.", foreground="orange")
+            pdfs = generar_reportes_para_archivos(file_paths, progress_callback=on_progress)
+            self.report_queue.put(('fin', pdfs))
         except Exception as e:
-            self.report_status.config(text=f"Error: {e}", foreground="red")
-            messagebox.showerror("Error", f"Error generando reportes: {e}")
+            self.report_queue.put(('error', e))
+    
+    def poll_report_progress(self):
+        """Actualiza la pestaña de reportes desde el hilo de Tk"""
+        try:
+            while True:
+                message = self.report_queue.get_nowait()
+                if message[0] == 'progreso':
+                    _, done, total, path, error = message
+                    if error:
+                        self.log_message(f"Error procesando {os.path.basename(path)}: {error}")
+                    self.report_status.config(text=f"Generando reportes ({done}/{total})...")
+                    continue
+                self.report_button.config(state='normal')
+                if message[0] == 'fin':
+                    pdfs = message[1]
+                    if pdfs:
+                        msg = "Reportes generados:\n" + "\n".join(pdfs)
+                        self.report_status.config(text=msg, foreground="green")
+                        messagebox.showinfo("Listo", msg)
+                    else:
+                        self.report_status.config(text="No se generaron reportes.", foreground="orange")
+                else:
+                    e = message[1]
+                    self.report_status.config(text=f"Error: {e}", foreground="red")
+                    messagebox.showerror("Error", f"Error generando reportes: {e}")
+                return
+        except queue.Empty:
+            pass
+        if self.root.winfo_exists():
+            self.root.after(100, self.poll_report_progress)
         
     def setup_control_panel(self, parent):
         """Configurar el panel de control"""
@@ -281,14 +556,22 @@ class MotionMagnificationGUI:
         # Botón para optimización automática de alpha/lambda
         def run_auto_opt():
             # Usar el frame actual y la ROI actual
-            frame = self.current_frame
+            frame = self.current_frame_copy()
             roi = getattr(self, 'roi', None)
-            if frame is None or roi is None:
+            if frame is None or roi is None or self.magnify_engine is None:
                 messagebox.showwarning("Advertencia", "No hay frame o ROI disponible para optimizar.")
                 return
-            self.log_message("Iniciando optimización automática de alpha/lambda...")
-            result = self.optimize_alpha_lambda(frame, roi)
-            messagebox.showinfo("Optimización completa", f"Alpha óptimo: {result['best_alpha']}\nLambda óptimo: {result['best_lambda']}\nEnergía: {result['best_metric']:.2f}")
+            if self.optimization_thread is not None:
+                messagebox.showinfo("Optimización", "Ya hay una optimización en curso")
+                return
+            self.optimization_channel = self.active_channel
+            self.log_message(f"Iniciando optimización automática de alpha/lambda en {self.optimization_channel.name} "
+                             f"(clip de {self.optimizer_clip_frames} frames de la ROI)...")
+            self.optimization_queue = queue.Queue()
+            self.optimization_thread = threading.Thread(target=self.optimization_worker,
+                                                        args=(frame, roi), daemon=True)
+            self.optimization_thread.start()
+            self.root.after(100, self.poll_optimization)
 
         opt_btn = ttk.Button(config_frame, text="Optimizar Alpha/Lambda automáticamente", command=run_auto_opt)
         opt_btn.grid(row=1, column=4, padx=10, pady=2, sticky='w')
@@ -299,6 +582,10 @@ class MotionMagnificationGUI:
         metodo_frame.grid(row=11, column=1, columnspan=3, sticky='w', padx=5, pady=2)
         ttk.Radiobutton(metodo_frame, text="Brillo (intensidad)", variable=self.vibration_method, value='brillo').pack(side='left', padx=2)
         ttk.Radiobutton(metodo_frame, text="Flujo óptico", variable=self.vibration_method, value='flujo').pack(side='left', padx=2)
+        ttk.Radiobutton(metodo_frame, text="Flujo disperso (LK)", variable=self.vibration_method, value='flujo_sparse').pack(side='left', padx=2)
+        ttk.Label(metodo_frame, text="Eje:").pack(side='left', padx=(6, 1))
+        ttk.Combobox(metodo_frame, textvariable=self.sparse_axis, values=['x', 'y'], state='readonly',
+                     width=3).pack(side='left', padx=1)
 
         help_text = (
             "Alpha (amplificación): 10-50 = baja, 100-200 = recomendado, >300 = solo para señales muy limpias.\n"
@@ -344,6 +631,12 @@ class MotionMagnificationGUI:
                                 width=8, increment=0.1, format="%.2f")
         fh_spinbox.grid(row=2, column=3, padx=5, pady=2)
         
+        # Los cambios de alpha, lambda_c, fl y fh se aplican al motor en vivo
+        for spinbox in (alpha_spinbox, lambda_spinbox, fl_spinbox, fh_spinbox):
+            spinbox.config(command=self.apply_live_params)
+            spinbox.bind('<Return>', lambda event: self.apply_live_params())
+            spinbox.bind('<FocusOut>', lambda event: self.apply_live_params())
+        
         # Filtro FFT de frecuencias bajas
         ttk.Label(config_frame, text="🔽 Filtro FFT:", font=('Arial', 8, 'bold')).grid(
             row=3, column=0, columnspan=2, sticky='w', padx=5, pady=2)
@@ -390,6 +683,69 @@ class MotionMagnificationGUI:
         ttk.Label(config_frame, text=f"CPUs detectadas: {multiprocessing.cpu_count()}", 
                  font=('Arial', 8, 'italic')).grid(row=10, column=2, columnspan=2, sticky='w', padx=5, pady=2)
         
+        # Backend de pirámide (se aplica al seleccionar ROI)
+        ttk.Label(config_frame, text="Pirámide:").grid(row=13, column=0, sticky='w', padx=5, pady=2)
+        backend_frame = ttk.Frame(config_frame)
+        backend_frame.grid(row=13, column=1, columnspan=3, sticky='w', padx=5, pady=2)
+        for backend in PYRAMID_BACKENDS:
+            ttk.Radiobutton(backend_frame, text=backend, variable=self.pyramid_backend,
+                            value=backend).pack(side='left', padx=2)
+        # Motor: lineal (amplifica intensidad) o por fase con pirámide de Riesz (no amplifica el ruido)
+        ttk.Label(backend_frame, text="Motor:").pack(side='left', padx=(10, 2))
+        for engine in MAGNIFICATION_ENGINES:
+            ttk.Radiobutton(backend_frame, text=engine, variable=self.magnification_engine,
+                            value=engine).pack(side='left', padx=2)
+        
+        # Precisión numérica (float32: mitad de memoria, error <= 1 nivel de gris)
+        ttk.Label(config_frame, text="Precisión:").grid(row=14, column=0, sticky='w', padx=5, pady=2)
+        precision_frame = ttk.Frame(config_frame)
+        precision_frame.grid(row=14, column=1, columnspan=3, sticky='w', padx=5, pady=2)
+        for precision in PRECISIONS:
+            ttk.Radiobutton(precision_frame, text=precision, variable=self.precision,
+                            value=precision).pack(side='left', padx=2)
+        # Filtro temporal: primer orden por nivel o SOS/FIR sobre la pirámide apilada (banda más selectiva)
+        ttk.Label(precision_frame, text="Filtro temporal:").pack(side='left', padx=(10, 2))
+        ttk.Combobox(precision_frame, textvariable=self.temporal_filter, values=list(TEMPORAL_FILTERS),
+                     state='readonly', width=12).pack(side='left', padx=2)
+        ttk.Label(precision_frame, text="Orden:").pack(side='left', padx=(6, 2))
+        ttk.Spinbox(precision_frame, from_=1, to=8, textvariable=self.temporal_filter_order,
+                    width=3).pack(side='left', padx=2)
+        
+        # Formato de grabación (binario: sin flush por fila, convertible a CSV)
+        ttk.Label(config_frame, text="Grabación:").grid(row=15, column=0, sticky='w', padx=5, pady=2)
+        recording_format_frame = ttk.Frame(config_frame)
+        recording_format_frame.grid(row=15, column=1, columnspan=3, sticky='w', padx=5, pady=2)
+        for value, text in (('csv', 'CSV'), ('binario', 'Binario (.vibrec)')):
+            ttk.Radiobutton(recording_format_frame, text=text, variable=self.recording_format,
+                            value=value).pack(side='left', padx=2)
+        ttk.Checkbutton(recording_format_frame, text="Frames crudos (.rawframes)",
+                        variable=self.record_raw_frames).pack(side='left', padx=6)
+        
+        # Fuente de frames alternativa (pruebas sin cámara y reproducción de grabaciones)
+        ttk.Label(config_frame, text="Fuente:").grid(row=16, column=0, sticky='w', padx=5, pady=2)
+        source_frame = ttk.Frame(config_frame)
+        source_frame.grid(row=16, column=1, columnspan=3, sticky='w', padx=5, pady=2)
+        ttk.Entry(source_frame, textvariable=self.frame_source, width=28).pack(side='left', padx=2)
+        ttk.Button(source_frame, text="...", width=3, command=self.browse_frame_source).pack(side='left', padx=2)
+        ttk.Button(source_frame, text="Sintética",
+                   command=lambda: self.frame_source.set('synthetic')).pack(side='left', padx=2)
+        ttk.Button(source_frame, text="Cámara",
+                   command=lambda: self.frame_source.set('')).pack(side='left', padx=2)
+        ttk.Label(config_frame, text="Tasa fuente:").grid(row=17, column=0, sticky='w', padx=5, pady=2)
+        rate_frame = ttk.Frame(config_frame)
+        rate_frame.grid(row=17, column=1, columnspan=3, sticky='w', padx=5, pady=2)
+        ttk.Combobox(rate_frame, textvariable=self.source_rate, width=8,
+                     values=['nativa', 'máxima', '60', '120', '240']).pack(side='left', padx=2)
+        ttk.Checkbutton(rate_frame, text="Repetir al terminar", variable=self.source_loop).pack(side='left', padx=6)
+        # Modo de la cámara: menos resolución y más FPS suben el límite de Nyquist (FPS/2)
+        ttk.Label(config_frame, text="Modo cámara:").grid(row=18, column=0, sticky='w', padx=5, pady=2)
+        capture_frame = ttk.Frame(config_frame)
+        capture_frame.grid(row=18, column=1, columnspan=3, sticky='w', padx=5, pady=2)
+        ttk.Combobox(capture_frame, textvariable=self.capture_mode, width=16,
+                     values=['', 'rapido', '320x240@120:MJPG', '640x480@60:MJPG', '1280x720@30:MJPG']).pack(side='left', padx=2)
+        ttk.Checkbutton(capture_frame, text="Ventana ROI en sensor",
+                        variable=self.capture_roi_window).pack(side='left', padx=6)
+        
         
         # Botones de control
         button_frame = ttk.LabelFrame(parent, text="Controles de Monitoreo")
@@ -418,6 +774,10 @@ class MotionMagnificationGUI:
                                     command=self.select_roi, state='disabled')
         self.roi_button.pack(side='left', padx=5)
         
+        self.add_roi_button = ttk.Button(button_row2, text="➕ Añadir ROI", 
+                                        command=lambda: self.select_roi(add=True), state='disabled')
+        self.add_roi_button.pack(side='left', padx=5)
+        
         self.auto_tune_button = ttk.Button(button_row2, text="Auto-tune", 
                                           command=self.auto_tune_frequencies, state='disabled')
         self.auto_tune_button.pack(side='left', padx=5)
@@ -492,6 +852,15 @@ class MotionMagnificationGUI:
         self.graph_record_button.pack(side='left', padx=5)
         self.graph_stop_record_button = ttk.Button(button_frame, text="⏺ Detener Grabación", command=self.stop_recording, state='disabled')
         self.graph_stop_record_button.pack(side='left', padx=5)
+        ttk.Checkbutton(button_frame, text="⚡ Gráficas rápidas (blitting)", variable=self.fast_plotting,
+                        command=self.toggle_fast_plotting).pack(side='right', padx=5)
+        # Canal (ROI) mostrado en las gráficas
+        self.channel_var = tk.StringVar(value="")
+        self.channel_selector = ttk.Combobox(button_frame, textvariable=self.channel_var, width=8,
+                                             state='disabled')
+        self.channel_selector.pack(side='right', padx=2)
+        self.channel_selector.bind('<<ComboboxSelected>>', self.on_channel_selected)
+        ttk.Label(button_frame, text="Canal:").pack(side='right', padx=(5, 0))
 
         # Frame para gráficas con mejor layout
         self.fig, (self.ax1, self.ax2) = plt.subplots(2, 1, figsize=(8, 6))
@@ -519,6 +888,10 @@ class MotionMagnificationGUI:
         self.canvas = FigureCanvasTkAgg(self.fig, graph_label_frame)
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(fill='both', expand=True, padx=5, pady=5)
+        self.live_plot = BlitLivePlot(self.canvas, self.ax1, self.ax2, self.line1, self.line2)
+        self.classic_plot = ClassicLivePlot(self.canvas, self.ax1, self.ax2, self.line1, self.line2)
+        if self.fast_plotting.get():
+            self.live_plot.enable()
 
         # Sincronizar estado de botones con los de la pestaña de controles
         self.update_graph_record_buttons()
@@ -585,43 +958,39 @@ class MotionMagnificationGUI:
         self.console_text.delete(1.0, tk.END)
         
     def update_video_display(self):
-        """Actualizar la visualización del video"""
+        """Mostrar el último frame renderizado por la vista previa"""
         try:
-            while True:
-                frame = self.video_queue.get_nowait()
-                
-                # Redimensionar frame para la GUI (máximo 500x400 para el nuevo layout)
-                height, width = frame.shape[:2]
-                max_width, max_height = 500, 400
-                
-                if width > max_width or height > max_height:
-                    scale = min(max_width/width, max_height/height)
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
-                    frame = cv2.resize(frame, (new_width, new_height))
-                
-                # Convertir de BGR a RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Convertir a PIL Image y luego a PhotoImage
+            # Solo se renderiza con el video visible (pestaña seleccionada y ventana sin minimizar)
+            self.preview.set_active(self.video_label.winfo_viewable())
+            frame_rgb = self.preview.take()
+            if frame_rgb is not None:
+                t_start = time.perf_counter()
                 pil_image = Image.fromarray(frame_rgb)
-                photo = ImageTk.PhotoImage(pil_image)
-                
-                # Actualizar el label del video
-                self.video_label.configure(image=photo, text="")
-                self.video_label.image = photo  # Mantener referencia
+                photo = self._preview_photo
+                if photo is None or (photo.width(), photo.height()) != pil_image.size:
+                    photo = self._preview_photo = ImageTk.PhotoImage(pil_image)
+                    self.video_label.configure(image=photo, text="")
+                    self.video_label.image = photo  # Mantener referencia
+                else:
+                    # Mismo tamaño: se reutiliza la imagen de Tk
+                    photo.paste(pil_image)
+                self.profiler.record('conversion_display', time.perf_counter() - t_start)
                 
-        except queue.Empty:
-            pass
         except Exception as e:
             self.log_message(f"Error actualizando video: {str(e)}")
         
         # Programar siguiente actualización solo si la ventana está activa
         if self.root.winfo_exists():
-            self.root.after(50, self.update_video_display)  # 20 FPS para la GUI
+            self.root.after(self.preview_interval, self.update_video_display)
         
     def start_monitoring(self, use_calibration=True):
-        """Iniciar el monitoreo de vibración"""
+        """
+        Iniciar el monitoreo de vibración. La fuente se abre en un hilo aparte (negociar
+        el modo de captura 'rapido' mide varios modos y tarda segundos) y el arranque
+        termina en el hilo de Tk cuando está abierta.
+        """
+        if self.source_opening:
+            return
         try:
             # Reinicializar el ThreadPoolExecutor si es necesario
             if hasattr(self, 'executor') and self.executor._shutdown:
@@ -629,18 +998,70 @@ class MotionMagnificationGUI:
             elif not hasattr(self, 'executor'):
                 self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
             
-            # Inicializar cámara
-            camera_id = self.selected_camera.get()
-            self.camera = cv2.VideoCapture(camera_id)
+            # Fuente: cámara o alternativa (video, imágenes, sintética, frames crudos)
+            source_spec = self.frame_source.get().strip() or self.selected_camera.get()
+            rate = parse_rate(self.source_rate.get())
+            capture_mode = parse_capture_mode(self.capture_mode.get())
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al iniciar: {str(e)}")
+            self.log_message(f"Error al iniciar: {str(e)}")
+            return
+        
+        self.start_button.config(state='disabled')
+        self.start_no_calib_button.config(state='disabled')
+        self.status_label.config(text="Abriendo fuente...", foreground="orange")
+        if capture_mode == FAST_MODE:
+            self.log_message("Probando modos de captura rápidos (puede tardar unos segundos)...")
+        result = queue.Queue(maxsize=1)
+        
+        def open_worker():
+            try:
+                result.put(open_source(source_spec, rate=rate, loop=self.source_loop.get(),
+                                       capture_mode=capture_mode, log=self.log_message))
+            except Exception as e:
+                result.put(e)
+        
+        self.source_opening = True
+        threading.Thread(target=open_worker, name='abrir_fuente', daemon=True).start()
+        self.root.after(100, self.poll_source_open, result, source_spec, use_calibration)
+    
+    def poll_source_open(self, result, source_spec, use_calibration):
+        """Espera en el hilo de Tk a que el hilo de apertura entregue la fuente"""
+        try:
+            camera = result.get_nowait()
+        except queue.Empty:
+            if self.root.winfo_exists():
+                self.root.after(100, self.poll_source_open, result, source_spec, use_calibration)
+            return
+        self.source_opening = False
+        if not isinstance(camera, Exception) and self.start_with_source(camera, source_spec, use_calibration):
+            return
+        if isinstance(camera, Exception):
+            messagebox.showerror("Error", f"Error al iniciar: {str(camera)}")
+            self.log_message(f"Error al iniciar: {str(camera)}")
+        self.status_label.config(text="Sistema detenido", foreground="red")
+        self.start_button.config(state='normal')
+        self.start_no_calib_button.config(state='normal')
+    
+    def start_with_source(self, camera, source_spec, use_calibration=True):
+        """Arranca el pipeline con la fuente ya abierta; devuelve False si no se pudo iniciar"""
+        try:
+            self.camera = camera
             
             if not self.camera.isOpened():
-                messagebox.showerror("Error", f"No se pudo abrir la cámara {camera_id}")
-                return
+                self.camera = None
+                messagebox.showerror("Error", f"No se pudo abrir la fuente {source_spec}")
+                return False
+            if self.camera.fps:
+                # El filtro temporal debe usar la frecuencia de muestreo del contenido;
+                # el valor del usuario se restaura al cerrar la fuente
+                self.user_fps = self.fps.get()
+                self.fps.set(round(self.camera.fps, 3))
                 
             # Ya no se usa calibración de ruido
             if not use_calibration:
                 self.log_message("Iniciando sin calibración de ruido de fondo")
-            self.log_message(f"Cámara {camera_id} inicializada correctamente")
+            self.log_message(f"{self.camera.describe()} inicializada correctamente")
             
             # Actualizar estado visual
             self.status_label.config(text="Sistema ejecutándose", foreground="green")
@@ -650,6 +1071,7 @@ class MotionMagnificationGUI:
             self.start_no_calib_button.config(state='disabled')
             self.stop_button.config(state='normal')
             self.roi_button.config(state='normal')
+            self.add_roi_button.config(state='normal')
             self.auto_tune_button.config(state='normal')
             self.calibrate_button.config(state='normal')
             self.measure_button.config(state='normal')
@@ -661,22 +1083,34 @@ class MotionMagnificationGUI:
             # Update noise filter status display
             self.update_noise_filter_status()
             
-            # Iniciar thread de procesamiento
-            self.processing_thread = threading.Thread(target=self.processing_loop)
-            self.processing_thread.daemon = True
-            self.processing_thread.start()
+            # Iniciar pipeline de procesamiento (un hilo por etapa)
+            self.log_message("Iniciando pipeline de procesamiento optimizado...")
+            self.log_message(f" Usando {self.max_workers} threads para procesamiento paralelo")
+            self.pipeline = self.create_processing_pipeline()
+            self.preview.start()
+            self.pipeline.start()
             
             # Iniciar actualización de gráficas
             self.update_graphs()
+            return True
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al iniciar: {str(e)}")
             self.log_message(f"Error al iniciar: {str(e)}")
+            return False
             
     def stop_monitoring(self):
         """Detener el monitoreo"""
         self.is_running = False
         
+        # Detener las etapas del pipeline y esperarlas antes de liberar la fuente
+        # (la captura no debe leer de una fuente ya liberada)
+        if self.pipeline is not None:
+            self.pipeline.stop(timeout=2.0)
+            if self.pipeline.is_alive():
+                self.log_message("Aviso: alguna etapa del pipeline no terminó en 2 s")
+            self.pipeline = None
+        
         # Detener grabación si está activa
         if self.is_recording:
             self.stop_recording()
@@ -684,14 +1118,17 @@ class MotionMagnificationGUI:
         if self.camera:
             self.camera.release()
             self.camera = None
+        if self.user_fps is not None:
+            self.fps.set(self.user_fps)
+            self.user_fps = None
             
         cv2.destroyAllWindows()
         
         # Limpiar estado del sistema para permitir reinicio limpio
-        self.roi = None
-        self.magnify_engine = None
+        self.channels = []
+        self.display_channel = 0
+        self.update_channel_selector()
         self.frame_count = 0
-        self.signal_buffer.clear()
         
         # Limpiar caches
         self.pyramid_cache.clear()
@@ -701,12 +1138,9 @@ class MotionMagnificationGUI:
         if hasattr(self, 'executor'):
             self.executor.shutdown(wait=False)
         
-        # Limpiar buffers de video
-        while not self.video_queue.empty():
-            try:
-                self.video_queue.get_nowait()
-            except:
-                break
+        # Detener la vista previa (libera el frame pendiente)
+        self.preview.stop()
+        self.set_current_frame(None)
                 
         while not self.data_queue.empty():
             try:
@@ -725,6 +1159,7 @@ class MotionMagnificationGUI:
         self.start_no_calib_button.config(state='normal')
         self.stop_button.config(state='disabled')
         self.roi_button.config(state='disabled')
+        self.add_roi_button.config(state='disabled')
         self.auto_tune_button.config(state='disabled')
         self.calibrate_button.config(state='disabled')
         self.measure_button.config(state='disabled')
@@ -733,72 +1168,220 @@ class MotionMagnificationGUI:
         
         # Limpiar video display
         self.video_label.config(image="", text="📹 El video aparecerá aquí cuando inicies el monitoreo")
+        self._preview_photo = None
         
         self.log_message("Monitoreo detenido - Sistema listo para nueva configuración")
         
-    def select_roi(self):
-        """Seleccionar ROI en la imagen"""
+    def select_roi(self, add=False):
+        """Seleccionar ROI en la imagen (add=True la añade como canal nuevo en lugar de reemplazarlas)"""
         if not self.camera:
             return
+        if add and len(self.channels) >= self.max_rois:
+            messagebox.showwarning("Advertencia", f"Máximo de {self.max_rois} ROIs alcanzado")
+            return
             
-        ret, frame = self.camera.read()
-        if not ret:
-            messagebox.showerror("Error", "No se pudo leer de la cámara")
+        windowed = getattr(self.camera, 'window', None) is not None
+        if windowed:
+            # Seleccionar sobre el sensor completo (fuera de la ventana la imagen está congelada)
+            self.camera.clear_window()
+            # El frame en curso aún puede venir de la ventana: esperar dos capturas nuevas
+            frame = self.fresh_frame_copy(frames=2)
+        else:
+            frame = self.current_frame_copy()
+        if frame is None:
+            messagebox.showerror("Error", "Todavía no hay frames capturados")
+            if windowed:
+                self.update_capture_window()
             return
             
-        # Mostrar ventana para seleccionar ROI
-        self.roi = cv2.selectROI("Selecciona ROI", frame, fromCenter=False, showCrosshair=True)
+        # Mostrar ventana para seleccionar ROI (con las ROIs existentes dibujadas al añadir)
+        preview = frame.copy()
+        if add:
+            for channel in self.channels:
+                x, y, w, h = channel.roi
+                cv2.rectangle(preview, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                cv2.putText(preview, channel.name, (x, y-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        roi = cv2.selectROI("Selecciona ROI", preview, fromCenter=False, showCrosshair=True)
         cv2.destroyWindow("Selecciona ROI")
         
-        if self.roi[2] > 0 and self.roi[3] > 0:
-            x, y, w, h = self.roi
-            self.log_message(f"ROI seleccionado: x={x}, y={y}, ancho={w}, alto={h}")
-            self.roi_status_label.config(text=f"ROI: {w}x{h} en ({x},{y})", foreground="green")
-            
-            # Inicializar motor de magnificación
-            roi_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)[y:y+h, x:x+w]
-            roi_gray = cv2.GaussianBlur(roi_gray, (5, 5), 0)
-            
-            self.magnify_engine = Magnify(roi_gray, 
-                                        self.alpha.get(), 
-                                        self.lambda_c.get(), 
-                                        self.fl.get(), 
-                                        self.fh.get(), 
-                                        self.fps.get())
-                                        
-            self.log_message("Motor de magnificación inicializado")
+        if roi[2] > 0 and roi[3] > 0:
+            x, y, w, h = roi
+            try:
+                channel = self.create_channel(frame, roi, len(self.channels) + 1 if add else 1)
+            except ValueError as e:
+                messagebox.showerror("Error", f"No se pudo inicializar el motor: {e}")
+                if windowed:
+                    self.update_capture_window()
+                return
+            if self.is_recording:
+                if not add:
+                    for old_channel in self.channels:
+                        old_channel.close_recording()
+                self.open_channel_recording(channel)
+            # Reasignación atómica: el pipeline trabaja con su propia copia de la lista
+            self.channels = self.channels + [channel] if add else [channel]
+            self.display_channel = len(self.channels) - 1
+            self.update_channel_selector()
+            self.log_message(f"{channel.name} seleccionado: x={x}, y={y}, ancho={w}, alto={h}")
+            status = f"ROI: {w}x{h} en ({x},{y})"
+            if len(self.channels) > 1:
+                status = f"ROIs: {len(self.channels)} (último {w}x{h} en ({x},{y}))"
+            self.roi_status_label.config(text=status, foreground="green")
+            self.update_capture_window()
+            self.log_message(f"Motor de magnificación {self.magnification_engine.get()} inicializado "
+                             f"(pirámide: {self.pyramid_backend.get()}, "
+                             f"precisión: {self.precision.get()}, "
+                             f"filtro temporal: {self.temporal_filter.get()})")
         else:
             self.log_message("ROI no válido seleccionado")
-            self.roi_status_label.config(text="ROI: Selección cancelada", foreground="red")
+            if windowed:
+                # Selección cancelada: restaurar la ventana de sensor de las ROIs existentes
+                self.update_capture_window()
+            if not self.channels:
+                self.roi_status_label.config(text="ROI: Selección cancelada", foreground="red")
+    
+    def update_capture_window(self):
+        """Limita la captura del sensor a la ventana de las ROIs (si está activado y el backend lo admite)"""
+        if (not self.capture_roi_window.get() or not self.channels
+                or not hasattr(self.camera, 'set_window')):
+            return
+        window = self.camera.set_window([channel.roi for channel in self.channels], self.capture_roi_padding)
+        if window is None:
+            self.log_message("Ventana ROI no soportada por el backend de la cámara: se captura el frame completo")
+        else:
+            x, y, w, h = window
+            self.log_message(f"Ventana de sensor {w}x{h} en ({x},{y}): solo se decodifica la zona de las ROIs")
+    
+    def create_channel(self, frame, roi, number):
+        """Canal nuevo con su motor inicializado sobre la ROI de frame y los parámetros actuales"""
+        # Misma conversión que los frames del pipeline (solo la ROI, no el frame completo)
+        roi_gray = cv2.GaussianBlur(roi_grays(frame, [roi])[0], (5, 5), 0)
+        
+        engine = create_engine(self.magnification_engine.get(),
+                               roi_gray, 
+                               self.alpha.get(), 
+                               self.lambda_c.get(), 
+                               self.fl.get(), 
+                               self.fh.get(), 
+                               self.fps.get(),
+                               pyramid_backend=self.pyramid_backend.get(),
+                               precision=self.precision.get(),
+                               temporal_filter=self.temporal_filter.get(),
+                               filter_order=self.temporal_filter_order.get(),
+                               filter_taps=self.temporal_filter_taps)
+        engine.profiler = self.profiler
+        return RoiChannel(f"ROI {number}", roi, engine, self.signal_buffer_size, self.optimizer_clip_frames,
+                          tracker=SparseTracker(**self.sparse_flow_params))
+    
+    def update_channel_selector(self):
+        """Sincroniza el selector de canal de las gráficas con la lista de ROIs"""
+        if not hasattr(self, 'channel_selector'):
+            return
+        names = [channel.name for channel in self.channels]
+        self.channel_selector.config(values=names, state='readonly' if len(names) > 1 else 'disabled')
+        self.channel_var.set(names[min(self.display_channel, len(names) - 1)] if names else "")
+    
+    def on_channel_selected(self, event=None):
+        """Cambia el canal mostrado y carga sus parámetros en los controles"""
+        names = [channel.name for channel in self.channels]
+        if self.channel_var.get() not in names:
+            return
+        self.display_channel = names.index(self.channel_var.get())
+        engine = self.magnify_engine
+        self.alpha.set(engine.alpha)
+        self.lambda_c.set(engine.lambda_c)
+        self.fl.set(engine.fl)
+        self.fh.set(engine.fh)
+        self.log_message(f"Gráficas y ajustes sobre {self.active_channel.name}")
             
+    def apply_live_params(self):
+        """Aplica alpha, lambda_c, fl y fh al motor del canal mostrado conservando su estado IIR"""
+        engine = self.magnify_engine
+        if engine is None:
+            return  # Se usarán al crear el motor en select_roi
+        try:
+            params = {'alpha': self.alpha.get(), 'lambda_c': self.lambda_c.get(),
+                      'fl': self.fl.get(), 'fh': self.fh.get()}
+        except tk.TclError:
+            return  # Valor a medio escribir en un campo
+        if params == {'alpha': engine.alpha, 'lambda_c': engine.lambda_c, 'fl': engine.fl, 'fh': engine.fh}:
+            return
+        try:
+            engine.set_params(**params)
+        except ValueError as e:
+            self.log_message(f"Parámetros no aplicados: {e}")
+            return
+        self.log_message(f"Parámetros aplicados en caliente: alpha={params['alpha']:.0f}, "
+                         f"lambda_c={params['lambda_c']:.0f}, fl={params['fl']:.3f}, fh={params['fh']:.2f}")
+    
+    def browse_frame_source(self):
+        """Elegir un video o una grabación de frames crudos como fuente"""
+        path = filedialog.askopenfilename(
+            title='Selecciona un video o una grabación de frames crudos',
+            filetypes=[('Videos y frames crudos', f'*.avi *.mp4 *.mkv *.mov *{RAW_FRAMES_EXTENSION}'),
+                       ('Todos los archivos', '*.*')])
+        if path:
+            self.frame_source.set(path)
+    
     def auto_tune_frequencies(self):
-        """Auto-ajustar frecuencias fl y fh"""
-        if not self.camera or not self.roi:
+        """
+        Auto-ajustar frecuencias fl y fh sin bloquear la interfaz.
+        Analiza en un hilo de fondo el brillo medio reciente de la ROI (roi_mean_buffer, que
+        llena el pipeline) y aplica la banda al motor en vivo sin reinicializarlo.
+        """
+        if not self.roi or self.magnify_engine is None:
             messagebox.showwarning("Advertencia", "Primero selecciona un ROI")
             return
-            
-        self.log_message("Iniciando auto-ajuste de frecuencias...")
-        
-        # Recolectar señal para análisis
-        buffer_size = min(100, int(self.fps.get() * 5))
-        auto_buffer = []
-        x, y, w, h = self.roi
+        if self.auto_tune_thread is not None:
+            messagebox.showinfo("Auto-tune", "Ya hay un auto-ajuste en curso")
+            return
         
-        for i in range(buffer_size):
-            ret, frame = self.camera.read()
-            if not ret:
-                break
-                
-            roi_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)[y:y+h, x:x+w]
-            roi_gray = cv2.GaussianBlur(roi_gray, (5, 5), 0)
-            mean_signal = np.mean(roi_gray)
-            auto_buffer.append(mean_signal)
-            
-            if i % 10 == 0:
-                self.log_message(f"Recolectando... {i}/{buffer_size}")
-                
-        # Calcular fl y fh automáticamente
-        fl, fh = self.auto_tune_fl_fh(auto_buffer, self.fps.get())
+        fps = self.get_effective_fps()
+        min_samples = min(100, int(fps * 5))
+        samples = list(self.roi_mean_buffer)
+        if len(samples) < min_samples:
+            messagebox.showinfo("Auto-tune", f"Recolectando señal de la ROI: {len(samples)}/{min_samples} "
+                                "muestras. Inténtalo de nuevo en unos segundos.")
+            return
+        cutoff = self.fft_cutoff_freq.get() if self.fft_highpass_enabled.get() else None
+        
+        self.auto_tune_channel = self.active_channel
+        self.log_message(f"Iniciando auto-ajuste de frecuencias en {self.auto_tune_channel.name} "
+                         f"({len(samples)} muestras)...")
+        self.auto_tune_queue = queue.Queue()
+        self.auto_tune_thread = threading.Thread(target=self.auto_tune_worker,
+                                                 args=(samples, fps, cutoff), daemon=True)
+        self.auto_tune_thread.start()
+        self.root.after(100, self.poll_auto_tune)
+    
+    def auto_tune_worker(self, samples, fps, cutoff):
+        """Hilo de fondo del auto-ajuste; publica (fl, fh) en auto_tune_queue"""
+        try:
+            self.auto_tune_queue.put(('fin', self.auto_tune_fl_fh(samples, fps, cutoff)))
+        except Exception as e:
+            self.auto_tune_queue.put(('error', e))
+    
+    def poll_auto_tune(self):
+        """Aplica el resultado del auto-ajuste en el hilo de Tk"""
+        try:
+            status, result = self.auto_tune_queue.get_nowait()
+        except queue.Empty:
+            if self.root.winfo_exists():
+                self.root.after(100, self.poll_auto_tune)
+            return
+        self.auto_tune_thread = None
+        channel, self.auto_tune_channel = self.auto_tune_channel, None
+        if status == 'error':
+            self.log_message(f"Error en auto-ajuste de frecuencias: {result}")
+            return
+        fl, fh = result
+        if channel is not None and channel in self.channels:
+            try:
+                # Nuevos coeficientes sin perder el estado del filtro temporal
+                channel.engine.set_params(fl=fl, fh=fh)
+            except ValueError as e:
+                self.log_message(f"Auto-ajuste descartado: {e}")
+                return
         
         # Actualizar variables
         self.fl.set(fl)
@@ -812,9 +1395,9 @@ class MotionMagnificationGUI:
             messagebox.showwarning("Advertencia", "Primero inicia el monitoreo")
             return
             
-        ret, frame = self.camera.read()
-        if not ret:
-            messagebox.showerror("Error", "No se pudo leer de la cámara")
+        frame = self.current_frame_copy()
+        if frame is None:
+            messagebox.showerror("Error", "Todavía no hay frames capturados")
             return
         
         messagebox.showinfo("Calibración", 
@@ -883,8 +1466,8 @@ class MotionMagnificationGUI:
         if not self.camera:
             return
             
-        ret, frame = self.camera.read()
-        if not ret:
+        frame = self.current_frame_copy()
+        if frame is None:
             return
         
         # Variables para almacenar los puntos de medición
@@ -948,7 +1531,7 @@ class MotionMagnificationGUI:
         """
         if self.background_subtraction.get() and self.is_running:
             self.log_message("Activando sustracción de fondo - capturando modelo...")
-            # El modelo se capturará en el processing_loop
+            # El modelo se capturará en el pipeline de procesamiento
         elif not self.background_subtraction.get():
             self.background_model = None
             self.log_message("Sustracción de fondo desactivada")
@@ -989,81 +1572,86 @@ class MotionMagnificationGUI:
         # Esta función se llamará desde el procesamiento principal
         pass  # Se implementa en el contexto donde se tiene acceso al frame
     
-    def process_frame_parallel(self, frame, roi, prev_gray=None):
-        """Procesar frame usando múltiples threads para diferentes tareas"""
+    def process_frame_parallel(self, frame, channels, method='brillo'):
+        """
+        Procesar todas las ROIs de un frame: conversión a gris compartida y,
+        en modo paralelo, las tareas de todos los canales en el pool a la vez.
+        Con method 'flujo_sparse' el flujo denso se sustituye por el seguimiento Lucas-Kanade.
+        Returns:
+            lista alineada con channels de dicts {'magnify', 'flow' o 'sparse'}
+        """
+        t_start = time.perf_counter()
+        grays = roi_grays(frame, [channel.roi for channel in channels])
+        self.profiler.record('conversion_color', time.perf_counter() - t_start)
+        
         if not self.use_parallel_processing.get():
             # Procesamiento secuencial tradicional
-            return self.process_frame_sequential(frame, roi, prev_gray)
+            return [self.process_frame_sequential(channel, gray, channel.prev_out, method)
+                    for channel, gray in zip(channels, grays)]
             
-        # Preparar tareas para procesamiento paralelo
+        # Tareas de todos los canales en el pool antes de esperar ninguna
         futures = []
-        
-        # Task 1: Magnificación de movimiento
-        future_magnify = self.executor.submit(self.magnify_roi_task, frame, roi)
-        futures.append(('magnify', future_magnify))
-        
-        # Task 2: Cálculo de flujo óptico (si hay frame previo)
-        if prev_gray is not None:
-            future_flow = self.executor.submit(self.optical_flow_task, prev_gray, frame, roi)
-            futures.append(('flow', future_flow))
-        
-        # Task 3: Filtros de ruido (en paralelo si están activados)
-        if (self.background_subtraction.get() or 
-            self.morphological_filtering.get() or 
-            self.temporal_smoothing.get()):
-            future_filters = self.executor.submit(self.apply_filters_task, frame, roi)
-            futures.append(('filters', future_filters))
-        
-        # Recopilar resultados
-        results = {}
-        for task_name, future in futures:
-            try:
-                results[task_name] = future.result(timeout=0.1)  # Timeout para evitar bloqueos
-            except Exception as e:
-                self.log_message(f"Error en tarea paralela {task_name}: {str(e)}")
-                results[task_name] = None
-        
-        return results
+        for channel, gray in zip(channels, grays):
+            if method == 'flujo_sparse':
+                # Lucas-Kanade entre salidas magnificadas consecutivas, como en el modo secuencial:
+                # se encadena tras Magnify en la misma tarea
+                futures.append([('magnify_sparse', self.executor.submit(self.magnify_sparse_task, channel, gray,
+                                                                        channel.prev_out))])
+                continue
+            channel_futures = [('magnify', self.executor.submit(self.magnify_roi_task, channel, gray))]
+            # Cálculo de flujo óptico (si hay frame previo)
+            if channel.prev_out is not None:
+                channel_futures.append(('flow', self.executor.submit(self.optical_flow_task,
+                                                                     channel.prev_out, gray)))
+            futures.append(channel_futures)
+        
+        # Recopilar resultados. Sin timeout: abandonar una tarea no la cancela y el frame
+        # siguiente lanzaría otro Magnify sobre el mismo motor (estado modificado en el sitio)
+        all_results = []
+        for channel_futures in futures:
+            results = {}
+            for task_name, future in channel_futures:
+                try:
+                    results[task_name] = future.result()
+                except Exception as e:
+                    self.log_message(f"Error en tarea paralela {task_name}: {str(e)}")
+                    results[task_name] = None
+            if 'magnify_sparse' in results:
+                out, displacement = results.pop('magnify_sparse') or (None, None)
+                results['magnify'] = out
+                if displacement is not None:
+                    results['sparse'] = displacement
+            all_results.append(results)
+        
+        return all_results
     
-    def magnify_roi_task(self, frame, roi):
-        """Tarea de magnificación que se ejecuta en thread separado"""
+    def magnify_roi_task(self, channel, gray):
+        """Tarea de magnificación de un canal que se ejecuta en thread separado"""
         try:
-            x, y, w, h = roi
-            roi_img = frame[y:y+h, x:x+w]
-            
-            # Convertir a escala de grises
-            if len(roi_img.shape) == 3:
-                gray = cv2.cvtColor(roi_img, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = roi_img.copy()
-            
-            # Aplicar magnificación usando el motor existente
-            if self.magnify_engine:
-                magnified = self.magnify_engine.Magnify(gray)
-                return magnified
-            else:
-                return gray
-                
+            channel.record_input(gray)
+            return channel.engine.Magnify(gray)
         except Exception as e:
-            self.log_message(f"Error en magnificación paralela: {str(e)}")
+            self.log_message(f"Error en magnificación paralela ({channel.name}): {str(e)}")
             return None
     
-    def optical_flow_task(self, prev_gray, current_frame, roi):
+    def magnify_sparse_task(self, channel, gray, prev_out):
+        """Magnificación y, con salida previa, Lucas-Kanade de prev_out a la salida nueva"""
+        out = self.magnify_roi_task(channel, gray)
+        if out is None or prev_out is None:
+            return out, None
+        return out, self.sparse_flow_task(channel.tracker, prev_out, out)
+    
+    def optical_flow_task(self, prev_gray, current_gray):
         """Tarea de flujo óptico en thread separado"""
         try:
-            x, y, w, h = roi
-            current_roi = current_frame[y:y+h, x:x+w]
-            if len(current_roi.shape) == 3:
-                current_gray = cv2.cvtColor(current_roi, cv2.COLOR_BGR2GRAY)
-            else:
-                current_gray = current_roi.copy()
-
             # prev_gray debe ser del mismo tamaño que current_gray
             if prev_gray is not None and prev_gray.shape == current_gray.shape:
+                t_start = time.perf_counter()
                 flow = cv2.calcOpticalFlowFarneback(prev_gray, current_gray, None, 
                                                    0.5, 3, 15, 3, 5, 1.2, 0)
                 mag = np.linalg.norm(flow, axis=2)
                 mean_magnitude = np.mean(mag)
+                self.profiler.record('flujo_optico', time.perf_counter() - t_start)
                 return mean_magnitude, current_gray
             else:
                 return 0, current_gray
@@ -1071,45 +1659,46 @@ class MotionMagnificationGUI:
             self.log_message(f"Error en flujo óptico paralelo: {str(e)}")
             return 0, None
     
-    def apply_filters_task(self, frame, roi):
-        """Aplicar filtros de ruido en thread separado"""
+    def sparse_flow_task(self, tracker, prev_gray, current_gray):
+        """Tarea de seguimiento Lucas-Kanade: desplazamiento (dx, dy) con signo en px/frame"""
         try:
-            x, y, w, h = roi
-            roi_frame = frame[y:y+h, x:x+w]
-            
-            # Aplicar filtros según configuración
-            filtered_frame = self.apply_noise_filtering(roi_frame, roi)
-            return filtered_frame
-            
+            t_start = time.perf_counter()
+            displacement = tracker.update(prev_gray, current_gray)
+            self.profiler.record('flujo_optico', time.perf_counter() - t_start)
+            return displacement
         except Exception as e:
-            self.log_message(f"Error en filtros paralelos: {str(e)}")
-            return roi_frame
+            self.log_message(f"Error en flujo disperso: {str(e)}")
+            return 0.0, 0.0
     
-    def process_frame_sequential(self, frame, roi, prev_gray=None):
-        """Procesamiento secuencial tradicional (fallback)"""
+    def process_frame_sequential(self, channel, gray, prev_gray=None, method='brillo'):
+        """Procesamiento secuencial tradicional de un canal (fallback)"""
         try:
-            x, y, w, h = roi
-            roi_img = frame[y:y+h, x:x+w]
-            
             # Magnificación
-            gray = cv2.cvtColor(roi_img, cv2.COLOR_BGR2GRAY)
-            out = self.magnify_engine.Magnify(gray) if self.magnify_engine else gray
+            channel.record_input(gray)
+            out = channel.engine.Magnify(gray)
+            
+            if method == 'flujo_sparse':
+                results = {'magnify': out}
+                if prev_gray is not None:
+                    results['sparse'] = self.sparse_flow_task(channel.tracker, prev_gray, out)
+                return results
             
             # Flujo óptico
             mean_magnitude = 0
             if prev_gray is not None:
+                t_start = time.perf_counter()
                 flow = cv2.calcOpticalFlowFarneback(prev_gray, out, None, 
                                                   0.5, 3, 15, 3, 5, 1.2, 0)
                 mean_magnitude = np.mean(cv2.norm(flow, cv2.NORM_L2))
+                self.profiler.record('flujo_optico', time.perf_counter() - t_start)
             
             return {
                 'magnify': out,
-                'flow': (mean_magnitude, out),
-                'filters': None
+                'flow': (mean_magnitude, out)
             }
             
         except Exception as e:
-            self.log_message(f"Error en procesamiento secuencial: {str(e)}")
+            self.log_message(f"Error en procesamiento secuencial ({channel.name}): {str(e)}")
             return None
     
     def should_skip_frame(self):
@@ -1119,6 +1708,7 @@ class MotionMagnificationGUI:
     def monitor_performance(self, processing_time):
         """Monitorear rendimiento sin ajustes automáticos de frame skipping"""
         self.processing_times.append(processing_time)
+        self.performance_monitor.record_processing_time(processing_time)
         
         if len(self.processing_times) >= 5:  # Evaluar cada 5 frames
             avg_time = sum(self.processing_times) / len(self.processing_times)
@@ -1153,22 +1743,23 @@ class MotionMagnificationGUI:
             
 
     def start_recording(self):
-        """Iniciar la grabación de datos al archivo CSV"""
+        """Iniciar la grabación de datos (un archivo por ROI)"""
         if not self.is_running:
             messagebox.showwarning("Advertencia", "Primero inicia el monitoreo del sistema")
             return
         try:
-            # Crear archivo CSV para grabación
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.recording_filename = f"historiales/vibration_recording_{timestamp}.csv"
             os.makedirs("historiales", exist_ok=True)
-            self.csv_file = open(self.recording_filename, mode='w', newline='')
-            self.csv_writer = csv.writer(self.csv_file)
-            if self.is_calibrated:
-                self.csv_writer.writerow(["frame", "timestamp", "mean_magnitude_px_frame", 
-                                        "velocity_mm_s", "mean_signal", "mm_per_pixel"])
-            else:
-                self.csv_writer.writerow(["frame", "timestamp", "mean_magnitude_px_frame", "mean_signal"])
+            self.recording_base = f"historiales/vibration_recording_{timestamp}"
+            self.recording_extension = RECORDING_EXTENSION if self.recording_format.get() == 'binario' else '.csv'
+            self.recording_files = 0
+            self.recording_filename = self.recording_base + self.recording_extension
+            for channel in self.channels:
+                self.open_channel_recording(channel)
+            if self.record_raw_frames.get():
+                raw_path = self.recording_base + RAW_FRAMES_EXTENSION
+                self.raw_recorder = RawFrameRecorder(raw_path)
+                self.log_message(f"Grabando frames crudos en {raw_path} (reproducibles como fuente)")
             self.is_recording = True
             # Actualizar interfaz
             self.record_button.config(state='disabled')
@@ -1180,20 +1771,52 @@ class MotionMagnificationGUI:
             if hasattr(self, 'graph_record_button'):
                 self.update_graph_record_buttons()
         except Exception as e:
+            for channel in self.channels:
+                channel.close_recording()
             messagebox.showerror("Error", f"Error al iniciar grabación: {str(e)}")
             self.log_message(f"Error al iniciar grabación: {str(e)}")
+    
+    def open_channel_recording(self, channel):
+        """
+        Abre el archivo de grabación de un canal: el primero usa recording_filename y
+        los siguientes el sufijo _roiN (N = orden de apertura dentro de la grabación)
+        """
+        self.recording_files += 1
+        path = self.recording_filename
+        if self.recording_files > 1:
+            path = f"{self.recording_base}_roi{self.recording_files}{self.recording_extension}"
+        columns = CALIBRATED_COLUMNS if self.is_calibrated else RECORDING_COLUMNS
+        if self.recording_extension == RECORDING_EXTENSION:
+            # Grabación binaria por bloques, convertible a CSV con python -m src.recorder
+            file_settings = self.config['file_settings']
+            channel.recorder = BinaryRecorder(
+                path, columns=columns,
+                chunk_size=file_settings.get('recording_chunk_size', 1024),
+                fsync_interval=file_settings.get('recording_fsync_interval', 10.0))
+        else:
+            csv_file = open(path, mode='w', newline='')
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(columns)
+            channel.csv_file = csv_file
+            channel.csv_writer = csv_writer  # Último: el pipeline escribe en cuanto lo ve
+        self.log_message(f"{channel.name} -> {path}")
             
     def stop_recording(self):
         """Detener la grabación de datos"""
         if not self.is_recording:
             return
         try:
-            # Cerrar archivo CSV
-            if self.csv_file:
-                self.csv_file.close()
-                self.csv_file = None
-                self.csv_writer = None
             self.is_recording = False
+            # Cerrar archivos CSV y escribir el último bloque binario de cada canal
+            for channel in self.channels:
+                recorder = channel.close_recording()
+                if recorder:
+                    self.log_message(f"Grabación binaria {channel.name}: {recorder.samples_written} muestras en "
+                                     f"{recorder.chunks_written} bloques (convertir con python -m src.recorder)")
+            if self.raw_recorder:
+                raw_recorder, self.raw_recorder = self.raw_recorder, None
+                raw_recorder.close()
+                self.log_message(f"Frames crudos: {raw_recorder.frames_written} en {raw_recorder.path}")
             # Actualizar interfaz
             self.record_button.config(state='normal' if self.is_running else 'disabled')
             self.stop_record_button.config(state='disabled')
@@ -1204,7 +1827,8 @@ class MotionMagnificationGUI:
                 self.update_graph_record_buttons()
             # Solo mostrar messagebox si el sistema está ejecutándose (evitar popup al cerrar)
             if self.is_running:
-                messagebox.showinfo("Grabación", f"Datos guardados en:\n{self.recording_filename}")
+                files = f"\n(+{self.recording_files - 1} archivos _roiN)" if self.recording_files > 1 else ""
+                messagebox.showinfo("Grabación", f"Datos guardados en:\n{self.recording_filename}{files}")
         except Exception as e:
             messagebox.showerror("Error", f"Error al detener grabación: {str(e)}")
             self.log_message(f"Error al detener grabación: {str(e)}")
@@ -1222,16 +1846,19 @@ class MotionMagnificationGUI:
         mm_per_second = mm_per_frame / time_per_frame
         return mm_per_second, "mm/s"
         
-    def auto_tune_fl_fh(self, signal_buffer, fps):
-        """Ajustar automáticamente fl y fh usando picos del espectro"""
+    def auto_tune_fl_fh(self, signal_buffer, fps, highpass_cutoff=None):
+        """
+        Ajustar automáticamente fl y fh usando picos del espectro.
+        No lee variables Tk: se puede llamar desde un hilo de fondo.
+        """
         from scipy.signal import find_peaks
         signal_arr = np.array(signal_buffer) - np.mean(signal_buffer)
         fft_vals = np.abs(np.fft.rfft(signal_arr))
-        freqs = np.fft.rfftfreq(len(signal_arr), d=1.0/self.get_effective_fps())
+        freqs = np.fft.rfftfreq(len(signal_arr), d=1.0/fps)
 
         # Aplicar filtro paso alto si está habilitado para el análisis
-        if self.fft_highpass_enabled.get():
-            cutoff = self.fft_cutoff_freq.get()
+        if highpass_cutoff:
+            cutoff = highpass_cutoff
             cutoff_idx = np.searchsorted(freqs, cutoff)
             if cutoff_idx > 0:
                 fft_vals[:cutoff_idx] = 0  # Suprimir frecuencias bajas para análisis
@@ -1250,386 +1877,364 @@ class MotionMagnificationGUI:
 
         return fl, fh
         
-    def processing_loop(self):
-        """Loop principal de procesamiento optimizado"""
-        self.log_message("Iniciando loop de procesamiento optimizado...")
-        self.log_message(f" Usando {self.max_workers} threads para procesamiento paralelo")
-        
-        prev_gray = None
+    def create_processing_pipeline(self):
+        """Crea el pipeline captura -> cálculo -> salida con buffers drop-oldest (el overlay lo dibuja la vista previa)"""
+        self._last_capture_time = 0.0
+        self._last_sink_time = None
+        self.frame_pool = FramePool(self.frame_pool_size)
+        self._frame_shape = None
+        return Pipeline([
+            ('captura', self.capture_stage),
+            ('calculo', self.compute_stage),
+            ('salida', self.sink_stage),
+        ], capacity=self.pipeline_capacity, on_error=self.on_pipeline_error, on_drop=self.release_item_frame)
+    
+    def on_pipeline_error(self, stage_name, error):
+        self.log_message(f"Error en procesamiento ({stage_name}): {str(error)}")
+    
+    def release_item_frame(self, item):
+        """Devuelve al pool el buffer de un item descartado por el pipeline"""
+        frame_buf = item.pop('frame_buf', None)
+        if frame_buf is not None:
+            frame_buf.release()
+    
+    def set_current_frame(self, frame_buf):
+        """Publica frame_buf como último frame crudo (con referencia propia)"""
+        frame_buf = frame_buf.retain() if frame_buf is not None else None
+        with self._current_frame_lock:
+            previous, self._current_frame = self._current_frame, frame_buf
+        if previous is not None:
+            previous.release()
+    
+    def current_frame_copy(self):
+        """Copia del último frame crudo capturado (None si todavía no hay)"""
+        with self._current_frame_lock:
+            current = self._current_frame
+            if current is None:
+                return None
+            current.retain()
+        try:
+            return current.array.copy()
+        finally:
+            current.release()
+    
+    def fresh_frame_copy(self, frames=1, timeout=1.0):
+        """
+        Copia del último frame tras esperar a que la captura publique frames nuevos
+        (como mucho timeout segundos; después, el último disponible)
+        """
+        target = self.frame_count + frames
+        deadline = time.perf_counter() + timeout
+        while self.is_running and self.frame_count < target and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        return self.current_frame_copy()
+    
+    def capture_stage(self, _):
+        """Etapa 1: lectura de cámara respetando el FPS objetivo"""
+        if not self.is_running or self.camera is None:
+            raise StopIteration
+        # Control de FPS: no capturar más rápido que el objetivo (las fuentes que no son
+        # cámara marcan su propio ritmo, incluido el modo de máxima velocidad)
+        if not self.camera.self_paced:
+            target_frame_time = 1.0 / self.fps.get()
+            wait = self._last_capture_time + target_frame_time - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_capture_time = time.time()
+        
+        # Lectura directa en un buffer reciclado del pool (sin asignar memoria por frame)
+        frame_buf = self.frame_pool.acquire(self._frame_shape) if self._frame_shape else None
+        t_read = time.perf_counter()
+        ret, frame = self.camera.read(frame_buf.array if frame_buf is not None else None)
+        self.profiler.record('captura', time.perf_counter() - t_read)
+        if not ret:
+            if frame_buf is not None:
+                frame_buf.release()
+            self.log_message("No se pudo leer de la fuente (fin o error) - pipeline detenido")
+            raise StopIteration
+        if frame_buf is None or frame is not frame_buf.array:
+            # Primer frame o cambio de resolución: el array leído pasa a ser del pool
+            if frame_buf is not None:
+                frame_buf.release()
+            frame_buf = self.frame_pool.adopt(frame)
+            self._frame_shape = frame.shape
+        raw_recorder = self.raw_recorder
+        if raw_recorder is not None:
+            # Copia al bloque en memoria (escribe a disco el hilo del grabador); False si ya se cerró
+            raw_recorder.append(frame)
+        
+        # Actualizar el frame actual para optimización y GUI (referencia, sin copia)
+        self.set_current_frame(frame_buf)
+        self.frame_count += 1
+        
+        # Verificar si se debe saltar este frame para mejorar rendimiento
+        if self.should_skip_frame():
+            frame_buf.release()
+            return None
+        return {'frame': frame, 'frame_buf': frame_buf, 'frame_count': self.frame_count,
+                'timestamp': datetime.datetime.now()}
+    
+    def compute_stage(self, item):
+        """Etapa 2: magnificación, flujo óptico y muestra de señal de cada ROI"""
+        channels = self.channels  # Copia propia: la GUI reasigna la lista al añadir ROIs
+        if not channels:
+            return item
+        compute_start = time.time()
+        method = self.vibration_method.get()
+        all_results = self.process_frame_parallel(item['frame'], channels, method)
+        axis = 0 if self.sparse_axis.get() == 'x' else 1
+        samples = []
+        for channel, processing_results in zip(channels, all_results):
+            if not processing_results or processing_results.get('magnify') is None:
+                continue
+            flow_result = processing_results.get('flow')
+            
+            # Copia propia: el motor reutiliza su buffer de salida en el siguiente frame
+            out = processing_results['magnify'].copy()
+            channel.prev_out = out
+            
+            # Obtener magnitud del flujo óptico (denso, o del desplazamiento LK con signo)
+            mean_magnitude = 0
+            displacement = processing_results.get('sparse')
+            if displacement is not None:
+                mean_magnitude = float(np.hypot(*displacement))
+            elif flow_result and len(flow_result) == 2:
+                mean_magnitude, _ = flow_result
+            
+            # Convertir a unidades físicas si está calibrado
+            physical_value, physical_units = self.convert_to_physical_units(mean_magnitude)
+            
+            # Datos para gráficas según método seleccionado
+            if method == 'flujo':
+                # Usar la magnitud promedio del flujo óptico
+                mean_signal = mean_magnitude
+            elif method == 'flujo_sparse':
+                # Desplazamiento con signo del eje elegido (la señal oscila a la frecuencia real)
+                mean_signal = displacement[axis] if displacement is not None else 0.0
+            else:
+                # Usar el brillo promedio del ROI magnificado
+                mean_signal = np.mean(out)
+            channel.push_sample(mean_signal)
+            samples.append({'channel': channel, 'roi': channel.roi, 'magnified': out,
+                            'mean_magnitude': mean_magnitude, 'physical_value': physical_value,
+                            'physical_units': physical_units, 'mean_signal': mean_signal})
+        if not samples:
+            return item
+        
+        # Enviar datos para gráficas (solo el canal mostrado)
+        display = self.active_channel
+        if any(sample['channel'] is display for sample in samples):
+            try:
+                self.data_queue.put({
+                    'signal': list(display.signal_buffer),
+                    'frame_count': item['frame_count']
+                }, block=False)
+            except queue.Full:
+                pass  # Skip si la queue está llena
+        
+        processing_time = time.time() - compute_start
+        # Monitorear rendimiento
+        self.monitor_performance(processing_time)
+        
+        item.update(channels=samples, processing_time=processing_time)
+        return item
+    
+    def draw_overlay(self, frame, scale, item):
+        """Dibuja sobre frame (vista previa reducida por scale) las ROIs magnificadas, su información y el rendimiento"""
+        if 'channels' not in item:
+            # Si no hay ROI, mostrar mensaje optimizado
+            cv2.putText(frame, "Selecciona ROI para comenzar analisis", 
+                       (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+            cv2.putText(frame, f"Cam {self.selected_camera.get()} | FPS: {self.fps.get()}", 
+                       (10, frame.shape[0]-20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            return item
+        
+        # Actualizar frame original con el resultado magnificado de cada ROI
+        multiple = len(item['channels']) > 1
+        for sample in item['channels']:
+            x, y, w, h = sample['roi']
+            # Coordenadas en la vista reducida
+            sx, sy = int(x * scale), int(y * scale)
+            sw, sh = max(1, int(w * scale)), max(1, int(h * scale))
+            magnified = sample['magnified'] if scale == 1.0 else cv2.resize(sample['magnified'], (sw, sh))
+            frame[sy:sy+sh, sx:sx+sw] = cv2.cvtColor(magnified, cv2.COLOR_GRAY2BGR)
+            
+            # Dibujar información del ROI
+            cv2.rectangle(frame, (sx, sy), (sx+sw, sy+sh), (0, 255, 0), 2)
+            
+            # Mostrar información optimizada
+            label = f"{sample['channel'].name}: " if multiple else "ROI: "
+            if self.is_calibrated:
+                info_text = f"{label}{w}x{h} | Vel: {sample['physical_value']:.2f} {sample['physical_units']}"
+            else:
+                info_text = f"{label}{w}x{h} | Mag: {sample['mean_magnitude']:.2f} px/frame"
+            
+            cv2.putText(frame, info_text, (sx, sy-10), cv2.FONT_HERSHEY_SIMPLEX, 
+                       0.5, (0, 255, 0), 1)
         
-        while self.is_running:
+        # Información de rendimiento
+        processing_time = item['processing_time']
+        fps_actual = 1.0 / processing_time if processing_time > 0 else 0
+        
+        # Mostrar parámetros y rendimiento
+        params_text = f"alpha:{self.alpha.get():.0f} | fl:{self.fl.get():.3f} | fh:{self.fh.get():.2f} | FPS:{fps_actual:.1f}"
+        cv2.putText(frame, params_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
+                   0.5, (255, 255, 255), 1)
+        
+        # Mostrar estado de optimizaciones
+        if self.use_parallel_processing.get() or self.use_frame_skip.get():
+            optim_text = f""
+            if self.use_parallel_processing.get():
+                optim_text += f" Parallel({self.max_workers})"
+            if self.use_frame_skip.get():
+                optim_text += f" Skip(1/{self.skip_frames.get()})"
+            cv2.putText(frame, optim_text, (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 
+                       0.4, (0, 255, 255), 1)
+        return item
+    
+    def sink_stage(self, item):
+        """Etapa 3: grabación (CSV o binaria) y envío del frame a la vista previa"""
+        if 'channels' in item and self.is_recording:
+            t_record = time.perf_counter()
+            for sample in item['channels']:
+                self.record_sample(item, sample)
+            self.profiler.record('grabacion', time.perf_counter() - t_record)
+        
+        # Intervalo entre frames de salida (FPS real del pipeline)
+        now = time.perf_counter()
+        if self._last_sink_time is not None:
+            self.performance_monitor.record_frame_time(now - self._last_sink_time)
+        self._last_sink_time = now
+        
+        # Ofrecer el frame a la vista previa (solo renderiza el último, si está visible)
+        frame_buf = item.pop('frame_buf')
+        self.preview.submit(frame_buf, item)
+        frame_buf.release()
+        
+        # Resumen periódico de latencias por etapa
+        if item['frame_count'] % self.pipeline_report_interval == 0:
+            self.log_pipeline_stats()
+        return item
+    
+    def record_sample(self, item, sample):
+        """Escribe la muestra de un canal en su grabación (bloque binario en memoria o fila CSV)"""
+        channel = sample['channel']
+        recorder = channel.recorder
+        if recorder:
             try:
-                frame_start_time = time.time();
-                
-
-                ret, frame = self.camera.read()
-                if not ret:
-                    break
-
-                # Actualizar el frame actual para optimización y GUI
-                self.current_frame = frame.copy()
-
-                self.frame_count += 1
-
-                # Verificar si se debe saltar este frame para mejorar rendimiento
-                if self.should_skip_frame():
-                    continue
-                
-                # Procesar solo si hay ROI y motor de magnificación
-                if self.roi and self.magnify_engine:
-                    # FPS efectivo para cálculos
-                    fps_eff = self.get_effective_fps()
-                    # Usar procesamiento paralelo u optimizado
-                    processing_results = self.process_frame_parallel(frame, self.roi, prev_gray)
-                    
-                    if processing_results:
-                        # Extraer resultados
-                        magnified_result = processing_results.get('magnify')
-                        flow_result = processing_results.get('flow')
-                        
-                        if magnified_result is not None:
-                            out = magnified_result
-                            prev_gray = out.copy()
-                            
-                            # Actualizar frame original con resultado magnificado
-                            x, y, w, h = self.roi
-                            frame[y:y+h, x:x+w] = cv2.cvtColor(out, cv2.COLOR_GRAY2BGR)
-                            
-                            # Obtener magnitud del flujo óptico
-                            mean_magnitude = 0
-                            if flow_result and len(flow_result) == 2:
-                                mean_magnitude, _ = flow_result
-                            
-                            # Dibujar información del ROI
-                            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 3)
-                            
-                            # Convertir a unidades físicas si está calibrado
-                            physical_value, physical_units = self.convert_to_physical_units(mean_magnitude)
-                            
-                            # Mostrar información optimizada
-                            if self.is_calibrated:
-                                info_text = f"ROI: {w}x{h} | Vel: {physical_value:.2f} {physical_units}"
-                            else:
-                                info_text = f"ROI: {w}x{h} | Mag: {mean_magnitude:.2f} px/frame"
-                            
-                            cv2.putText(frame, info_text, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 
-                                       0.6, (0, 255, 0), 2)
-                            
-                            # Información de rendimiento
-                            processing_time = time.time() - frame_start_time;
-                            fps_actual = 1.0 / processing_time if processing_time > 0 else 0
-                            
-                            # Mostrar parámetros y rendimiento
-                            params_text = f"alpha:{self.alpha.get():.0f} | fl:{self.fl.get():.3f} | fh:{self.fh.get():.2f} | FPS:{fps_actual:.1f}"
-                            cv2.putText(frame, params_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
-                                       0.5, (255, 255, 255), 1)
-                            
-                            # Mostrar estado de optimizaciones
-                            if self.use_parallel_processing.get() or self.use_frame_skip.get():
-                                optim_text = f""
-                                if self.use_parallel_processing.get():
-                                    optim_text += f" Parallel({self.max_workers})"
-                                if self.use_frame_skip.get():
-                                    optim_text += f" Skip(1/{self.skip_frames.get()})"
-                                cv2.putText(frame, optim_text, (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 
-                                           0.4, (0, 255, 255), 1)
-                            
-
-                            # Datos para gráficas según método seleccionado
-                            if self.vibration_method.get() == 'flujo':
-                                # Usar la magnitud promedio del flujo óptico
-                                if flow_result and len(flow_result) == 2:
-                                    mean_signal = flow_result[0]
-                                else:
-                                    mean_signal = 0
-                            else:
-                                # Usar el brillo promedio del ROI magnificado
-                                if out is not None:
-                                    mean_signal = np.mean(out)
-                                else:
-                                    mean_signal = 0
-                            self.signal_buffer.append(mean_signal)
-                            
-                            # Guardar en CSV de grabación solo si está activa
-                            if self.is_recording and self.csv_writer:
-                                try:
-                                    timestamp_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                                    if self.is_calibrated:
-                                        self.csv_writer.writerow([self.frame_count, timestamp_str, 
-                                                               mean_magnitude, physical_value, mean_signal, 
-                                                               self.mm_per_pixel.get()])
-                                    else:
-                                        self.csv_writer.writerow([self.frame_count, timestamp_str, 
-                                                               mean_magnitude, mean_signal])
-                                    self.csv_file.flush()
-                                except Exception as e:
-                                    self.log_message(f"Error escribiendo a CSV de grabación: {str(e)}")
-                            
-                            # Enviar datos para gráficas
-                            try:
-                                self.data_queue.put({
-                                    'signal': list(self.signal_buffer),
-                                    'frame_count': self.frame_count
-                                }, block=False)
-                            except queue.Full:
-                                pass  # Skip si la queue está llena
-                            
-                            # Monitorear rendimiento y optimizar automáticamente
-                            self.monitor_performance(processing_time)
-                            
+                if self.is_calibrated:
+                    recorder.append(item['frame_count'], item['timestamp'].timestamp(),
+                                    sample['mean_magnitude'], sample['physical_value'], sample['mean_signal'],
+                                    self.mm_per_pixel.get())
                 else:
-                    # Si no hay ROI, mostrar mensaje optimizado
-                    cv2.putText(frame, "Selecciona ROI para comenzar analisis", 
-                               (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-                    cv2.putText(frame, f"Cam {self.selected_camera.get()} | FPS: {self.fps.get()}", 
-                               (10, frame.shape[0]-20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                    
-                # Enviar frame para visualización con control de queue
-                try:
-                    # Limpiar queue si está lleno para evitar lag
-                    while self.video_queue.qsize() > 2:
-                        try:
-                            self.video_queue.get_nowait()
-                        except queue.Empty:
-                            break
-                    self.video_queue.put(frame.copy(), block=False)
-                except queue.Full:
-                    pass  # Skip frame si no hay espacio
-                
-                # Control de FPS adaptativo
-                target_frame_time = 1.0 / self.fps.get()
-                elapsed_time = time.time() - frame_start_time
-                if elapsed_time < target_frame_time:
-                    time.sleep(target_frame_time - elapsed_time)
-                    
+                    recorder.append(item['frame_count'], item['timestamp'].timestamp(),
+                                    sample['mean_magnitude'], sample['mean_signal'])
             except Exception as e:
-                self.log_message(f"Error en procesamiento: {str(e)}")
-                time.sleep(0.1)  # Pausa breve antes de reintentar
-                
-        # Limpiar recursos al terminar
-        self.executor.shutdown(wait=False)
-        self.log_message("Loop de procesamiento terminado")
+                self.log_message(f"Error escribiendo grabación binaria ({channel.name}): {str(e)}")
+        csv_writer = channel.csv_writer
+        if csv_writer:
+            try:
+                timestamp_str = item['timestamp'].strftime("%Y-%m-%d %H:%M:%S")
+                if self.is_calibrated:
+                    csv_writer.writerow([item['frame_count'], timestamp_str, 
+                                         sample['mean_magnitude'], sample['physical_value'], sample['mean_signal'], 
+                                         self.mm_per_pixel.get()])
+                else:
+                    csv_writer.writerow([item['frame_count'], timestamp_str, 
+                                         sample['mean_magnitude'], sample['mean_signal']])
+                channel.csv_file.flush()
+            except Exception as e:
+                self.log_message(f"Error escribiendo a CSV de grabación ({channel.name}): {str(e)}")
+    
+    def log_pipeline_stats(self):
+        """Registrar en consola la latencia p95 por etapa y los frames descartados"""
+        if self.pipeline is None:
+            return
+        stats = self.pipeline.stats()
+        stages_text = " | ".join(f"{name} {s['p95_ms']:.1f}ms" for name, s in stats['stages'].items())
+        dropped = sum(stats['dropped'].values())
+        self.log_message(f"Pipeline p95: {stages_text} | total {stats['end_to_end']['p95_ms']:.1f}ms "
+                         f"| descartados {dropped}")
         
     def update_graphs(self):
-        """Actualizar las gráficas"""
+        """Actualizar las gráficas con la última muestra disponible"""
+        data = None
         try:
+            # Solo se dibuja el dato más reciente; los intermedios ya están obsoletos
             while True:
                 data = self.data_queue.get_nowait()
-                signal_data = data['signal']
-                if len(signal_data) > 1:
-                    x_vals = range(len(signal_data))
-                    self.line1.set_data(x_vals, signal_data)
-                    self.ax1.set_xlim(0, len(signal_data))
-                    # Mejorar escala y márgenes
-                    y_min, y_max = min(signal_data), max(signal_data)
-                    y_pad = (y_max - y_min) * 0.1 if y_max > y_min else 1
-                    self.ax1.set_ylim(y_min - y_pad, y_max + y_pad)
-
-                    # Etiquetas y unidades dinámicas
-                    if self.vibration_method.get() == 'flujo':
-                        y_label = "Magnitud media flujo óptico"
-                    else:
-                        y_label = "Brillo medio ROI"
-                    if self.is_calibrated:
-                        y_label += " (mm/s)"
-                    else:
-                        y_label += " (px/frame)"
-                    self.ax1.set_ylabel(y_label)
-
-                    # Título dinámico
-                    method = self.vibration_method.get()
-                    if method == 'flujo':
-                        title = "Señal de Vibración (Flujo óptico)"
-                    else:
-                        title = "Señal de Vibración (Brillo)"
-                    self.ax1.set_title(title, fontsize=12, fontweight='bold')
-
-                    # Estadísticas señal
-                    rms = np.sqrt(np.mean(np.square(signal_data)))
-                    mean = np.mean(signal_data)
-                    min_val = np.min(signal_data)
-                    max_val = np.max(signal_data)
-                    stats_text = f"RMS: {rms:.2f}  Media: {mean:.2f}  Min: {min_val:.2f}  Max: {max_val:.2f}"
-                    # Borrar textos previos
-                    if hasattr(self, '_signal_stats_text') and self._signal_stats_text:
-                        self._signal_stats_text.remove()
-                    self._signal_stats_text = self.ax1.text(0.01, 0.98, stats_text, transform=self.ax1.transAxes,
-                        fontsize=9, color='black', verticalalignment='top', bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
-
-                    # Líneas de referencia
-                    for line in getattr(self, '_signal_ref_lines', []):
-                        line.remove()
-                    self._signal_ref_lines = [
-                        self.ax1.axhline(mean, color='g', linestyle='--', linewidth=1, alpha=0.5, label='Media'),
-                        self.ax1.axhline(rms, color='m', linestyle=':', linewidth=1, alpha=0.5, label='RMS'),
-                    ]
-
-                    self.ax1.grid(True, which='both', linestyle=':', alpha=0.4)
-                    self.ax1.legend(loc='upper right', fontsize=9, frameon=True)
-
-                    # FFT con filtro pasa-alta real si está habilitado
-                    if len(signal_data) >= 32:
-                        signal_arr = np.array(signal_data) - np.mean(signal_data)
-                        freqs = np.fft.rfftfreq(len(signal_arr), d=1.0/self.get_effective_fps())
-                        fft_vals = None
-                        # Filtro pasa-alta real
-                        if self.fft_highpass_enabled.get():
-                            from scipy.signal import butter, filtfilt
-                            cutoff = self.fft_cutoff_freq.get()
-                            fs = self.get_effective_fps()
-                            # Normalizar frecuencia de corte
-                            wn = cutoff / (0.5 * fs)
-                            if wn < 1.0:
-                                b, a = butter(2, wn, btype='high')
-                                filtered_signal = filtfilt(b, a, signal_arr)
-                                fft_vals = np.abs(np.fft.rfft(filtered_signal))
-                            else:
-                                fft_vals = np.abs(np.fft.rfft(signal_arr))
-                        else:
-                            fft_vals = np.abs(np.fft.rfft(signal_arr))
-
-                        # Graficar FFT
-                        self.line2.set_data(freqs[1:], fft_vals[1:])
-                        fft_xmax = 15
-                        if self.fft_highpass_enabled.get():
-                            cutoff = self.fft_cutoff_freq.get()
-                            self.ax2.set_xlim(cutoff, fft_xmax)
-                            if len(freqs) > 1:
-                                self.ax2.set_ylim(0, max(fft_vals[1:]) * 1.1)
-                            else:
-                                self.ax2.set_ylim(0, 1)
-                        else:
-                            self.ax2.set_xlim(0, fft_xmax)
-                            self.ax2.set_ylim(0, max(fft_vals[1:]) * 1.1 if len(fft_vals) > 1 else 1)
-
-                        # Etiquetas y título FFT
-                        if self.is_calibrated:
-                            self.ax2.set_ylabel("Magnitud (mm/s)")
-                            self.ax2.set_title("Espectro de Velocidad (FFT)")
-                        else:
-                            self.ax2.set_ylabel("Magnitud (px/frame)")
-                            self.ax2.set_title("Espectro de Frecuencias (FFT)")
-
-                        # Estadísticas FFT
-                        fft_peak_idx = np.argmax(fft_vals[1:]) + 1 if len(fft_vals) > 1 else 0
-                        fft_peak_freq = freqs[fft_peak_idx] if fft_peak_idx > 0 else 0
-                        fft_peak_val = fft_vals[fft_peak_idx] if fft_peak_idx > 0 else 0
-                        fft_stats = f"Pico: {fft_peak_freq:.2f} Hz ({fft_peak_val:.2f})"
-                        if hasattr(self, '_fft_stats_text') and self._fft_stats_text:
-                            self._fft_stats_text.remove()
-                        self._fft_stats_text = self.ax2.text(0.01, 0.98, fft_stats, transform=self.ax2.transAxes,
-                            fontsize=9, color='black', verticalalignment='top', bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
-
-                        # Línea de referencia en pico
-                        for line in getattr(self, '_fft_ref_lines', []):
-                            line.remove()
-                        self._fft_ref_lines = []
-                        if fft_peak_idx > 0:
-                            self._fft_ref_lines.append(
-                                self.ax2.axvline(fft_peak_freq, color='r', linestyle='--', linewidth=1, alpha=0.5, label='Pico')
-                            )
-
-                        self.ax2.grid(True, which='both', linestyle=':', alpha=0.4)
-                        self.ax2.legend(loc='upper right', fontsize=9, frameon=True)
-
-                    self.canvas.draw()
         except queue.Empty:
             pass
+        if data is not None and len(data['signal']) > 1:
+            try:
+                if self.fast_plotting.get():
+                    self.draw_graphs_blit(data)
+                else:
+                    self.draw_graphs_full(data)
+            except Exception as e:
+                self.log_message(f"Error actualizando gráficas: {str(e)}")
         if self.root.winfo_exists():
-            self.root.after(100, self.update_graphs)
-
-
-# Clases auxiliares del código original
-def reconPyr(pyr):
-    """Reconstruye la imagen a partir de su pirámide Laplaciana."""
-    filt2 = pt.binomial_filter(5)
-    maxLev = len(pyr)
-    levs = range(0, maxLev)
-    res = []
-    for lev in range(maxLev-1, -1, -1):
-        if lev in levs and len(res) == 0:
-            res = pyr[lev]
-        elif len(res) != 0:
-            res_sz = res.shape
-            new_sz = pyr[lev].shape
-            if res_sz[0] == 1:
-                hi2 = pt.upConv(image=res, filt=filt2, step=(2,1), stop=(new_sz[1], new_sz[0])).T
-            elif res_sz[1] == 1:
-                hi2 = pt.upConv(image=res, filt=filt2.T, step=(1,2), stop=(new_sz[1], new_sz[0])).T
-            else:
-                hi = pt.upConv(image=res, filt=filt2, step=(2,1), stop=(new_sz[0], res_sz[1]))
-                hi2 = pt.upConv(image=hi, filt=filt2.T, step=(1,2), stop=(new_sz[0], new_sz[1]))
-            if lev in levs:
-                bandIm = pyr[lev]
-                res = hi2 + bandIm
-            else:
-                res = hi2
-    return res
-
-
-class Magnify(object):
-    """Clase para magnificar movimientos en una secuencia de imágenes."""
-    def __init__(self, gray1, alpha, lambda_c, fl, fh, samplingRate):
-        [low_a, low_b] = signal.butter(1, fl/samplingRate, 'low')
-        [high_a, high_b] = signal.butter(1, fh/samplingRate, 'low')
-        py1 = pt.pyramids.LaplacianPyramid(gray1)
-        py1._build_pyr()
-        pyramid_1 = py1.pyr_coeffs
-        nLevels = len(pyramid_1)
-        self.filtered = pyramid_1
-        self.alpha = alpha
-        self.fl = fl
-        self.fh = fh
-        self.samplingRate = samplingRate
-        self.low_a = low_a
-        self.low_b = low_b
-        self.high_a = high_a
-        self.high_b = high_b
-        self.width = gray1.shape[0]
-        self.height = gray1.shape[1]
-        self.gray1 = img_as_float(gray1)
-        self.lowpass1 = copy.deepcopy(pyramid_1)
-        self.lowpass2 = copy.deepcopy(self.lowpass1)
-        self.pyr_prev = copy.deepcopy(pyramid_1)
-        self.filtered = [None for _ in range(nLevels)]
-        self.nLevels = nLevels
-        self.lambd = (self.width**2 + self.height**2) / 3.
-        self.lambda_c = lambda_c
-        self.delta = self.lambda_c / 8. / (1 + self.alpha)
-
-    def Magnify(self, gray2):
-        """Magnifica los movimientos en la imagen gray2."""
-        gray2 = img_as_float(gray2)
-        py2 = pt.pyramids.LaplacianPyramid(gray2)
-        py2._build_pyr()
-        pyr = py2.pyr_coeffs
-        nLevels = self.nLevels
-        for u in range(nLevels):
-            self.lowpass1[(u,0)] = (-self.high_b[1]*self.lowpass1[(u,0)] + self.high_a[0]*pyr[(u,0)] + self.high_a[1]*self.pyr_prev[(u,0)]) / self.high_b[0]
-            self.lowpass2[(u,0)] = (-self.low_b[1]*self.lowpass2[(u,0)] + self.low_a[0]*pyr[(u,0)] + self.low_a[1]*self.pyr_prev[(u,0)]) / self.low_b[0]
-            self.filtered[u] = self.lowpass1[(u,0)] - self.lowpass2[(u,0)]
-        self.pyr_prev = copy.deepcopy(pyr)
-        exaggeration_factor = 3 # Factor de exageración para mejorar visibilidad
-        lambd = self.lambd
-        delta = self.delta
-        filtered = self.filtered
-        for l in range(nLevels-1, -1, -1):
-            currAlpha = lambd / delta / 8. - 1
-            currAlpha = currAlpha * exaggeration_factor
-            if (l == nLevels - 1 or l == 0):
-                filtered[l] = np.zeros(np.shape(filtered[l]))
-            elif (currAlpha > self.alpha):
-                filtered[l] = self.alpha * filtered[l]
-            else:
-                filtered[l] = currAlpha * filtered[l]
-            lambd = lambd / 2.
-        output = reconPyr(filtered)
-        output = gray2 + output
-        output[output < 0] = 0
-        output[output > 1] = 1
-        output = img_as_ubyte(output)
-        return output
+            self.root.after(self.graph_update_interval, self.update_graphs)
+    
+    def graph_labels(self):
+        """Títulos y etiquetas de las gráficas según método y calibración"""
+        method = self.vibration_method.get()
+        if method == 'flujo':
+            signal_ylabel = "Magnitud media flujo óptico"
+            signal_title = "Señal de Vibración (Flujo óptico)"
+        elif method == 'flujo_sparse':
+            signal_ylabel = f"Desplazamiento eje {self.sparse_axis.get()}"
+            signal_title = "Señal de Vibración (Flujo disperso LK)"
+        else:
+            signal_ylabel = "Brillo medio ROI"
+            signal_title = "Señal de Vibración (Brillo)"
+        if self.is_calibrated:
+            return (signal_title, signal_ylabel + " (mm/s)",
+                    "Espectro de Velocidad (FFT)", "Magnitud (mm/s)")
+        return (signal_title, signal_ylabel + " (px/frame)",
+                "Espectro de Frecuencias (FFT)", "Magnitud (px/frame)")
+    
+    def spectrum_snapshot(self):
+        """Espectro actual con el pasa-alta aplicado si está habilitado"""
+        fs = self.get_effective_fps()
+        freqs, fft_vals = self.spectrum.magnitude(fs)
+        if self.fft_highpass_enabled.get():
+            # Equivale en magnitud a butter + filtfilt; pesos cacheados hasta cambiar corte o FPS
+            self.fft_highpass.apply(freqs, fft_vals, self.fft_cutoff_freq.get(), fs)
+        return freqs, fft_vals
+    
+    def toggle_fast_plotting(self):
+        """Cambia entre blitting y redibujado completo de las gráficas"""
+        if self.fast_plotting.get():
+            self.live_plot.enable()
+            self.log_message("Gráficas: modo rápido (blitting)")
+        else:
+            self.live_plot.disable()
+            self.canvas.draw_idle()
+            self.log_message("Gráficas: redibujado completo")
+    
+    def draw_graphs_blit(self, data):
+        """Modo rápido: artistas reutilizados y blit; redibujado completo solo si cambia el layout"""
+        signal_title, signal_ylabel, fft_title, fft_ylabel = self.graph_labels()
+        self.live_plot.update_signal(data['signal'], self.signal_buffer.maxlen, signal_title, signal_ylabel)
+        if len(self.spectrum) >= 32:
+            freqs, fft_vals = self.spectrum_snapshot()
+            fft_xmin = self.fft_cutoff_freq.get() if self.fft_highpass_enabled.get() else 0
+            self.live_plot.update_spectrum(freqs, fft_vals, (fft_xmin, 15), fft_title, fft_ylabel)
+        self.live_plot.render()
     
+    def draw_graphs_full(self, data):
+        """Modo clásico: recrea textos, referencias y leyendas y redibuja toda la figura"""
+        signal_data = data['signal']
+        if len(signal_data) > 1:
+            signal_title, signal_ylabel, fft_title, fft_ylabel = self.graph_labels()
+            self.classic_plot.update_signal(signal_data, signal_title, signal_ylabel)
+            # FFT incremental (DFT deslizante) con pasa-alta aplicado en frecuencia
+            if len(self.spectrum) >= 32:
+                freqs, fft_vals = self.spectrum_snapshot()
+                fft_xmin = self.fft_cutoff_freq.get() if self.fft_highpass_enabled.get() else 0
+                self.classic_plot.update_spectrum(freqs, fft_vals, (fft_xmin, 15), fft_title, fft_ylabel)
+            self.classic_plot.render()
 
 if __name__ == "__main__":
     root = tk.Tk()
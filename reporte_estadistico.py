@@ -1,29 +1,47 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import pandas as pd
-import matplotlib.pyplot as plt
-from fpdf import FPDF
+from fpdf import FPDF, FPDF_VERSION
+from PIL import Image
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from src.decimation import minmax_envelope
+
+# Tamaño de las figuras de señal y espectro (pulgadas, dpi de matplotlib por defecto)
+FIGURE_SIZE = (8, 3)
+FIGURE_DPI = 100
+
+# Figura reutilizada por proceso (o por hilo en modo secuencial)
+_figura_reutilizada = None
+
 
 class PDF(FPDF):
     def header(self):
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, 'Reporte Estadístico de Señal', 0, 1, 'C')
+        self.set_font('Helvetica', 'B', 12)
+        self.cell(0, 10, 'Reporte Estadístico de Señal', align='C', new_x='LMARGIN', new_y='NEXT')
         self.ln(5)
 
     def chapter_title(self, title):
-        self.set_font('Arial', 'B', 11)
-        self.cell(0, 10, title, 0, 1, 'L')
+        self.set_font('Helvetica', 'B', 11)
+        self.cell(0, 10, title, new_x='LMARGIN', new_y='NEXT')
         self.ln(2)
 
     def chapter_body(self, body):
-        self.set_font('Arial', '', 10)
+        self.set_font('Helvetica', '', 10)
         self.multi_cell(0, 8, body)
         self.ln()
 
-    def add_image(self, image_path, w=180):
-        self.image(image_path, w=w)
+    def add_image(self, image, w=180):
+        """Inserta una imagen desde ruta o desde un array RGB uint8 en memoria"""
+        if isinstance(image, np.ndarray):
+            # Imagen PIL en memoria: sin PNG temporal en disco
+            image = Image.fromarray(image)
+        self.image(image, w=w)
         self.ln(5)
 
 def calcular_estadisticas(df):
@@ -31,23 +49,41 @@ def calcular_estadisticas(df):
     stats.rename(columns={'50%': 'median'}, inplace=True)
     return stats
 
-def generar_graficos(df, output_dir, base_filename):
-    image_paths = []
-    fft_image_paths = []
+def obtener_figura():
+    """Figura Agg reutilizada entre gráficos (no usa pyplot: seguro en hilos y procesos)"""
+    global _figura_reutilizada
+    if _figura_reutilizada is None:
+        _figura_reutilizada = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+        FigureCanvasAgg(_figura_reutilizada)
+    return _figura_reutilizada
+
+def renderizar(fig, x, y, label, title, xlabel, ylabel):
+    """
+    Dibuja una curva en fig y devuelve la imagen RGB en memoria.
+    La curva se decima a su envolvente min/max al ancho en píxeles de la figura,
+    así el tiempo de dibujo no depende de la longitud de la señal.
+    """
+    fig.clear()
+    ax = fig.add_subplot(111)
+    idx, y = minmax_envelope(y, int(fig.get_figwidth() * fig.dpi))
+    ax.plot(np.asarray(x)[idx], y, label=label)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    fig.tight_layout()
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+
+def generar_graficos(df, fig=None):
+    """Imágenes RGB de señal y espectro por columna numérica y picos FFT dominantes"""
+    fig = fig or obtener_figura()
+    images = []
+    fft_images = []
     fft_peaks_dict = {}
     for col in df.select_dtypes(include='number').columns:
         # Gráfico de la señal
-        plt.figure(figsize=(8, 3))
-        plt.plot(df[col], label=col)
-        plt.title(f'Señal: {col}')
-        plt.xlabel('Índice')
-        plt.ylabel('Valor')
-        plt.legend()
-        img_path = os.path.join(output_dir, f'{base_filename}_{col}_plot.png')
-        plt.tight_layout()
-        plt.savefig(img_path)
-        plt.close()
-        image_paths.append(img_path)
+        images.append(renderizar(fig, df.index, df[col].values, col, f'Señal: {col}', 'Índice', 'Valor'))
 
         # FFT y espectro
         x = df[col].values
@@ -57,17 +93,8 @@ def generar_graficos(df, output_dir, base_filename):
         fft_freqs = np.fft.rfftfreq(n, d=1.0)  # d=1.0: asume frecuencia de muestreo 1 Hz
         fft_mags = np.abs(fft_vals)
         # Gráfico espectro
-        plt.figure(figsize=(8, 3))
-        plt.plot(fft_freqs, fft_mags, label=f'FFT {col}')
-        plt.title(f'Espectro de Frecuencia (FFT): {col}')
-        plt.xlabel('Frecuencia [Hz]')
-        plt.ylabel('Magnitud')
-        plt.legend()
-        fft_img_path = os.path.join(output_dir, f'{base_filename}_{col}_fft.png')
-        plt.tight_layout()
-        plt.savefig(fft_img_path)
-        plt.close()
-        fft_image_paths.append(fft_img_path)
+        fft_images.append(renderizar(fig, fft_freqs, fft_mags, f'FFT {col}',
+                                     f'Espectro de Frecuencia (FFT): {col}', 'Frecuencia [Hz]', 'Magnitud'))
 
         # Frecuencias dominantes (3 picos principales, ignorando DC)
         if len(fft_mags) > 1:
@@ -78,15 +105,19 @@ def generar_graficos(df, output_dir, base_filename):
             fft_peaks_dict[col] = peaks
         else:
             fft_peaks_dict[col] = []
-    return image_paths, fft_image_paths, fft_peaks_dict
+    return images, fft_images, fft_peaks_dict
 
-def generar_pdf(stats, image_paths, fft_image_paths, fft_peaks_dict, output_pdf):
+def generar_pdf(stats, images, fft_images, fft_peaks_dict, output_pdf):
+    # fpdf2 >= 2.5.2 (paquete 'fpdf2', se importa como fpdf): image() acepta imágenes PIL en memoria
+    if int(FPDF_VERSION.split('.')[0]) < 2:
+        raise RuntimeError(f"Se requiere fpdf2 (instalado fpdf {FPDF_VERSION}): "
+                           "pip uninstall fpdf && pip install fpdf2")
     pdf = PDF()
     pdf.add_page()
     pdf.chapter_title('Estadísticas básicas:')
     body = stats.to_string()
     pdf.chapter_body(body)
-    for img in image_paths:
+    for img in images:
         pdf.add_image(img)
     pdf.chapter_title('Análisis de Frecuencias (FFT):')
     for col, peaks in fft_peaks_dict.items():
@@ -96,7 +127,7 @@ def generar_pdf(stats, image_paths, fft_image_paths, fft_peaks_dict, output_pdf)
         else:
             peak_str = 'No se detectaron picos significativos.'
         pdf.chapter_body(peak_str)
-    for img in fft_image_paths:
+    for img in fft_images:
         pdf.add_image(img)
     pdf.output(output_pdf)
 
@@ -107,23 +138,49 @@ def procesar_archivo(csv_path):
     stats = calcular_estadisticas(df)
     output_dir = os.path.dirname(csv_path)
     base_filename = os.path.splitext(os.path.basename(csv_path))[0]
-    image_paths, fft_image_paths, fft_peaks_dict = generar_graficos(df, output_dir, base_filename)
+    images, fft_images, fft_peaks_dict = generar_graficos(df)
     output_pdf = os.path.join(output_dir, f'{base_filename}_reporte.pdf')
-    generar_pdf(stats, image_paths, fft_image_paths, fft_peaks_dict, output_pdf)
-    for img in image_paths + fft_image_paths:
-        os.remove(img)
+    generar_pdf(stats, images, fft_images, fft_peaks_dict, output_pdf)
     return output_pdf
 
-def generar_reportes_para_archivos(file_paths):
-    """Genera reportes PDF para una lista de archivos CSV. Devuelve lista de rutas de PDF generados."""
-    reportes = []
-    for path in file_paths:
-        try:
-            pdf_path = procesar_archivo(path)
-            reportes.append(pdf_path)
-        except Exception as e:
-            print(f'Error procesando {path}: {e}')
-    return reportes
+def _procesar_archivo_seguro(csv_path):
+    """procesar_archivo para el pool: devuelve (ruta_pdf, None) o (None, mensaje de error)"""
+    try:
+        return procesar_archivo(csv_path), None
+    except Exception as e:
+        return None, str(e)
+
+def generar_reportes_para_archivos(file_paths, progress_callback=None, max_workers=None):
+    """
+    Genera reportes PDF para una lista de archivos CSV. Devuelve lista de rutas de PDF generados.
+    Con varios archivos reparte el trabajo en un pool de procesos (max_workers=1: secuencial).
+    progress_callback(hechos, total, ruta_csv, ruta_pdf_o_None, error_o_None) se llama al terminar cada archivo.
+    """
+    file_paths = list(file_paths)
+    total = len(file_paths)
+    if max_workers is None:
+        max_workers = min(total, os.cpu_count() or 1)
+    resultados = {}
+
+    def registrar(done, path, pdf_path, error):
+        if error:
+            print(f'Error procesando {path}: {error}')
+        resultados[path] = pdf_path
+        if progress_callback:
+            progress_callback(done, total, path, pdf_path, error)
+
+    if max_workers <= 1 or total <= 1:
+        for done, path in enumerate(file_paths, 1):
+            registrar(done, path, *_procesar_archivo_seguro(path))
+    else:
+        # 'spawn': mismo comportamiento en todas las plataformas y seguro con Tk/hilos en el padre
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as executor:
+            futures = {executor.submit(_procesar_archivo_seguro, path): path for path in file_paths}
+            for done, future in enumerate(as_completed(futures), 1):
+                registrar(done, futures[future], *future.result())
+    # Mismo orden que la entrada
+    return [resultados[path] for path in file_paths if resultados.get(path)]
 
 def seleccionar_archivos():
     file_paths = filedialog.askopenfilenames(
@@ -132,13 +189,15 @@ def seleccionar_archivos():
     )
     if not file_paths:
         return
-    reportes = []
-    for path in file_paths:
-        try:
-            pdf_path = procesar_archivo(path)
-            reportes.append(pdf_path)
-        except Exception as e:
-            messagebox.showerror('Error', f'Error procesando {path}: {e}')
+    errores = []
+
+    def registrar_error(done, total, path, pdf_path, error):
+        if error:
+            errores.append(f'{path}: {error}')
+
+    reportes = generar_reportes_para_archivos(file_paths, progress_callback=registrar_error)
+    if errores:
+        messagebox.showerror('Error', 'Error procesando:\n' + '\n'.join(errores))
     if reportes:
         messagebox.showinfo('Listo', f'Reportes generados:\n' + '\n'.join(reportes))
 
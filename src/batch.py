@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Magnificación de movimiento por lotes sobre videos grabados (sin GUI)
+Escribe el video magnificado y el CSV de señal por frame, e informa el rendimiento.
+
+Uso:
+    python -m src.batch entrada.avi --roi 100,80,320,240 --output salida.avi
+"""
+
+import argparse
+import csv
+import os
+import time
+
+import cv2
+
+from src.magnify import create_engine, MAGNIFICATION_ENGINES, PYRAMID_BACKENDS, PRECISIONS
+from src.temporal_filter import TEMPORAL_FILTERS
+from src.utils import load_config, validate_roi, vibration_sample, format_time_duration
+
+# Codec de salida según la extensión del archivo
+FOURCC_BY_EXTENSION = {'.avi': 'MJPG', '.mp4': 'mp4v', '.mkv': 'XVID'}
+
+
+def parse_roi(text):
+    """Convierte 'x,y,w,h' en tupla de enteros"""
+    roi = tuple(int(v) for v in text.split(','))
+    if len(roi) != 4:
+        raise argparse.ArgumentTypeError(f"ROI inválido '{text}', se esperaba x,y,w,h")
+    return roi
+
+
+def process_video(input_path, output_path, csv_path, roi=None, alpha=200.0, lambda_c=80.0,
+                  fl=0.5, fh=9.0, fps=None, pyramid_backend='pyrtools', precision='float64',
+                  flow_params=None, progress_callback=None, engine='lineal', temporal_filter='primer_orden',
+                  filter_order=2, filter_taps=31):
+    """
+    Procesa un video completo con el motor Magnify.
+    Args:
+        roi: (x, y, w, h) o None para el frame completo
+        fps: frecuencia de muestreo para el filtro temporal (None = la del video)
+        engine: motor de magnificación ('lineal' o 'riesz')
+        temporal_filter, filter_order, filter_taps: filtro temporal (ver src.temporal_filter)
+        progress_callback: función opcional (frames_procesados, total_frames)
+    Returns:
+        dict con 'frames', 'seconds', 'fps' (throughput) y 'video_fps'
+    """
+    capture = cv2.VideoCapture(input_path)
+    if not capture.isOpened():
+        raise RuntimeError(f"No se pudo abrir el video {input_path}")
+    writer = None
+    csv_file = None
+    try:
+        video_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        sampling_rate = fps or video_fps
+        ret, frame = capture.read()
+        if not ret:
+            raise RuntimeError(f"El video {input_path} no contiene frames")
+        if roi is None:
+            roi = (0, 0, frame.shape[1], frame.shape[0])
+        if not validate_roi(roi, frame.shape, min_size=1):
+            raise ValueError(f"ROI {roi} fuera del frame ({frame.shape[1]}x{frame.shape[0]})")
+        x, y, w, h = roi
+        if flow_params is None:
+            flow_params = load_config()['processing_settings']['optical_flow_params']
+
+        roi_gray = cv2.GaussianBlur(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)[y:y+h, x:x+w], (5, 5), 0)
+        magnifier = create_engine(engine, roi_gray, alpha, lambda_c, fl, fh, sampling_rate,
+                                  pyramid_backend=pyramid_backend, precision=precision,
+                                  temporal_filter=temporal_filter, filter_order=filter_order,
+                                  filter_taps=filter_taps)
+
+        extension = os.path.splitext(output_path)[1].lower()
+        fourcc = cv2.VideoWriter_fourcc(*FOURCC_BY_EXTENSION.get(extension, 'MJPG'))
+        writer = cv2.VideoWriter(output_path, fourcc, video_fps, (frame.shape[1], frame.shape[0]))
+        if not writer.isOpened():
+            raise RuntimeError(f"No se pudo crear el video de salida {output_path}")
+        csv_file = open(csv_path, mode='w', newline='')
+        csv_writer = csv.writer(csv_file)
+        # Mismas columnas que las grabaciones de la GUI; timestamp = segundos de video
+        csv_writer.writerow(["frame", "timestamp", "mean_magnitude_px_frame", "mean_signal"])
+
+        prev_out = None
+        frame_count = 0
+        t_start = time.perf_counter()
+        while ret:
+            gray = cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY)
+            out = magnifier.Magnify(gray)
+            mean_magnitude, mean_signal = vibration_sample(prev_out, out, flow_params)
+            if prev_out is None:
+                prev_out = out.copy()
+            else:
+                prev_out[...] = out
+            frame_count += 1
+            csv_writer.writerow([frame_count, f"{(frame_count - 1) / video_fps:.4f}",
+                                 mean_magnitude, mean_signal])
+            cv2.cvtColor(out, cv2.COLOR_GRAY2BGR, dst=frame[y:y+h, x:x+w])
+            writer.write(frame)
+            if progress_callback:
+                progress_callback(frame_count, total_frames)
+            ret, frame = capture.read(frame)
+        elapsed = time.perf_counter() - t_start
+    finally:
+        capture.release()
+        if writer is not None:
+            writer.release()
+        if csv_file is not None:
+            csv_file.close()
+    return {'frames': frame_count, 'seconds': elapsed,
+            'fps': frame_count / elapsed if elapsed > 0 else 0.0, 'video_fps': video_fps}
+
+
+def main():
+    config = load_config()
+    defaults = config['default_settings']
+    processing = config['processing_settings']
+
+    parser = argparse.ArgumentParser(description="Magnificación de movimiento por lotes sobre videos grabados")
+    parser.add_argument('input', help="Video de entrada")
+    parser.add_argument('--output', help="Video magnificado de salida (por defecto <entrada>_magnificado.avi)")
+    parser.add_argument('--csv', help="CSV de señal por frame (por defecto <salida>.csv)")
+    parser.add_argument('--roi', type=parse_roi, help="ROI x,y,w,h (por defecto el frame completo)")
+    parser.add_argument('--alpha', type=float, default=defaults['alpha'])
+    parser.add_argument('--lambda-c', type=float, default=defaults['lambda_c'])
+    parser.add_argument('--fl', type=float, default=defaults['fl'])
+    parser.add_argument('--fh', type=float, default=defaults['fh'])
+    parser.add_argument('--fps', type=float, help="Frecuencia de muestreo (por defecto la del video)")
+    parser.add_argument('--backend', choices=PYRAMID_BACKENDS,
+                        default=processing.get('pyramid_backend', 'pyrtools'))
+    parser.add_argument('--precision', choices=PRECISIONS,
+                        default=processing.get('precision', 'float64'))
+    parser.add_argument('--engine', choices=MAGNIFICATION_ENGINES,
+                        default=processing.get('magnification_engine', 'lineal'),
+                        help="Motor de magnificación (riesz: por fase, no amplifica el ruido)")
+    parser.add_argument('--temporal-filter', choices=TEMPORAL_FILTERS,
+                        default=processing.get('temporal_filter', 'primer_orden'),
+                        help="Filtro temporal (butterworth/chebyshev/ventana: banco apilado de orden configurable)")
+    parser.add_argument('--filter-order', type=int, default=processing.get('temporal_filter_order', 2))
+    parser.add_argument('--filter-taps', type=int, default=processing.get('temporal_filter_taps', 31),
+                        help="Coeficientes del filtro 'ventana'")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.input)[0] + '_magnificado.avi'
+    csv_path = args.csv or os.path.splitext(output)[0] + '.csv'
+
+    def report_progress(done, total):
+        if done % 100 == 0:
+            print(f"Procesados {done}/{total if total > 0 else '?'} frames")
+
+    stats = process_video(args.input, output, csv_path, roi=args.roi, alpha=args.alpha,
+                          lambda_c=args.lambda_c, fl=args.fl, fh=args.fh, fps=args.fps,
+                          pyramid_backend=args.backend, precision=args.precision,
+                          flow_params=processing['optical_flow_params'],
+                          progress_callback=report_progress, engine=args.engine,
+                          temporal_filter=args.temporal_filter, filter_order=args.filter_order,
+                          filter_taps=args.filter_taps)
+    print(f"Video magnificado: {output}")
+    print(f"Señal por frame: {csv_path}")
+    print(f"{stats['frames']} frames en {format_time_duration(stats['seconds'])} "
+          f"-> {stats['fps']:.1f} frames/s (video a {stats['video_fps']:.1f} FPS)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Benchmark reproducible de los caminos críticos (sin cámara ni pantalla)
+Genera una textura desplazada sinusoidalmente (frecuencia y amplitud conocidas)
+para varios tamaños de ROI y mide, por backend de pirámide: Magnify, la
+reconstrucción de la pirámide, el flujo óptico Farneback, el seguimiento
+Lucas-Kanade disperso y el refresco de las gráficas. Informa frames/s, percentiles de latencia por frame y pico de memoria,
+y comprueba que la frecuencia dominante recuperada es la inyectada. Compara además los
+motores de magnificación (lineal y Riesz) en frames/s, SNR de la vibración y ganancia
+de ruido sobre clips sintéticos con ruido. --temporal-filter mide los motores con el
+filtro temporal apilado (src.temporal_filter) en lugar del de primer orden.
+
+Uso:
+    python -m src.benchmark
+    python -m src.benchmark --sizes 120x160,480x640 --frames 300 --json bench.json
+    python -m src.benchmark --no-graphs --noise 3 --precision float32
+    python -m src.benchmark --no-graphs --temporal-filter butterworth --filter-order 3
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from src.magnify import Magnify, MAGNIFICATION_ENGINES, PYRAMID_BACKENDS, PRECISIONS, create_engine, reconPyr, pt
+from src.profiling import TimingRing, summarize_ring
+from src.temporal_filter import TEMPORAL_FILTERS
+from src.pyramid import recon_laplacian_pyramid
+from src.sources import vibration_texture, shifted_texture
+from src.sparse_flow import SparseTracker
+from src.utils import load_config, vibration_sample
+
+DEFAULT_SIZES = ((64, 64), (120, 160), (240, 320), (480, 640))
+
+# Frecuencia relativa máxima admitida entre la frecuencia recuperada y la inyectada
+FREQ_TOLERANCE = 0.05
+
+
+def vibrating_pattern(shape, n_frames, fs=30.0, freq=4.0, amplitude_px=0.2, seed=0):
+    """
+    Frames uint8 de una textura desplazada horizontalmente amplitude_px * sin(2*pi*freq*t).
+    La textura lleva una rampa de intensidad para que el brillo medio de la ROI también
+    oscile a freq (la señal 'brillo' de la GUI), no solo el flujo óptico. El contraste es
+    moderado para que la salida magnificada no se sature (la saturación dobla la frecuencia).
+    """
+    texture, margin = vibration_texture(shape, amplitude_px, seed)
+    return [shifted_texture(texture, margin, shape, amplitude_px * np.sin(2 * np.pi * freq * i / fs))
+            for i in range(n_frames)]
+
+
+def dominant_frequency(signal_data, fs, min_freq=0.5):
+    """Frecuencia del pico del espectro (sin continua) de una señal muestreada a fs"""
+    signal_arr = np.asarray(signal_data, dtype=np.float64)
+    signal_arr = (signal_arr - signal_arr.mean()) * np.hanning(len(signal_arr))
+    fft_vals = np.abs(np.fft.rfft(signal_arr))
+    freqs = np.fft.rfftfreq(len(signal_arr), d=1.0 / fs)
+    fft_vals[freqs < min_freq] = 0
+    return float(freqs[np.argmax(fft_vals)])
+
+
+def _timed(fn, args_list):
+    """Ejecuta fn(*args) para cada args; devuelve (resultados, TimingRing)"""
+    ring = TimingRing(max(1, len(args_list)))
+    results = []
+    for args in args_list:
+        t_start = time.perf_counter()
+        results.append(fn(*args))
+        ring.add(time.perf_counter() - t_start)
+    return results, ring
+
+
+def _rate(ring):
+    total = ring.values().sum()
+    return ring.count / total if total > 0 else 0.0
+
+
+def vibration_snr(signal_data, fs, freq, min_freq=0.5):
+    """SNR (dB) de una señal de vibración: potencia del pico en freq frente a la mediana del resto del espectro"""
+    signal_arr = np.asarray(signal_data, dtype=np.float64)
+    power = np.abs(np.fft.rfft((signal_arr - signal_arr.mean()) * np.hanning(len(signal_arr)))) ** 2
+    freqs = np.fft.rfftfreq(len(signal_arr), d=1.0 / fs)
+    peak = int(np.argmin(np.abs(freqs - freq)))
+    rest = np.delete(power, peak)[np.delete(freqs, peak) >= min_freq]
+    return float(10 * np.log10(power[peak] / max(np.median(rest), 1e-20)))
+
+
+def noise_gain(engine, frames, warmup=30):
+    """Ruido temporal de la salida frente al de la entrada (desviación por píxel) en una escena estática"""
+    outputs = np.array([engine.Magnify(frame).astype(np.float32) for frame in frames])[warmup:]
+    inputs = np.array(frames[warmup:], dtype=np.float32)
+    return float(outputs.std(axis=0).mean() / max(inputs.std(axis=0).mean(), 1e-12))
+
+
+def bench_magnify(frames, backend, precision, fs, fl, fh, alpha=50.0, lambda_c=80.0, warmup=60, engine='lineal',
+                  temporal_filter='primer_orden', filter_order=2):
+    """
+    Magnificación frame a frame con el motor engine: latencias, pico de memoria y
+    salidas magnificadas. Los primeros warmup frames asientan el filtro temporal y no se miden.
+    """
+    kind = engine
+    options = dict(pyramid_backend=backend, precision=precision, temporal_filter=temporal_filter,
+                   filter_order=filter_order)
+    engine = create_engine(kind, frames[0], alpha, lambda_c, fl, fh, fs, **options)
+    for frame in frames[:warmup]:
+        engine.Magnify(frame)
+    outputs, ring = _timed(lambda f: engine.Magnify(f).copy(), [(f,) for f in frames[warmup:]])
+    # Memoria en una pasada aparte: tracemalloc ralentiza las asignaciones
+    engine = create_engine(kind, frames[0], alpha, lambda_c, fl, fh, fs, **options)
+    tracemalloc.start()
+    try:
+        for frame in frames[:30]:
+            engine.Magnify(frame)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result = summarize_ring(ring)
+    result.update(fps=_rate(ring), peak_mib=peak / 2**20)
+    return result, outputs
+
+
+def bench_recon(frame, backend, repeats=50):
+    """Colapso de la pirámide Laplaciana (reconPyr de pyrtools o la versión OpenCV)"""
+    engine = Magnify(frame, 200.0, 80.0, 1.0, 8.0, 30.0, pyramid_backend=backend)
+    pyr = [level.copy() for level in engine.build_pyramid(frame.astype(np.float64) / 255)]
+    recon = reconPyr if backend == 'pyrtools' else recon_laplacian_pyramid
+    _, ring = _timed(recon, [(pyr,)] * repeats)
+    result = summarize_ring(ring)
+    result.update(fps=_rate(ring))
+    return result
+
+
+def bench_flow(outputs, flow_params):
+    """Farneback entre frames magnificados consecutivos (mismo cálculo que la GUI)"""
+    pairs = list(zip(outputs[:-1], outputs[1:]))
+    samples, ring = _timed(lambda prev, cur: vibration_sample(prev, cur, flow_params), pairs)
+    result = summarize_ring(ring)
+    result.update(fps=_rate(ring))
+    return result, [magnitude for magnitude, _ in samples]
+
+
+def bench_sparse(outputs, sparse_params=None):
+    """Lucas-Kanade disperso entre frames magnificados consecutivos (método 'flujo_sparse')"""
+    tracker = SparseTracker(**(sparse_params or {}))
+    pairs = list(zip(outputs[:-1], outputs[1:]))
+    samples, ring = _timed(tracker.update, pairs)
+    result = summarize_ring(ring)
+    result.update(fps=_rate(ring))
+    # La textura se desplaza en horizontal: desplazamiento con signo del eje x
+    return result, [dx for dx, _ in samples]
+
+
+def bench_engines(shape, backend='opencv', precision='float64', n_frames=150, fs=30.0, freq=4.0,
+                  amplitude_px=0.2, alpha=50.0, fl=1.0, fh=8.0, noise_std=3.0, warmup=60, seed=0,
+                  temporal_filter='primer_orden', filter_order=2):
+    """
+    Compara los motores de magnificación sobre el patrón vibrante con ruido gaussiano:
+    frames/s, SNR (dB) de la vibración medida con Lucas-Kanade sobre la salida y
+    ganancia de ruido en la misma escena sin movimiento.
+    """
+    rng = np.random.default_rng(seed)
+    clean = vibrating_pattern(shape, n_frames + warmup, fs, freq, amplitude_px)
+    noisy = [np.clip(frame + rng.normal(0, noise_std, shape), 0, 255).astype(np.uint8) for frame in clean]
+    static = [np.clip(clean[0] + rng.normal(0, noise_std, shape), 0, 255).astype(np.uint8) for _ in range(90)]
+    cases = []
+    for engine in MAGNIFICATION_ENGINES:
+        magnify, outputs = bench_magnify(noisy, backend, precision, fs, fl, fh, alpha, warmup=warmup, engine=engine,
+                                         temporal_filter=temporal_filter, filter_order=filter_order)
+        _, displacement = bench_sparse(outputs)
+        static_engine = create_engine(engine, static[0], alpha, 80.0, fl, fh, fs, pyramid_backend=backend,
+                                      precision=precision, temporal_filter=temporal_filter,
+                                      filter_order=filter_order)
+        cases.append({'roi': f"{shape[0]}x{shape[1]}", 'engine': engine, 'magnify': magnify,
+                      'snr_db': vibration_snr(displacement, fs, freq),
+                      'noise_gain': noise_gain(static_engine, static),
+                      'freq': dominant_frequency(displacement, fs)})
+    return cases
+
+
+def bench_graphs(n_redraws=100):
+    """Refrescos/s de las gráficas en vivo (modo clásico y blitting, backend Agg)"""
+    from src.live_plot import benchmark_redraws
+    return benchmark_redraws(n_redraws=n_redraws)
+
+
+def run_suite(sizes=DEFAULT_SIZES, backends=None, precision='float64', n_frames=150, fs=30.0,
+              freq=4.0, amplitude_px=0.2, alpha=50.0, fl=1.0, fh=8.0, flow_params=None, graphs=True,
+              warmup=60, engines=True, noise_std=3.0, temporal_filter='primer_orden', filter_order=2, log=print):
+    """
+    Ejecuta el benchmark completo.
+    Returns:
+        dict serializable a JSON con un caso por (tamaño, backend), la comparación de
+        motores por tamaño ('engines'), el refresco de gráficas y 'passed' (todas las
+        frecuencias recuperadas dentro de la tolerancia)
+    """
+    if backends is None:
+        backends = [b for b in PYRAMID_BACKENDS if b != 'pyrtools' or pt is not None]
+    if flow_params is None:
+        flow_params = load_config()['processing_settings']['optical_flow_params']
+    report = {
+        'host': platform.node(), 'platform': platform.platform(), 'python': platform.python_version(),
+        'numpy': np.__version__, 'opencv': cv2.__version__,
+        'parameters': {'frames': n_frames, 'warmup': warmup, 'fs': fs, 'freq': freq,
+                       'amplitude_px': amplitude_px, 'alpha': alpha, 'fl': fl, 'fh': fh, 'precision': precision,
+                       'temporal_filter': temporal_filter, 'filter_order': filter_order},
+        'cases': [], 'passed': True,
+    }
+    for shape in sizes:
+        frames = vibrating_pattern(shape, n_frames + warmup, fs, freq, amplitude_px)
+        for backend in backends:
+            magnify, outputs = bench_magnify(frames, backend, precision, fs, fl, fh, alpha, warmup=warmup,
+                                             temporal_filter=temporal_filter, filter_order=filter_order)
+            recon = bench_recon(frames[0], backend)
+            flow, flow_signal = bench_flow(outputs, flow_params)
+            sparse, sparse_signal = bench_sparse(outputs)
+            brightness_freq = dominant_frequency([np.mean(out) for out in outputs], fs)
+            # La magnitud del flujo es |velocidad|: su pico está en 2*freq
+            flow_freq = dominant_frequency(flow_signal, fs) / 2
+            # El desplazamiento disperso conserva el signo: pico en freq
+            sparse_freq = dominant_frequency(sparse_signal, fs)
+            ok = all(abs(f - freq) <= FREQ_TOLERANCE * freq for f in (brightness_freq, flow_freq, sparse_freq))
+            report['passed'] &= ok
+            case = {'roi': f"{shape[0]}x{shape[1]}", 'backend': backend, 'magnify': magnify,
+                    'recon': recon, 'flow': flow, 'sparse_flow': sparse, 'brightness_freq': brightness_freq,
+                    'flow_freq': flow_freq, 'sparse_freq': sparse_freq, 'freq_ok': ok}
+            report['cases'].append(case)
+            log(f"{case['roi']:>8} {backend:>8} | Magnify {magnify['fps']:7.1f} f/s "
+                f"p50 {magnify['p50_ms']:6.2f} p95 {magnify['p95_ms']:6.2f} p99 {magnify['p99_ms']:6.2f} ms "
+                f"mem {magnify['peak_mib']:5.1f} MiB | recon p50 {recon['p50_ms']:6.2f} ms "
+                f"| flujo p50 {flow['p50_ms']:6.2f} ms | LK p50 {sparse['p50_ms']:5.2f} ms "
+                f"| f {brightness_freq:.2f}/{flow_freq:.2f}/{sparse_freq:.2f} Hz "
+                f"{'OK' if ok else 'FALLO'}")
+    if engines:
+        report['engines'] = []
+        backend = 'opencv' if 'opencv' in backends else backends[0]
+        for shape in sizes:
+            for case in bench_engines(shape, backend, precision, n_frames, fs, freq, amplitude_px, alpha, fl, fh,
+                                      noise_std, warmup, temporal_filter=temporal_filter,
+                                      filter_order=filter_order):
+                ok = abs(case['freq'] - freq) <= FREQ_TOLERANCE * freq
+                report['passed'] &= ok
+                report['engines'].append(case)
+                log(f"{case['roi']:>8} {case['engine']:>8} | {case['magnify']['fps']:7.1f} f/s "
+                    f"p50 {case['magnify']['p50_ms']:6.2f} ms | SNR {case['snr_db']:5.1f} dB "
+                    f"| ruido x{case['noise_gain']:.2f} (ruido de entrada {noise_std:g}) "
+                    f"| f {case['freq']:.2f} Hz {'OK' if ok else 'FALLO'}")
+    if graphs:
+        report['graphs'] = bench_graphs()
+        log(f"Gráficas: clásico {report['graphs']['clasico']:.1f} refrescos/s, "
+            f"blitting {report['graphs']['blit']:.1f} refrescos/s")
+    return report
+
+
+def parse_sizes(text):
+    """'120x160,480x640' -> [(120, 160), (480, 640)] (filas x columnas)"""
+    try:
+        return [tuple(int(v) for v in size.lower().split('x')) for size in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Tamaños inválidos '{text}', se esperaba FxC[,FxC...]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de Magnify, pirámide, flujo óptico (denso y disperso) y gráficas")
+    parser.add_argument('--sizes', type=parse_sizes, default=DEFAULT_SIZES,
+                        help="Tamaños de ROI filas x columnas (por defecto 64x64,120x160,240x320,480x640)")
+    parser.add_argument('--backends', default=None,
+                        help=f"Backends separados por comas ({', '.join(PYRAMID_BACKENDS)}; por defecto los instalados)")
+    parser.add_argument('--precision', choices=PRECISIONS, default='float64')
+    parser.add_argument('--frames', type=int, default=150, help="Frames medidos por caso")
+    parser.add_argument('--fs', type=float, default=30.0, help="Frecuencia de muestreo simulada (FPS)")
+    parser.add_argument('--freq', type=float, default=4.0, help="Frecuencia de vibración inyectada (Hz)")
+    parser.add_argument('--amplitude', type=float, default=0.2, help="Amplitud del desplazamiento (px)")
+    parser.add_argument('--alpha', type=float, default=50.0,
+                        help="Amplificación (valores altos saturan la salida del patrón sintético)")
+    parser.add_argument('--no-graphs', action='store_true', help="Omitir el benchmark de gráficas")
+    parser.add_argument('--no-engines', action='store_true', help="Omitir la comparación de motores (lineal/Riesz)")
+    parser.add_argument('--noise', type=float, default=3.0,
+                        help="Ruido gaussiano (niveles de gris) de los clips de la comparación de motores")
+    parser.add_argument('--temporal-filter', choices=TEMPORAL_FILTERS, default='primer_orden',
+                        help="Filtro temporal de los motores (butterworth/chebyshev/ventana: banco apilado)")
+    parser.add_argument('--filter-order', type=int, default=2, help="Orden del filtro temporal apilado")
+    parser.add_argument('--json', help="Guardar el informe completo en este archivo JSON")
+    args = parser.parse_args()
+
+    backends = args.backends.split(',') if args.backends else None
+    report = run_suite(args.sizes, backends, args.precision, args.frames, args.fs, args.freq,
+                       args.amplitude, args.alpha, graphs=not args.no_graphs, engines=not args.no_engines,
+                       noise_std=args.noise, temporal_filter=args.temporal_filter,
+                       filter_order=args.filter_order)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Informe guardado en {args.json}")
+    if not report['passed']:
+        print("ERROR: la frecuencia recuperada no coincide con la inyectada en algún caso")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
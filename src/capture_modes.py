@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Negociación del modo de captura de la cámara
+La frecuencia de muestreo limita la vibración medible (Nyquist = FPS/2). Muchas
+cámaras ofrecen modos de menor resolución con más FPS, normalmente solo en MJPG
+sobre USB 2; aquí se piden resolución, FPS y formato de píxel con CAP_PROP_* y
+se lee lo que la cámara aplicó realmente. El modo 'rapido' prueba una lista de
+modos candidatos y se queda con el de más frames/s medidos.
+
+Además, los backends que lo admiten (XIMEA) pueden entregar solo una ventana del
+sensor alrededor de las ROIs: se decodifica y transfiere solo esa zona.
+
+Especificación de modo (capture_mode en config.json):
+    ''                             modo por defecto de la cámara
+    640x480@60:MJPG                resolución, FPS y FOURCC (cada parte es opcional)
+    @120, 320x240, :YUYV           solo algunas partes
+    rapido                         probar HIGH_SPEED_CANDIDATES y elegir el más rápido
+"""
+
+import time
+from collections import namedtuple
+
+import cv2
+
+CaptureMode = namedtuple('CaptureMode', 'width height fps fourcc')
+
+FAST_MODE = 'rapido'
+
+# Modos probados por 'rapido', de más a menos FPS nominales
+HIGH_SPEED_CANDIDATES = (
+    CaptureMode(320, 240, 120.0, 'MJPG'),
+    CaptureMode(640, 480, 120.0, 'MJPG'),
+    CaptureMode(640, 480, 90.0, 'MJPG'),
+    CaptureMode(640, 480, 60.0, 'MJPG'),
+    CaptureMode(1280, 720, 60.0, 'MJPG'),
+)
+
+# FPS medidos que un candidato debe superar en este factor para desplazar a otro
+# de mayor resolución
+FAST_MODE_MARGIN = 1.1
+
+# Propiedades de ventana del sensor por backend: (offset x, offset y, ancho, alto)
+WINDOW_PROPS = {
+    'XIMEA': ('CAP_PROP_XI_OFFSET_X', 'CAP_PROP_XI_OFFSET_Y', 'CAP_PROP_XI_WIDTH', 'CAP_PROP_XI_HEIGHT'),
+}
+
+# Alineación de la ventana (los sensores suelen exigir múltiplos de 4 a 16 píxeles)
+WINDOW_ALIGN = 16
+
+
+def parse_capture_mode(text):
+    """
+    Convierte la especificación en CaptureMode (partes ausentes = None).
+    Returns:
+        None para el modo por defecto, FAST_MODE para 'rapido'
+    Raises:
+        ValueError si el formato no es válido
+    """
+    text = (text or '').strip()
+    if not text or text.lower() in ('defecto', 'default', 'none'):
+        return None
+    if text.lower() in (FAST_MODE, 'rápido', 'fast'):
+        return FAST_MODE
+    size, _, fourcc = text.partition(':')
+    size, _, fps = size.partition('@')
+    try:
+        width, height = (int(v) for v in size.lower().split('x')) if size else (None, None)
+        fps = float(fps) if fps else None
+    except ValueError:
+        raise ValueError(f"Modo de captura inválido '{text}', se esperaba AxH@FPS:FOURCC")
+    fourcc = fourcc.strip().upper() or None
+    if fourcc is not None and len(fourcc) != 4:
+        raise ValueError(f"FOURCC inválido '{fourcc}' (4 caracteres, p. ej. MJPG)")
+    return CaptureMode(width, height, fps, fourcc)
+
+
+def format_mode(mode):
+    """'640x480@60:MJPG' (o 'por defecto')"""
+    if mode is None:
+        return 'por defecto'
+    text = f"{mode.width}x{mode.height}" if mode.width and mode.height else ''
+    if mode.fps:
+        text += f"@{mode.fps:g}"
+    if mode.fourcc:
+        text += f":{mode.fourcc}"
+    return text
+
+
+def fourcc_text(value):
+    """Código FOURCC numérico de CAP_PROP_FOURCC -> texto ('' si no es imprimible)"""
+    code = int(value)
+    text = ''.join(chr((code >> 8 * i) & 0xFF) for i in range(4))
+    return text if text.isprintable() and text.strip() else ''
+
+
+def current_mode(capture):
+    """Modo aplicado según la propia cámara (FPS 0 o negativos -> None)"""
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    return CaptureMode(int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                       fps if fps and fps > 0 else None, fourcc_text(capture.get(cv2.CAP_PROP_FOURCC)) or None)
+
+
+def negotiate_mode(capture, mode):
+    """
+    Pide mode a la cámara: FOURCC antes que el tamaño (V4L2 descarta el tamaño si el
+    formato cambia después) y FPS al final. La cámara puede redondear o ignorar la
+    petición: se devuelve el modo realmente aplicado.
+    """
+    if mode.fourcc:
+        capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode.fourcc))
+    if mode.width:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, mode.width)
+    if mode.height:
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, mode.height)
+    if mode.fps:
+        capture.set(cv2.CAP_PROP_FPS, mode.fps)
+    return current_mode(capture)
+
+
+def measure_fps(capture, n_frames=30, warmup=5):
+    """Frames/s entregados realmente (el FPS que informa la cámara no siempre se cumple)"""
+    for _ in range(warmup):
+        if not capture.read()[0]:
+            return 0.0
+    t_start = time.perf_counter()
+    for _ in range(n_frames):
+        if not capture.read()[0]:
+            return 0.0
+    return n_frames / (time.perf_counter() - t_start)
+
+
+def select_fast_mode(capture, candidates=HIGH_SPEED_CANDIDATES, n_frames=30, log=None):
+    """
+    Prueba cada candidato que la cámara acepte (tamaño aplicado = pedido) y deja
+    aplicado el de más frames/s medidos; a igualdad (FAST_MODE_MARGIN) gana el de
+    mayor resolución.
+    Returns:
+        CaptureMode aplicado con fps = frames/s medidos, o None si no aceptó ninguno
+    """
+    best, best_fps = None, 0.0
+    for mode in candidates:
+        applied = negotiate_mode(capture, mode)
+        if (applied.width, applied.height) != (mode.width, mode.height):
+            continue
+        fps = measure_fps(capture, n_frames)
+        if log:
+            log(f"Modo {format_mode(applied)}: {fps:.1f} frames/s medidos")
+        larger = best is not None and applied.width * applied.height > best.width * best.height
+        if fps > best_fps * (1.0 / FAST_MODE_MARGIN if larger else FAST_MODE_MARGIN):
+            best, best_fps = applied, fps
+    if best is None:
+        return None
+    negotiate_mode(capture, best)
+    return best._replace(fps=round(best_fps, 1))
+
+
+def padded_window(rois, padding, frame_shape, align=WINDOW_ALIGN):
+    """
+    Ventana (x, y, w, h) que contiene todas las ROIs con padding píxeles de margen,
+    con origen y tamaño múltiplos de align y recortada al frame.
+    """
+    rows, cols = frame_shape[:2]
+    x0 = max(0, min(x for x, _, _, _ in rois) - padding) // align * align
+    y0 = max(0, min(y for _, y, _, _ in rois) - padding) // align * align
+    x1 = min(cols, -(-(max(x + w for x, _, w, _ in rois) + padding) // align) * align)
+    y1 = min(rows, -(-(max(y + h for _, y, _, h in rois) + padding) // align) * align)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def window_props(capture):
+    """Propiedades de ventana del backend de capture, o None si no admite ventanas"""
+    try:
+        names = WINDOW_PROPS.get(capture.getBackendName())
+    except cv2.error:
+        return None
+    if names is None or not all(hasattr(cv2, name) for name in names):
+        return None
+    return tuple(getattr(cv2, name) for name in names)
+
+
+def apply_window(capture, window, full_size):
+    """
+    Pide al sensor solo la ventana (x, y, w, h); window=None vuelve al sensor completo
+    full_size (ancho, alto). Devuelve False si el backend no admite ventanas.
+    """
+    props = window_props(capture)
+    if props is None:
+        return False
+    prop_x, prop_y, prop_w, prop_h = props
+    x, y, w, h = window if window is not None else (0, 0) + tuple(full_size)
+    # Offsets a 0 primero: el sensor rechaza offset + tamaño mayores que su resolución
+    capture.set(prop_x, 0)
+    capture.set(prop_y, 0)
+    ok = capture.set(prop_w, w) and capture.set(prop_h, h)
+    ok = ok and capture.set(prop_x, x) and capture.set(prop_y, y)
+    return bool(ok)
+
+
+if __name__ == "__main__":
+    assert parse_capture_mode('') is None and parse_capture_mode('rapido') == FAST_MODE
+    assert parse_capture_mode('640x480@60:mjpg') == CaptureMode(640, 480, 60.0, 'MJPG')
+    assert parse_capture_mode('@120') == CaptureMode(None, None, 120.0, None)
+    assert format_mode(parse_capture_mode('320x240@120:MJPG')) == '320x240@120:MJPG'
+    assert fourcc_text(cv2.VideoWriter_fourcc(*'YUYV')) == 'YUYV' and fourcc_text(0) == ''
+    for bad in ('640x@60', '640x480@x', ':MJPEG'):
+        try:
+            parse_capture_mode(bad)
+            raise AssertionError(bad)
+        except ValueError:
+            pass
+
+    window = padded_window([(100, 200, 120, 160), (400, 210, 50, 50)], 32, (720, 1280))
+    x, y, w, h = window
+    assert x % WINDOW_ALIGN == 0 and y % WINDOW_ALIGN == 0 and w % WINDOW_ALIGN == 0 and h % WINDOW_ALIGN == 0
+    assert x <= 68 and y <= 168 and x + w >= 482 and y + h >= 392
+    assert padded_window([(0, 0, 1270, 710)], 32, (720, 1280)) == (0, 0, 1280, 720)
+    print(f"Ventana de 2 ROIs con margen 32: {window} ({w * h / (1280 * 720):.0%} del sensor 1280x720)")
+
+    # Nyquist: la vibración medible sube con los FPS del modo
+    for mode in HIGH_SPEED_CANDIDATES:
+        print(f"{format_mode(mode):>18}: hasta {mode.fps / 2:.0f} Hz, "
+              f"{mode.fps * mode.width * mode.height / 1e6:.1f} Mpx/s")
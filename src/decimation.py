@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Decimación min/max para graficar señales largas
+Cada columna de píxeles recibe el mínimo y el máximo de sus muestras: la
+envolvente se conserva y matplotlib dibuja O(píxeles) puntos en lugar de
+O(muestras). MinMaxPyramid precalcula niveles de resolución para que zoom y
+desplazamiento solo lean el nivel adecuado.
+"""
+
+import numpy as np
+
+# Muestras leídas por bloque al construir el primer nivel (señales memory-mapped)
+BLOCK_SAMPLES = 1 << 20
+
+
+def minmax_envelope(y, n_bins, x0=0):
+    """
+    Envolvente min/max de y en n_bins intervalos.
+    Returns:
+        (x, y): índices de muestra (x0 + inicio del intervalo, repetido) y valores min, max alternados.
+        Si y tiene menos de 2 * n_bins muestras se devuelve sin decimar.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= 2 * n_bins:
+        return x0 + np.arange(n), y
+    edges = np.linspace(0, n, n_bins + 1).astype(np.int64)[:-1]
+    out_y = np.empty(2 * len(edges), dtype=y.dtype)
+    out_y[0::2] = np.minimum.reduceat(y, edges)
+    out_y[1::2] = np.maximum.reduceat(y, edges)
+    return x0 + np.repeat(edges, 2), out_y
+
+
+class MinMaxPyramid(object):
+    """
+    Pirámide de mínimos y máximos por bloques de 2^k muestras (k = 1, 2, ...).
+    Se construye una vez por señal (~2x la memoria de la señal en total) y
+    query() devuelve como mucho ~2 * n_pixels puntos para cualquier rango.
+    """
+    def __init__(self, signal_data, min_level_size=1024):
+        self.signal = signal_data
+        self.length = len(signal_data)
+        self.levels = []  # (factor, mins, maxs)
+        if self.length < 2 * min_level_size:
+            return
+        dtype = np.result_type(signal_data.dtype, np.float32)
+        half = self.length // 2
+        mins = np.empty(half, dtype=dtype)
+        maxs = np.empty(half, dtype=dtype)
+        for start in range(0, 2 * half, BLOCK_SAMPLES):
+            stop = min(2 * half, start + BLOCK_SAMPLES)
+            pairs = np.asarray(signal_data[start:stop]).reshape(-1, 2)
+            np.min(pairs, axis=1, out=mins[start // 2:stop // 2])
+            np.max(pairs, axis=1, out=maxs[start // 2:stop // 2])
+        factor = 2
+        self.levels.append((factor, mins, maxs))
+        while len(mins) >= 2 * min_level_size:
+            half = len(mins) // 2
+            mins = np.minimum(mins[0:2 * half:2], mins[1:2 * half:2])
+            maxs = np.maximum(maxs[0:2 * half:2], maxs[1:2 * half:2])
+            factor *= 2
+            self.levels.append((factor, mins, maxs))
+
+    def query(self, start, stop, n_pixels):
+        """
+        Puntos (x, y) para dibujar las muestras [start, stop) en n_pixels de ancho.
+        x son índices de muestra de la señal original.
+        """
+        start = max(0, int(start))
+        stop = min(self.length, int(np.ceil(stop)))
+        if stop <= start:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        n_pixels = max(1, int(n_pixels))
+        span = stop - start
+        # Nivel más grueso que aún deja al menos un bloque por píxel
+        chosen = None
+        for factor, mins, maxs in self.levels:
+            if span // factor >= n_pixels:
+                chosen = (factor, mins, maxs)
+            else:
+                break
+        if chosen is None:
+            return minmax_envelope(np.asarray(self.signal[start:stop]), n_pixels, x0=start)
+        factor, mins, maxs = chosen
+        lo, hi = start // factor, -(-stop // factor)
+        hi = min(hi, len(mins))
+        n_blocks = hi - lo
+        if n_blocks <= 2 * n_pixels:
+            x = np.repeat(np.arange(lo, hi) * factor, 2)
+            y = np.empty(2 * n_blocks, dtype=mins.dtype)
+            y[0::2] = mins[lo:hi]
+            y[1::2] = maxs[lo:hi]
+            return x, y
+        edges = np.linspace(lo, hi, n_pixels + 1).astype(np.int64)[:-1]
+        y = np.empty(2 * len(edges), dtype=mins.dtype)
+        y[0::2] = np.minimum.reduceat(mins[lo:hi], edges - lo)
+        y[1::2] = np.maximum.reduceat(maxs[lo:hi], edges - lo)
+        return np.repeat(edges * factor, 2), y
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n = 5000000
+    signal_data = np.cumsum(rng.standard_normal(n))
+    signal_data[1234567] += 500  # Pico aislado: debe sobrevivir a la decimación
+
+    t0 = time.perf_counter()
+    pyramid = MinMaxPyramid(signal_data)
+    t_build = time.perf_counter() - t0
+    print(f"Pirámide de {n} muestras: {len(pyramid.levels)} niveles en {t_build:.2f}s")
+
+    for start, stop in [(0, n), (1000000, 1500000), (1234000, 1235000), (1234500, 1234600)]:
+        t0 = time.perf_counter()
+        x, y = pyramid.query(start, stop, 1000)
+        elapsed = (time.perf_counter() - t0) * 1000
+        segment = signal_data[start:stop]
+        assert np.isclose(y.max(), segment.max()) and np.isclose(y.min(), segment.min())
+        print(f"[{start}, {stop}): {len(y)} puntos en {elapsed:.2f}ms (envolvente exacta)")
+
+    x, y = minmax_envelope(signal_data, 800)
+    assert np.isclose(y.max(), signal_data.max())
+    print(f"minmax_envelope: {n} -> {len(y)} puntos")
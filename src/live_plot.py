@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Gráficas en vivo con blitting de matplotlib
+Reutiliza líneas, textos y líneas de referencia; solo se redibuja la figura
+completa cuando cambian límites, títulos o etiquetas. El resto de refrescos
+restauran el fondo cacheado y pintan únicamente los artistas animados.
+"""
+
+import numpy as np
+
+STATS_BBOX = dict(facecolor='white', alpha=0.7, edgecolor='none')
+
+
+def fit_limits(current, lo, hi, headroom=0.25, min_span=1.0):
+    """
+    Límites con histéresis: se mantienen mientras contengan [lo, hi] y no sean
+    más del doble de amplios de lo necesario; si no, se recalculan con margen.
+    """
+    span = hi - lo if hi > lo else min_span
+    if current is not None:
+        c_lo, c_hi = current
+        if c_lo <= lo and hi <= c_hi and (c_hi - c_lo) <= span * (1 + 2 * headroom) * 2:
+            return current
+    return (lo - span * headroom, hi + span * headroom)
+
+
+class BlitLivePlot(object):
+    """
+    Modo rápido para las gráficas de señal y FFT de la GUI.
+    Los artistas animados no se pintan en canvas.draw(); se dibujan con
+    draw_artist sobre el fondo cacheado y se vuelcan con blit.
+    """
+    def __init__(self, canvas, ax_signal, ax_fft, line_signal, line_fft):
+        self.canvas = canvas
+        self.fig = canvas.figure
+        self.ax_signal = ax_signal
+        self.ax_fft = ax_fft
+        self.line_signal = line_signal
+        self.line_fft = line_fft
+        # Etiquetas con '_' para que legend() del modo clásico no las recoja
+        self.mean_line = ax_signal.axhline(0, color='g', linestyle='--', linewidth=1, alpha=0.5,
+                                           label='_media', animated=True, visible=False)
+        self.rms_line = ax_signal.axhline(0, color='m', linestyle=':', linewidth=1, alpha=0.5,
+                                          label='_rms', animated=True, visible=False)
+        self.peak_line = ax_fft.axvline(0, color='r', linestyle='--', linewidth=1, alpha=0.5,
+                                        label='_pico', animated=True, visible=False)
+        self.signal_stats = ax_signal.text(0.01, 0.98, '', transform=ax_signal.transAxes, fontsize=9,
+                                           color='black', verticalalignment='top', bbox=STATS_BBOX,
+                                           animated=True)
+        self.fft_stats = ax_fft.text(0.01, 0.98, '', transform=ax_fft.transAxes, fontsize=9,
+                                     color='black', verticalalignment='top', bbox=STATS_BBOX,
+                                     animated=True)
+        self.animated_artists = [self.line_signal, self.mean_line, self.rms_line, self.signal_stats,
+                                 self.line_fft, self.peak_line, self.fft_stats]
+        self.enabled = False
+        self.full_redraws = 0
+        self.blits = 0
+        self._background = None
+        self._dirty = True
+        self._draw_cid = None
+
+    def enable(self):
+        """Activa el modo blitting (leyendas fijas y líneas animadas)"""
+        if self.enabled:
+            return
+        for ax in (self.ax_signal, self.ax_fft):
+            # Retirar textos y líneas de referencia que el modo clásico deja en los ejes
+            for artist in list(ax.texts) + list(ax.lines):
+                if artist not in self.animated_artists:
+                    artist.remove()
+        self.line_signal.set_animated(True)
+        self.line_fft.set_animated(True)
+        self.ax_signal.legend([self.line_signal, self.mean_line, self.rms_line],
+                              [self.line_signal.get_label(), 'Media', 'RMS'],
+                              loc='upper right', fontsize=9, frameon=True)
+        self.ax_fft.legend([self.line_fft, self.peak_line], [self.line_fft.get_label(), 'Pico'],
+                           loc='upper right', fontsize=9, frameon=True)
+        self._draw_cid = self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.enabled = True
+        self._dirty = True
+
+    def disable(self):
+        """Vuelve al modo clásico (canvas.draw() completo en cada refresco)"""
+        if not self.enabled:
+            return
+        self.canvas.mpl_disconnect(self._draw_cid)
+        self._draw_cid = None
+        self.line_signal.set_animated(False)
+        self.line_fft.set_animated(False)
+        for artist in (self.mean_line, self.rms_line, self.peak_line):
+            artist.set_visible(False)
+        self.signal_stats.set_text('')
+        self.fft_stats.set_text('')
+        self._background = None
+        self.enabled = False
+
+    def _on_draw(self, event):
+        # Cualquier redibujado completo (incluido un cambio de tamaño) renueva el fondo
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def _set(self, getter, setter, value):
+        if getter() != value:
+            setter(value)
+            self._dirty = True
+
+    def _set_limits(self, ax, xlim=None, ylim=None):
+        if xlim is not None and tuple(ax.get_xlim()) != tuple(xlim):
+            ax.set_xlim(*xlim)
+            self._dirty = True
+        if ylim is not None and tuple(ax.get_ylim()) != tuple(ylim):
+            ax.set_ylim(*ylim)
+            self._dirty = True
+
+    def update_signal(self, signal_data, x_max, title, ylabel):
+        """Actualiza la señal, sus estadísticas y las líneas de media y RMS"""
+        signal_arr = np.asarray(signal_data, dtype=np.float64)
+        self.line_signal.set_data(np.arange(len(signal_arr)), signal_arr)
+        min_val, max_val = float(signal_arr.min()), float(signal_arr.max())
+        mean = float(signal_arr.mean())
+        rms = float(np.sqrt(np.mean(np.square(signal_arr))))
+        self.mean_line.set_ydata([mean, mean])
+        self.rms_line.set_ydata([rms, rms])
+        self.mean_line.set_visible(True)
+        self.rms_line.set_visible(True)
+        self.signal_stats.set_text(f"RMS: {rms:.2f}  Media: {mean:.2f}  Min: {min_val:.2f}  Max: {max_val:.2f}")
+        # Eje X fijo a la capacidad del buffer: no cambia mientras se llena
+        self._set_limits(self.ax_signal, xlim=(0, max(x_max, len(signal_arr))),
+                         ylim=fit_limits(self.ax_signal.get_ylim() if not self._dirty else None,
+                                         min(min_val, rms), max(max_val, rms)))
+        self._set(self.ax_signal.get_title, lambda t: self.ax_signal.set_title(t, fontsize=12, fontweight='bold'), title)
+        self._set(self.ax_signal.get_ylabel, self.ax_signal.set_ylabel, ylabel)
+
+    def update_spectrum(self, freqs, fft_vals, xlim, title, ylabel):
+        """Actualiza el espectro, el pico y su línea de referencia"""
+        self.line_fft.set_data(freqs[1:], fft_vals[1:])
+        if len(fft_vals) > 1:
+            peak_idx = int(np.argmax(fft_vals[1:])) + 1
+            peak_freq, peak_val = float(freqs[peak_idx]), float(fft_vals[peak_idx])
+            self.peak_line.set_xdata([peak_freq, peak_freq])
+            self.peak_line.set_visible(True)
+            y_max = float(fft_vals[1:].max())
+        else:
+            peak_freq = peak_val = 0.0
+            self.peak_line.set_visible(False)
+            y_max = 1.0
+        self.fft_stats.set_text(f"Pico: {peak_freq:.2f} Hz ({peak_val:.2f})")
+        ylim = fit_limits(self.ax_fft.get_ylim() if not self._dirty else None, 0.0, y_max * 1.1 or 1.0)
+        self._set_limits(self.ax_fft, xlim=xlim, ylim=(0.0, ylim[1]))
+        self._set(self.ax_fft.get_title, self.ax_fft.set_title, title)
+        self._set(self.ax_fft.get_ylabel, self.ax_fft.set_ylabel, ylabel)
+
+    def render(self):
+        """Redibuja: completo si cambió el layout, si no restaura el fondo y hace blit"""
+        if self._dirty or self._background is None:
+            # canvas.draw() no pinta los artistas animados y dispara _on_draw
+            self.canvas.draw()
+            self._dirty = False
+            self.full_redraws += 1
+        else:
+            self.blits += 1
+        self.canvas.restore_region(self._background)
+        for artist in self.animated_artists:
+            if artist.get_visible():
+                artist.axes.draw_artist(artist)
+        self.canvas.blit(self.fig.bbox)
+
+
+class ClassicLivePlot(object):
+    """
+    Modo clásico de las gráficas de la GUI: en cada refresco recrea textos, líneas
+    de referencia y leyendas y redibuja la figura completa. Misma interfaz que
+    BlitLivePlot (update_signal, update_spectrum, render).
+    """
+    def __init__(self, canvas, ax_signal, ax_fft, line_signal, line_fft):
+        self.canvas = canvas
+        self.ax_signal = ax_signal
+        self.ax_fft = ax_fft
+        self.line_signal = line_signal
+        self.line_fft = line_fft
+        self.signal_stats = None
+        self.signal_ref_lines = []
+        self.fft_stats = None
+        self.fft_ref_lines = []
+
+    @staticmethod
+    def _remove(artist):
+        # BlitLivePlot.enable() ya retira de los ejes los artistas del modo clásico
+        if artist is not None and artist.axes is not None:
+            artist.remove()
+
+    def update_signal(self, signal_data, title, ylabel):
+        """Señal con escala ajustada, estadísticas y líneas de media y RMS"""
+        ax = self.ax_signal
+        self.line_signal.set_data(range(len(signal_data)), signal_data)
+        ax.set_xlim(0, len(signal_data))
+        y_min, y_max = min(signal_data), max(signal_data)
+        y_pad = (y_max - y_min) * 0.1 if y_max > y_min else 1
+        ax.set_ylim(y_min - y_pad, y_max + y_pad)
+        ax.set_ylabel(ylabel)
+        ax.set_title(title, fontsize=12, fontweight='bold')
+        rms = np.sqrt(np.mean(np.square(signal_data)))
+        mean = np.mean(signal_data)
+        self._remove(self.signal_stats)
+        self.signal_stats = ax.text(0.01, 0.98, f"RMS: {rms:.2f}  Media: {mean:.2f}  Min: {np.min(signal_data):.2f}  "
+                                    f"Max: {np.max(signal_data):.2f}", transform=ax.transAxes, fontsize=9,
+                                    color='black', verticalalignment='top', bbox=STATS_BBOX)
+        for line in self.signal_ref_lines:
+            self._remove(line)
+        self.signal_ref_lines = [
+            ax.axhline(mean, color='g', linestyle='--', linewidth=1, alpha=0.5, label='Media'),
+            ax.axhline(rms, color='m', linestyle=':', linewidth=1, alpha=0.5, label='RMS'),
+        ]
+        ax.grid(True, which='both', linestyle=':', alpha=0.4)
+        ax.legend(loc='upper right', fontsize=9, frameon=True)
+
+    def update_spectrum(self, freqs, fft_vals, xlim, title, ylabel):
+        """Espectro, pico y su línea de referencia"""
+        ax = self.ax_fft
+        self.line_fft.set_data(freqs[1:], fft_vals[1:])
+        ax.set_xlim(*xlim)
+        ax.set_ylim(0, max(fft_vals[1:]) * 1.1 if len(fft_vals) > 1 else 1)
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+        peak_idx = np.argmax(fft_vals[1:]) + 1 if len(fft_vals) > 1 else 0
+        peak_freq = freqs[peak_idx] if peak_idx > 0 else 0
+        peak_val = fft_vals[peak_idx] if peak_idx > 0 else 0
+        self._remove(self.fft_stats)
+        self.fft_stats = ax.text(0.01, 0.98, f"Pico: {peak_freq:.2f} Hz ({peak_val:.2f})", transform=ax.transAxes,
+                                 fontsize=9, color='black', verticalalignment='top', bbox=STATS_BBOX)
+        for line in self.fft_ref_lines:
+            self._remove(line)
+        self.fft_ref_lines = []
+        if peak_idx > 0:
+            self.fft_ref_lines.append(ax.axvline(peak_freq, color='r', linestyle='--', linewidth=1, alpha=0.5,
+                                                 label='Pico'))
+        ax.grid(True, which='both', linestyle=':', alpha=0.4)
+        ax.legend(loc='upper right', fontsize=9, frameon=True)
+
+    def render(self):
+        self.canvas.draw()
+
+
+def benchmark_redraws(n_redraws=200, n_samples=300, fs=30.0):
+    """Refrescos por segundo del modo clásico frente al modo blitting (backend Agg)"""
+    import time
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    rng = np.random.default_rng(0)
+    t = np.arange(n_samples + n_redraws) / fs
+    signal_full = 100 + np.sin(2 * np.pi * 4.0 * t) + 0.2 * rng.standard_normal(len(t))
+    results = {}
+    # 'clasico' se mide tras pasar por blitting y volver, como al alternar el modo en la GUI
+    for mode in ('clasico', 'blit'):
+        fig = Figure(figsize=(8, 6))
+        canvas = FigureCanvasAgg(fig)
+        ax1, ax2 = fig.subplots(2, 1)
+        line1, = ax1.plot([], [], 'b-', linewidth=1.5, label='Señal de vibración')
+        line2, = ax2.plot([], [], 'r-', linewidth=1.5, label='FFT')
+        ax2.set_xlim(0, 15)
+        blit = BlitLivePlot(canvas, ax1, ax2, line1, line2)
+        classic = ClassicLivePlot(canvas, ax1, ax2, line1, line2)
+        freqs = np.fft.rfftfreq(n_samples, d=1.0 / fs)
+        if mode == 'clasico':
+            # Artistas del modo clásico en los ejes, blitting (los retira) y vuelta al clásico
+            classic.update_signal(list(signal_full[:n_samples]), "Señal de Vibración (Brillo)", "Brillo medio ROI")
+            classic.update_spectrum(freqs, np.abs(np.fft.rfft(signal_full[:n_samples])), (0, 15), "FFT", "Magnitud")
+            classic.render()
+            blit.enable()
+            blit.disable()
+        else:
+            blit.enable()
+        t0 = time.perf_counter()
+        for i in range(n_redraws):
+            signal_data = signal_full[i:i + n_samples]
+            fft_vals = np.abs(np.fft.rfft(signal_data - signal_data.mean()))
+            if mode == 'blit':
+                blit.update_signal(signal_data, n_samples, "Señal de Vibración (Brillo)", "Brillo medio ROI (px/frame)")
+                blit.update_spectrum(freqs, fft_vals, (0, 15), "Espectro de Frecuencias (FFT)", "Magnitud (px/frame)")
+                blit.render()
+            else:
+                classic.update_signal(list(signal_data), "Señal de Vibración (Brillo)", "Brillo medio ROI (px/frame)")
+                classic.update_spectrum(freqs, fft_vals, (0, 15), "Espectro de Frecuencias (FFT)",
+                                        "Magnitud (px/frame)")
+                classic.render()
+        elapsed = time.perf_counter() - t0
+        results[mode] = n_redraws / elapsed
+        if mode == 'blit':
+            results['redibujados_completos'] = blit.full_redraws
+        else:
+            # Sin artistas huérfanos: solo la señal, media/RMS y los animados (ocultos) del blitting
+            assert len(ax1.texts) == 2 and len(ax2.texts) == 2, "El modo clásico acumula textos"
+    return results
+
+
+if __name__ == "__main__":
+    results = benchmark_redraws()
+    print(f"Modo clásico: {results['clasico']:.1f} refrescos/s")
+    print(f"Modo blitting: {results['blit']:.1f} refrescos/s "
+          f"({results['redibujados_completos']} redibujados completos de 200)")
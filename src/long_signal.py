@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Utilidades para grabaciones largas
+Carga por bloques de una columna CSV a una caché binaria memory-mapped
+(creada en la primera lectura) y análisis en streaming: espectro de Welch
+con rfft y filtro pasa-alta por bloques. La RAM queda acotada por el tamaño
+de bloque, no por la longitud del archivo.
+"""
+
+import json
+import os
+
+import numpy as np
+
+# Filas de CSV leídas por bloque al crear la caché
+CSV_CHUNK_ROWS = 200000
+
+# Muestras procesadas por bloque en Welch y en el pasa-alta
+BLOCK_SAMPLES = 1 << 20
+
+
+def cache_paths(csv_path, column_idx):
+    """Rutas de la caché binaria (float64 crudo) y de sus metadatos para una columna"""
+    base = f"{csv_path}.col{column_idx}"
+    return base + '.f64', base + '.json'
+
+
+def filtered_path(csv_path, column_idx):
+    """Ruta del sidecar float64 con la salida del pasa-alta de una columna (se sobrescribe en cada análisis)"""
+    return f"{csv_path}.col{column_idx}.hp.f64"
+
+
+def _csv_signature(csv_path):
+    st = os.stat(csv_path)
+    return {'size': st.st_size, 'mtime': st.st_mtime}
+
+
+def _read_column_chunks(csv_path, column_idx):
+    """Itera la columna column_idx (0 = primera) en bloques float64"""
+    import pandas as pd
+    for chunk in pd.read_csv(csv_path, usecols=[column_idx], chunksize=CSV_CHUNK_ROWS):
+        yield pd.to_numeric(chunk.iloc[:, 0], errors='raise').to_numpy(dtype=np.float64)
+
+
+def load_column(csv_path, column_idx, use_cache=True):
+    """
+    Columna column_idx del CSV como array float64 de solo lectura.
+    Con use_cache la primera lectura escribe un sidecar binario junto al CSV y
+    las siguientes lo abren con np.memmap (sin parsear texto). Se regenera si
+    cambia el tamaño o la fecha del CSV.
+    Lanza ValueError si la columna no existe o no es numérica.
+    """
+    data_path, meta_path = cache_paths(csv_path, column_idx)
+    signature = _csv_signature(csv_path)
+    if use_cache and os.path.exists(data_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('csv') == signature and meta.get('column') == column_idx:
+                if meta['samples'] == 0:
+                    return np.zeros(0)
+                return np.memmap(data_path, dtype=np.float64, mode='r', shape=(meta['samples'],))
+        except (OSError, ValueError, KeyError):
+            pass  # Caché corrupta: se regenera
+
+    if use_cache:
+        try:
+            samples = 0
+            with open(data_path, 'wb') as f:
+                try:
+                    for block in _read_column_chunks(csv_path, column_idx):
+                        block.tofile(f)
+                        samples += len(block)
+                except ValueError:
+                    f.close()
+                    os.remove(data_path)  # Columna inexistente o no numérica: sin sidecar a medias
+                    raise
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'csv': signature, 'column': column_idx, 'samples': samples}, f)
+            if samples == 0:
+                return np.zeros(0)
+            return np.memmap(data_path, dtype=np.float64, mode='r', shape=(samples,))
+        except OSError:
+            pass  # Directorio de solo lectura: cargar en memoria por bloques
+    blocks = list(_read_column_chunks(csv_path, column_idx))
+    return np.concatenate(blocks) if blocks else np.zeros(0)
+
+
+def welch_amplitude(signal_data, fs, nperseg, overlap=0.5, highpass_cutoff=None):
+    """
+    Espectro de amplitud por Welch (ventana Hann, rfft por segmento) en streaming.
+    La escala es de pico: un seno de amplitud A da ~A en su bin.
+    Si la señal es más corta que nperseg se usa un único segmento con toda la señal.
+    highpass_cutoff anula los bins por debajo del corte (Hz).
+    Returns:
+        (freqs, amplitud)
+    """
+    n = len(signal_data)
+    nperseg = int(min(nperseg, n))
+    if nperseg < 2:
+        raise ValueError("La señal es demasiado corta para el análisis espectral")
+    step = max(1, int(nperseg * (1 - overlap)))
+    n_segments = 1 + (n - nperseg) // step
+    window = np.hanning(nperseg) if nperseg > 2 else np.ones(nperseg)
+    power = np.zeros(nperseg // 2 + 1)
+    # Segmentos por lote: acota la memoria a ~BLOCK_SAMPLES muestras
+    batch = max(1, BLOCK_SAMPLES // nperseg)
+    for first in range(0, n_segments, batch):
+        last = min(n_segments, first + batch)
+        starts = np.arange(first, last) * step
+        block = np.asarray(signal_data[starts[0]:starts[-1] + nperseg], dtype=np.float64)
+        segments = np.lib.stride_tricks.sliding_window_view(block, nperseg)[::step]
+        segments = segments - segments.mean(axis=1, keepdims=True)
+        power += np.sum(np.abs(np.fft.rfft(segments * window, axis=1)) ** 2, axis=0)
+    amplitude = np.sqrt(power / n_segments) / window.sum()
+    amplitude[1:] *= 2  # Espectro de un lado (el bin de continua no se duplica)
+    freqs = np.fft.rfftfreq(nperseg, d=1.0 / fs)
+    if highpass_cutoff:
+        amplitude[freqs < highpass_cutoff] = 0
+    return freqs, amplitude
+
+
+def highpass_blocks(signal_data, fs, cutoff, order=4, out_path=None):
+    """
+    Pasa-alta Butterworth causal aplicado por bloques (estado del filtro
+    arrastrado entre bloques). Devuelve un array float64 nuevo; con out_path,
+    un np.memmap sobre ese archivo escrito bloque a bloque (la RAM queda
+    acotada por el tamaño de bloque). Si no se puede crear, en memoria.
+    """
+    from scipy.signal import butter, sosfilt, sosfilt_zi
+    n = len(signal_data)
+    out = None
+    if out_path is not None and n:
+        try:
+            out = np.memmap(out_path, dtype=np.float64, mode='w+', shape=(n,))
+        except OSError:
+            pass  # Directorio de solo lectura
+    if out is None:
+        out = np.empty(n, dtype=np.float64)
+    wn = cutoff / (0.5 * fs)
+    if not 0 < wn < 1.0 or n == 0:
+        for start in range(0, n, BLOCK_SAMPLES):
+            out[start:start + BLOCK_SAMPLES] = signal_data[start:start + BLOCK_SAMPLES]
+    else:
+        sos = butter(order, wn, btype='high', output='sos')
+        # Estado inicial en régimen para el primer valor: evita el transitorio del escalón
+        zi = sosfilt_zi(sos) * float(signal_data[0])
+        for start in range(0, n, BLOCK_SAMPLES):
+            block = np.asarray(signal_data[start:start + BLOCK_SAMPLES], dtype=np.float64)
+            out[start:start + len(block)], zi = sosfilt(sos, block, zi=zi)
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    fs = 20.0
+    n = 2000000  # ~28 h a 20 Hz
+    t = np.arange(n) / fs
+    rng = np.random.default_rng(0)
+    signal_data = 100 + 0.8 * np.sin(2 * np.pi * 2.5 * t) + 0.1 * rng.standard_normal(n)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'largo.csv')
+        with open(csv_path, 'w') as f:
+            f.write('frame,timestamp,mean_magnitude_px_frame,mean_signal\n')
+            np.savetxt(f, np.column_stack([np.arange(n), t, np.zeros(n), signal_data]),
+                       fmt=['%d', '%.2f', '%.1f', '%.6f'], delimiter=',')
+        t0 = time.perf_counter()
+        first = load_column(csv_path, 3)
+        t_first = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        cached = load_column(csv_path, 3)
+        t_cached = time.perf_counter() - t0
+        print(f"{n} muestras: primera carga {t_first:.2f}s, desde caché {t_cached * 1000:.1f}ms "
+              f"({type(cached).__name__})")
+        assert np.allclose(first, signal_data, atol=1e-6)
+
+        t0 = time.perf_counter()
+        freqs, amplitude = welch_amplitude(cached, fs, nperseg=int(60 * fs))
+        peak = np.argmax(amplitude[1:]) + 1
+        print(f"Welch: {time.perf_counter() - t0:.2f}s | pico {freqs[peak]:.3f} Hz, amplitud {amplitude[peak]:.3f}")
+        assert abs(freqs[peak] - 2.5) < 0.05 and abs(amplitude[peak] - 0.8) < 0.1
+
+        # Pasa-alta bloque a bloque sobre el sidecar: igual que en memoria
+        t0 = time.perf_counter()
+        filtered = highpass_blocks(cached, fs, 1.0, out_path=filtered_path(csv_path, 3))
+        print(f"Pasa-alta a {os.path.basename(filtered.filename)}: {time.perf_counter() - t0:.2f}s")
+        assert np.array_equal(filtered, highpass_blocks(cached, fs, 1.0))
+        assert abs(np.mean(filtered[int(60 * fs):])) < 0.01
+
+        # Columna inexistente: ValueError y sin sidecar a medias
+        try:
+            load_column(csv_path, 7)
+            raise AssertionError("Columna inexistente aceptada")
+        except ValueError:
+            assert not os.path.exists(cache_paths(csv_path, 7)[0])
+        print("Columna inexistente: ValueError sin sidecar")
+        del first, cached, filtered
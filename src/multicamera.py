@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Monitoreo multi-cámara sin GUI
+Cada cámara corre captura + magnificación + flujo óptico en su propio proceso;
+el frame magnificado y la señal vuelven por memoria compartida.
+
+Uso:
+    python -m src.multicamera --camera 0:100,80,320,240 --camera 1:0,0,200,200
+"""
+
+import argparse
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.utils import load_config
+
+# Campos de la cabecera compartida (float64)
+HDR_STATUS, HDR_FRAMES, HDR_FPS, HDR_SIGNAL = range(4)
+HEADER_SIZE = 4
+
+# Valores de HDR_STATUS
+STATUS_STARTING, STATUS_RUNNING, STATUS_FINISHED, STATUS_ERROR = 0, 1, 2, -1
+
+
+def parse_camera_spec(spec):
+    """Convierte 'fuente:x,y,w,h' en (fuente, roi). La fuente es un índice o una especificación de src.sources."""
+    source, _, roi_text = spec.rpartition(':')
+    if not source:
+        raise ValueError(f"Formato inválido '{spec}', se esperaba fuente:x,y,w,h")
+    roi = tuple(int(v) for v in roi_text.split(','))
+    if len(roi) != 4 or roi[2] <= 0 or roi[3] <= 0:
+        raise ValueError(f"ROI inválido en '{spec}'")
+    return (int(source) if source.isdigit() else source), roi
+
+
+class SharedCameraBuffers(object):
+    """
+    Vista numpy sobre el bloque de memoria compartida de una cámara:
+    cabecera (estado, frames, fps, última señal), anillo de señal y último frame ROI.
+    """
+    def __init__(self, roi_shape, ring_size, name=None):
+        self.roi_shape = tuple(roi_shape)
+        self.ring_size = ring_size
+        header_bytes = HEADER_SIZE * 8
+        ring_bytes = ring_size * 8
+        frame_bytes = int(np.prod(self.roi_shape))
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + ring_bytes + frame_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        buf = self.shm.buf
+        self.header = np.ndarray((HEADER_SIZE,), dtype=np.float64, buffer=buf, offset=0)
+        self.ring = np.ndarray((ring_size,), dtype=np.float64, buffer=buf, offset=header_bytes)
+        self.frame = np.ndarray(self.roi_shape, dtype=np.uint8, buffer=buf, offset=header_bytes + ring_bytes)
+        if name is None:
+            self.header[:] = 0
+            self.ring[:] = 0
+            self.frame[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        # Liberar las vistas antes de cerrar el mapeo
+        self.header = self.ring = self.frame = None
+        self.shm.close()
+
+
+def _open_capture(source, capture_mode=None):
+    from src.capture_modes import parse_capture_mode
+    from src.sources import open_source
+    capture = open_source(source, capture_mode=parse_capture_mode(capture_mode))
+    if not capture.isOpened():
+        raise RuntimeError(f"No se pudo abrir la fuente {source}")
+    return capture
+
+
+def camera_worker(source, roi, params, shm_name, lock, stop_event):
+    """Proceso de una cámara: captura, magnificación, flujo óptico y escritura en memoria compartida."""
+    import cv2
+    from src.magnify import create_engine
+    from src.sparse_flow import SparseTracker
+    from src.utils import validate_roi, vibration_sample
+
+    # Un núcleo por cámara: evitar que OpenCV lance sus propios hilos en cada proceso
+    cv2.setNumThreads(1)
+    x, y, w, h = roi
+    shared = SharedCameraBuffers((h, w), params['buffer_size'], name=shm_name)
+    capture = None
+    try:
+        capture = _open_capture(source, params['capture_mode'])
+        ret, frame = capture.read()
+        if not ret or not validate_roi(roi, frame.shape, min_size=1):
+            raise RuntimeError(f"ROI {roi} fuera del frame de la fuente {source}")
+        if params['capture_roi_window'] and hasattr(capture, 'set_window'):
+            # Solo se decodifica la zona de la ROI (si el backend admite ventanas de sensor)
+            capture.set_window([roi], params['capture_roi_padding'])
+        # Con un modo de captura negociado el muestreo real es el de la cámara
+        fps = capture.fps if getattr(capture, 'mode', None) is not None and capture.fps else params['fps']
+        roi_gray = cv2.GaussianBlur(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)[y:y+h, x:x+w], (5, 5), 0)
+        engine = create_engine(params['magnification_engine'], roi_gray, params['alpha'], params['lambda_c'],
+                               params['fl'], params['fh'], fps, pyramid_backend=params['pyramid_backend'],
+                               precision=params['precision'], temporal_filter=params['temporal_filter'],
+                               filter_order=params['temporal_filter_order'],
+                               filter_taps=params['temporal_filter_taps'])
+        flow_params = params['optical_flow_params']
+        sparse = params['vibration_method'] == 'flujo_sparse'
+        tracker = SparseTracker(**params['sparse_flow_params']) if sparse else None
+        axis = 0 if params['sparse_flow_axis'] == 'x' else 1
+        prev_out = None
+        count = 0
+        t_start = time.perf_counter()
+        shared.header[HDR_STATUS] = STATUS_RUNNING
+        while not stop_event.is_set():
+            ret, frame = capture.read(frame)
+            if not ret:
+                break
+            gray = cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY)
+            out = engine.Magnify(gray)
+            if sparse:
+                # Desplazamiento con signo por Lucas-Kanade en lugar del flujo denso
+                mean_signal = tracker.update(prev_out, out)[axis]
+            else:
+                mean_magnitude, mean_brightness = vibration_sample(prev_out, out, flow_params)
+                mean_signal = mean_magnitude if params['vibration_method'] == 'flujo' else mean_brightness
+            if prev_out is None:
+                prev_out = out.copy()
+            else:
+                np.copyto(prev_out, out)
+            count += 1
+            with lock:
+                np.copyto(shared.frame, out)
+                shared.ring[(count - 1) % shared.ring_size] = mean_signal
+                shared.header[HDR_FRAMES] = count
+                shared.header[HDR_SIGNAL] = mean_signal
+                shared.header[HDR_FPS] = count / (time.perf_counter() - t_start)
+        shared.header[HDR_STATUS] = STATUS_FINISHED
+    except Exception as e:
+        print(f"Error en cámara {source}: {e}")
+        shared.header[HDR_STATUS] = STATUS_ERROR
+    finally:
+        if capture is not None:
+            capture.release()
+        shared.close()
+
+
+def default_worker_params(config=None):
+    """Parámetros del motor para los procesos de cámara, tomados de config.json"""
+    config = config or load_config()
+    defaults = config['default_settings']
+    processing = config['processing_settings']
+    return {
+        'alpha': defaults['alpha'],
+        'lambda_c': defaults['lambda_c'],
+        'fl': defaults['fl'],
+        'fh': defaults['fh'],
+        'fps': defaults['fps'],
+        'buffer_size': defaults['buffer_size'],
+        'pyramid_backend': processing.get('pyramid_backend', 'pyrtools'),
+        'magnification_engine': processing.get('magnification_engine', 'lineal'),
+        'precision': processing.get('precision', 'float64'),
+        'temporal_filter': processing.get('temporal_filter', 'primer_orden'),
+        'temporal_filter_order': processing.get('temporal_filter_order', 2),
+        'temporal_filter_taps': processing.get('temporal_filter_taps', 31),
+        'optical_flow_params': processing['optical_flow_params'],
+        'sparse_flow_params': processing.get('sparse_flow_params', {}),
+        'sparse_flow_axis': defaults.get('sparse_flow_axis', 'y'),
+        'vibration_method': 'brillo',
+        'capture_mode': defaults.get('capture_mode', ''),
+        'capture_roi_window': defaults.get('capture_roi_window', False),
+        'capture_roi_padding': defaults.get('capture_roi_padding', 32),
+    }
+
+
+class MultiCameraMonitor(object):
+    """Lanza un proceso por cámara y lee sus resultados desde memoria compartida."""
+
+    def __init__(self, cameras, params=None):
+        """
+        Args:
+            cameras: lista de (fuente, (x, y, w, h)); fuente = índice de cámara o ruta de video
+            params: dict de parámetros (ver default_worker_params)
+        """
+        self.cameras = list(cameras)
+        self.params = params or default_worker_params()
+        # 'spawn' en todas las plataformas: mismo comportamiento que en Windows
+        self.ctx = multiprocessing.get_context('spawn')
+        self.stop_event = self.ctx.Event()
+        self.workers = []
+
+    def start(self):
+        for source, roi in self.cameras:
+            shared = SharedCameraBuffers((roi[3], roi[2]), self.params['buffer_size'])
+            lock = self.ctx.Lock()
+            process = self.ctx.Process(target=camera_worker, daemon=True,
+                                       args=(source, roi, self.params, shared.name, lock, self.stop_event))
+            process.start()
+            self.workers.append({'source': source, 'roi': roi, 'shared': shared,
+                                 'lock': lock, 'process': process})
+
+    def snapshot(self, index):
+        """Copia del estado de la cámara index: frame ROI, señal ordenada, frames, fps y estado"""
+        worker = self.workers[index]
+        shared = worker['shared']
+        with worker['lock']:
+            header = shared.header.copy()
+            ring = shared.ring.copy()
+            frame = shared.frame.copy()
+        count = int(header[HDR_FRAMES])
+        if count <= shared.ring_size:
+            signal_data = ring[:count]
+        else:
+            signal_data = np.roll(ring, -(count % shared.ring_size))
+        return {'frame': frame, 'signal': signal_data, 'frames': count,
+                'fps': float(header[HDR_FPS]), 'status': int(header[HDR_STATUS])}
+
+    def is_alive(self):
+        return any(worker['process'].is_alive() for worker in self.workers)
+
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        for worker in self.workers:
+            worker['process'].join(timeout)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+            worker['shared'].close()
+            worker['shared'].shm.unlink()
+        self.workers = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitoreo multi-cámara sin GUI (un proceso por cámara)")
+    parser.add_argument('--camera', action='append', required=True, metavar='FUENTE:X,Y,W,H',
+                        help="Fuente (índice, video, imágenes, synthetic o .rawframes) y ROI; repetir por cada cámara")
+    parser.add_argument('--method', choices=['brillo', 'flujo', 'flujo_sparse'], default='brillo',
+                        help="Método de vibración (flujo_sparse: desplazamiento Lucas-Kanade con signo)")
+    parser.add_argument('--axis', choices=['x', 'y'], default=None,
+                        help="Eje del desplazamiento con --method flujo_sparse (por defecto el de config.json)")
+    parser.add_argument('--capture-mode', default=None, metavar='AxH@FPS:FOURCC',
+                        help="Modo de las cámaras ('rapido' = el de más FPS; por defecto el de config.json)")
+    parser.add_argument('--roi-window', action='store_true',
+                        help="Pedir al sensor solo la ventana de la ROI (backends que lo admiten)")
+    parser.add_argument('--duration', type=float, default=0,
+                        help="Segundos de monitoreo (0 = hasta Ctrl+C o fin de las fuentes)")
+    parser.add_argument('--config', default='config.json', help="Archivo de configuración")
+    args = parser.parse_args()
+
+    cameras = [parse_camera_spec(spec) for spec in args.camera]
+    params = default_worker_params(load_config(args.config))
+    params['vibration_method'] = args.method
+    if args.axis:
+        params['sparse_flow_axis'] = args.axis
+    if args.capture_mode is not None:
+        params['capture_mode'] = args.capture_mode
+    if args.roi_window:
+        params['capture_roi_window'] = True
+    monitor = MultiCameraMonitor(cameras, params)
+    monitor.start()
+    print(f"Monitoreando {len(cameras)} cámara(s) en procesos separados...")
+    t_start = time.time()
+    try:
+        while monitor.is_alive():
+            time.sleep(1.0)
+            for i, (source, _) in enumerate(cameras):
+                snap = monitor.snapshot(i)
+                last = snap['signal'][-1] if len(snap['signal']) else 0.0
+                print(f"Cam {source}: {snap['fps']:.1f} FPS | frames {snap['frames']} | señal {last:.3f}")
+            if args.duration and time.time() - t_start >= args.duration:
+                break
+    except KeyboardInterrupt:
+        print("Monitoreo interrumpido por el usuario")
+    finally:
+        monitor.stop()
+
+
+if __name__ == "__main__":
+    main()
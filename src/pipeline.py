@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Pipeline por etapas para el procesamiento de video
+Cada etapa corre en su propio hilo y se conecta con la siguiente mediante un
+buffer circular acotado con política drop-oldest.
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class RingBuffer(object):
+    """
+    Buffer circular thread-safe de capacidad fija.
+    Si está lleno, put() descarta el elemento más antiguo (drop-oldest) en lugar de bloquear.
+    """
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("La capacidad del buffer debe ser >= 1")
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._head = 0
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        """Inserta item; devuelve el elemento descartado si el buffer estaba lleno (o None)."""
+        with self._cond:
+            dropped_item = None
+            if self._size == self.capacity:
+                dropped_item = self._slots[self._head]
+                self._slots[self._head] = None
+                self._head = (self._head + 1) % self.capacity
+                self._size -= 1
+                self.dropped += 1
+            self._slots[(self._head + self._size) % self.capacity] = item
+            self._size += 1
+            self._cond.notify()
+            return dropped_item
+
+    def get(self, timeout=None):
+        """Extrae el elemento más antiguo; None si vence el timeout o el buffer se cerró vacío."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._size > 0 or self._closed, timeout):
+                return None
+            if self._size == 0:
+                return None
+            item = self._slots[self._head]
+            self._slots[self._head] = None
+            self._head = (self._head + 1) % self.capacity
+            self._size -= 1
+            return item
+
+    def close(self):
+        """Despierta a los consumidores; get() devuelve None cuando se vacía."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def clear(self):
+        with self._cond:
+            self._slots = [None] * self.capacity
+            self._head = 0
+            self._size = 0
+
+    def __len__(self):
+        return self._size
+
+
+class PipelineStage(threading.Thread):
+    """
+    Etapa del pipeline. fn(item) procesa y devuelve el item (None = descartarlo).
+    La primera etapa (sin input_ring) es la fuente: fn(None) produce items y
+    lanza StopIteration cuando la fuente se agota. on_drop(item) recibe los items
+    que no siguen adelante (descartados por output_ring lleno o por un error en fn).
+    """
+    def __init__(self, name, fn, input_ring=None, output_ring=None, on_error=None, history=300,
+                 on_drop=None):
+        super().__init__(name=f"pipeline-{name}", daemon=True)
+        self.stage_name = name
+        self.fn = fn
+        self.input_ring = input_ring
+        self.output_ring = output_ring
+        self.on_error = on_error
+        self.on_drop = on_drop
+        self.latencies = deque(maxlen=history)
+        self.processed = 0
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if self.input_ring is None:
+                item = None
+            else:
+                item = self.input_ring.get(timeout=0.1)
+                if item is None:
+                    if self.input_ring.closed:
+                        break
+                    continue
+            t_start = time.perf_counter()
+            try:
+                result = self.fn(item)
+            except StopIteration:
+                break
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(self.stage_name, e)
+                if item is not None and self.on_drop:
+                    self.on_drop(item)
+                time.sleep(0.1)  # Pausa breve antes de reintentar
+                continue
+            item = result
+            if item is None:
+                continue
+            if self.input_ring is None:
+                item['t_capture'] = t_start
+            elapsed = time.perf_counter() - t_start
+            self.latencies.append(elapsed)
+            item.setdefault('stage_times', {})[self.stage_name] = elapsed
+            self.processed += 1
+            if self.output_ring is not None:
+                dropped = self.output_ring.put(item)
+                if dropped is not None and self.on_drop:
+                    self.on_drop(dropped)
+        if self.output_ring is not None:
+            self.output_ring.close()
+
+
+def summarize_latencies(values):
+    """Media, p50 y p95 en milisegundos de una secuencia de latencias en segundos"""
+    if len(values) == 0:
+        return {'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'count': 0}
+    arr = np.asarray(values) * 1000.0
+    return {'mean_ms': float(arr.mean()), 'p50_ms': float(np.percentile(arr, 50)),
+            'p95_ms': float(np.percentile(arr, 95)), 'count': len(arr)}
+
+
+class Pipeline(object):
+    """
+    Cadena lineal de etapas [(nombre, fn), ...] conectadas por RingBuffer.
+    La última etapa registra la latencia extremo a extremo desde la captura.
+    on_drop(item) se llama con cada item descartado (p. ej. para devolver sus buffers a un pool).
+    """
+    def __init__(self, stages, capacity=4, on_error=None, history=300, on_drop=None):
+        self.rings = [RingBuffer(capacity) for _ in range(len(stages) - 1)]
+        self.end_to_end = deque(maxlen=history)
+        self.stages = []
+        for i, (name, fn) in enumerate(stages):
+            if i == len(stages) - 1:
+                fn = self._timed_sink(fn)
+            self.stages.append(PipelineStage(
+                name, fn,
+                input_ring=self.rings[i - 1] if i > 0 else None,
+                output_ring=self.rings[i] if i < len(self.rings) else None,
+                on_error=on_error, history=history, on_drop=on_drop))
+
+    def _timed_sink(self, fn):
+        def sink(item):
+            result = fn(item)
+            self.end_to_end.append(time.perf_counter() - item['t_capture'])
+            return result
+        return sink
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self, timeout=None):
+        """Detiene todas las etapas; timeout=None no espera a que terminen los hilos."""
+        for stage in self.stages:
+            stage.stop()
+        for ring in self.rings:
+            ring.close()
+        if timeout is not None:
+            for stage in self.stages:
+                stage.join(timeout)
+
+    def is_alive(self):
+        return any(stage.is_alive() for stage in self.stages)
+
+    def stats(self):
+        """Latencia por etapa, extremo a extremo y elementos descartados por cada buffer"""
+        return {
+            'stages': {stage.stage_name: summarize_latencies(list(stage.latencies)) for stage in self.stages},
+            'end_to_end': summarize_latencies(list(self.end_to_end)),
+            'dropped': {self.stages[i + 1].stage_name: ring.dropped for i, ring in enumerate(self.rings)},
+        }
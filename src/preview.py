@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Vista previa de video desacoplada del pipeline
+El pipeline entrega cada frame procesado con submit(); un hilo propio renderiza
+solo el más reciente, como mucho a max_fps: reduce el frame a la ventana de la GUI,
+dibuja los overlays sobre la versión reducida y convierte a RGB, todo en buffers
+reutilizados. Tk recoge el último render con take(). Mientras la vista no es
+visible (pestaña oculta o ventana minimizada) submit() no retiene nada y no se
+renderiza.
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Tamaño máximo (ancho, alto) del video en la GUI y frecuencia de refresco por defecto
+MAX_SIZE = (500, 400)
+MAX_FPS = 20.0
+
+
+def preview_scale(shape, max_size=MAX_SIZE):
+    """Escala (<= 1) que hace caber un frame de forma shape en max_size (ancho, alto)"""
+    height, width = shape[:2]
+    return min(1.0, max_size[0] / width, max_size[1] / height)
+
+
+class PreviewRenderer(object):
+    """
+    Render del último frame en un hilo propio.
+    Args:
+        draw: draw(imagen_bgr_reducida, escala, datos) dibuja los overlays en el hilo de render
+        max_size: (ancho, alto) máximo de la imagen de salida
+        max_fps: renders por segundo como máximo (frecuencia de refresco de la vista)
+        on_error: on_error(excepción) si falla un render (el hilo sigue)
+        profiler: StageProfiler opcional; el render se registra como etapa 'overlay'
+    """
+    def __init__(self, draw=None, max_size=MAX_SIZE, max_fps=MAX_FPS, on_error=None, profiler=None):
+        self.draw = draw
+        self.max_size = tuple(max_size)
+        self.max_fps = max_fps
+        self.on_error = on_error
+        self.profiler = profiler
+        self.rendered = 0   # Frames renderizados
+        self.skipped = 0    # Frames sustituidos por uno más reciente antes de renderizarse
+        self._active = True
+        self._pending = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._running = False
+        self._thread = None
+        # Triple buffer RGB: el hilo escribe en _back, take() entrega _front y _ready es el último terminado
+        self._small = None
+        self._back = self._ready = self._front = None
+        self._has_new = False
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='preview', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Detiene el hilo y libera el frame pendiente"""
+        with self._wake:
+            self._running = False
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._drop_pending()
+
+    @property
+    def active(self):
+        return self._active
+
+    def set_active(self, active):
+        """Con active=False (vista oculta) se descartan los frames y no se renderiza"""
+        self._active = bool(active)
+        if not self._active:
+            self._drop_pending()
+
+    def submit(self, frame_buf, data=None):
+        """
+        Ofrece un frame (PooledFrame) y los datos de sus overlays. Si la vista está
+        activa toma una referencia propia y sustituye al frame pendiente anterior.
+        Returns:
+            True si el frame se aceptó
+        """
+        if not self._active or not self._running:
+            return False
+        frame_buf.retain()
+        with self._wake:
+            previous, self._pending = self._pending, (frame_buf, data)
+            self._wake.notify()
+        if previous is not None:
+            self.skipped += 1
+            previous[0].release()
+        return True
+
+    def take(self):
+        """Último render RGB si hay uno nuevo desde la llamada anterior, si no None (hilo de Tk)"""
+        with self._lock:
+            if not self._has_new:
+                return None
+            self._has_new = False
+            self._front, self._ready = self._ready, self._front
+            return self._front
+
+    def _drop_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            pending[0].release()
+
+    def _run(self):
+        next_render = 0.0
+        while True:
+            with self._wake:
+                while self._running and self._pending is None:
+                    self._wake.wait()
+                if not self._running:
+                    return
+            # Ritmo de la vista: los frames que lleguen mientras tanto sustituyen al pendiente
+            wait = next_render - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            with self._lock:
+                pending, self._pending = self._pending, None
+            if pending is None:
+                continue
+            next_render = time.perf_counter() + 1.0 / self.max_fps if self.max_fps else 0.0
+            frame_buf, data = pending
+            t_start = time.perf_counter()
+            try:
+                self._render(frame_buf.array, data)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+                continue
+            finally:
+                frame_buf.release()
+            if self.profiler is not None:
+                self.profiler.record('overlay', time.perf_counter() - t_start)
+
+    def _render(self, frame, data):
+        scale = preview_scale(frame.shape, self.max_size)
+        size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+        shape = (size[1], size[0], 3)
+        if self._small is None or self._small.shape != shape:
+            self._small = np.empty(shape, np.uint8)
+            self._back = np.empty(shape, np.uint8)
+        # Copia reducida propia: el frame del pool lo comparten el optimizador y la grabación
+        if scale < 1.0:
+            cv2.resize(frame, size, dst=self._small)
+        elif frame.ndim == 3:
+            np.copyto(self._small, frame)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR, dst=self._small)
+        if self.draw is not None:
+            self.draw(self._small, scale, data)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2RGB, dst=self._back)
+        with self._lock:
+            self._back, self._ready = self._ready, self._back
+            if self._back is None or self._back.shape != shape:
+                self._back = np.empty(shape, np.uint8)
+            self._has_new = True
+        self.rendered += 1
+
+
+if __name__ == "__main__":
+    from src.frame_pool import FramePool
+
+    pool = FramePool(8)
+    drawn = []
+    renderer = PreviewRenderer(draw=lambda image, scale, data: drawn.append((image.shape, scale, data)),
+                               max_fps=50.0)
+    renderer.start()
+    # El pipeline entrega frames 1080p a ~500 FPS: solo se renderizan ~50/s, siempre el último
+    t_start = time.perf_counter()
+    n = 0
+    while time.perf_counter() - t_start < 1.0:
+        frame_buf = pool.acquire((1080, 1920, 3))
+        frame_buf.array[:] = n % 250
+        renderer.submit(frame_buf, n)
+        frame_buf.release()
+        n += 1
+        time.sleep(0.002)
+    time.sleep(0.1)
+    image = renderer.take()
+    assert image is not None and image.shape == (281, 500, 3)
+    assert renderer.take() is None  # Nada nuevo desde la última recogida
+    assert drawn[-1][2] == n - 1 and abs(drawn[-1][1] - 500 / 1920) < 1e-9
+    assert renderer.rendered <= 60 and renderer.rendered + renderer.skipped == n
+    print(f"{n} frames entregados en 1 s: {renderer.rendered} renderizados, {renderer.skipped} sustituidos")
+
+    # Vista oculta: no se retiene ni renderiza nada
+    renderer.set_active(False)
+    rendered = renderer.rendered
+    frame_buf = pool.acquire((1080, 1920, 3))
+    assert not renderer.submit(frame_buf) and frame_buf.refs == 1
+    frame_buf.release()
+    time.sleep(0.05)
+    assert renderer.rendered == rendered
+    renderer.stop()
+    assert pool.stats()['in_use'] == 0, pool.stats()
+    print(f"Pool tras detener: {pool.stats()}")
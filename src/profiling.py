@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Perfilado por etapas del procesamiento
+Cada etapa guarda sus últimas duraciones en un buffer circular NumPy de tamaño
+fijo (sin asignaciones por muestra) y el resumen da media, p50, p95, p99 y
+máximo en milisegundos. snapshot() devuelve un dict serializable a JSON.
+"""
+
+import json
+import platform
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+# Etapas instrumentadas en la GUI, en el orden del recorrido de un frame
+STAGES = (
+    'captura',             # camera.read()
+    'conversion_color',    # BGR -> gris de la ROI
+    'piramide',            # Construcción de la pirámide Laplaciana
+    'filtro_temporal',     # Paso IIR por nivel
+    'reconstruccion',      # Ganancias + colapso de la pirámide + uint8
+    'flujo_optico',        # Farneback sobre la ROI
+    'overlay',             # Vista previa: reducción, ROI magnificado y textos (hilo propio)
+    'grabacion',           # Fila CSV o muestra del grabador binario
+    'conversion_display',  # PhotoImage en Tk
+)
+
+
+class TimingRing(object):
+    """Últimas capacity duraciones (segundos) en un array circular float64"""
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError("La capacidad del buffer debe ser >= 1")
+        self._values = np.zeros(capacity)
+        self._next = 0
+        self.count = 0  # Muestras totales registradas (puede superar capacity)
+
+    @property
+    def capacity(self):
+        return len(self._values)
+
+    def add(self, seconds):
+        self._values[self._next] = seconds
+        self._next = (self._next + 1) % len(self._values)
+        self.count += 1
+
+    def values(self):
+        """Copia de las muestras vigentes (orden no cronológico)"""
+        return self._values[:min(self.count, len(self._values))].copy()
+
+    def last(self):
+        return float(self._values[self._next - 1]) if self.count else 0.0
+
+    def clear(self):
+        self._next = 0
+        self.count = 0
+
+
+def summarize_ring(ring):
+    """Media, percentiles 50/95/99, máximo y última duración en milisegundos"""
+    values = ring.values() * 1000.0
+    if len(values) == 0:
+        return {'count': ring.count, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0,
+                'p99_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'count': ring.count, 'mean_ms': float(values.mean()), 'p50_ms': float(p50),
+            'p95_ms': float(p95), 'p99_ms': float(p99), 'max_ms': float(values.max()),
+            'last_ms': ring.last() * 1000.0}
+
+
+class StageProfiler(object):
+    """
+    Registro de duraciones por etapa, seguro entre hilos.
+    record() es barato (un índice y una asignación bajo lock); el cálculo de
+    percentiles se hace solo al pedir summary() o snapshot().
+    """
+    def __init__(self, capacity=1000, stages=STAGES):
+        self.capacity = capacity
+        self.enabled = True
+        self.started = time.time()
+        self._rings = {name: TimingRing(capacity) for name in stages}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            ring = self._rings.get(stage)
+            if ring is None:
+                ring = self._rings[stage] = TimingRing(self.capacity)
+            ring.add(seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        """with profiler.measure('overlay'): ... registra la duración del bloque"""
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - t_start)
+
+    def reset(self):
+        with self._lock:
+            for ring in self._rings.values():
+                ring.clear()
+            self.started = time.time()
+
+    def summary(self):
+        """{etapa: estadísticas} en el orden de registro de las etapas"""
+        with self._lock:
+            return {name: summarize_ring(ring) for name, ring in self._rings.items()}
+
+    def snapshot(self, extra=None):
+        """Instantánea serializable a JSON (etapas, equipo y datos adicionales)"""
+        data = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'host': platform.node(),
+            'platform': platform.platform(),
+            'window_samples': self.capacity,
+            'elapsed_s': time.time() - self.started,
+            'stages': self.summary(),
+        }
+        if extra:
+            data.update(extra)
+        return data
+
+    def write_json(self, path, extra=None):
+        """Escribe snapshot() en path; devuelve el dict escrito"""
+        data = self.snapshot(extra)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return data
+
+
+if __name__ == "__main__":
+    profiler = StageProfiler(capacity=500)
+    rng = np.random.default_rng(0)
+    for value in rng.exponential(0.004, 2000):
+        profiler.record('piramide', value)
+
+    def cost(n=20000):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            profiler.record('filtro_temporal', 0.001)
+        return (time.perf_counter() - t0) / n * 1e6
+
+    stats = profiler.summary()['piramide']
+    reference = np.percentile(profiler._rings['piramide'].values() * 1000, 99)
+    assert stats['count'] == 2000 and np.isclose(stats['p99_ms'], reference)
+    print(f"piramide: p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms "
+          f"(últimas {profiler.capacity} de {stats['count']})")
+    print(f"Coste de record(): {cost():.2f} µs por muestra")
+    print(json.dumps(profiler.snapshot()['stages']['filtro_temporal']))
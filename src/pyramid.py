@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Pirámide Laplaciana vectorizada con OpenCV
+Alternativa a pyrtools para el motor Magnify: mismas bandas, operaciones en C
+"""
+
+import cv2
+import numpy as np
+
+# Filtro binomial de 5 taps (equivale a pt.binomial_filter(5))
+BINOM5 = np.array([1, 4, 6, 4, 1], dtype=np.float64) / 16.0
+
+# pyrtools usa el binomial escalado por sqrt(2) en cada eje
+PYRTOOLS_GAIN = np.sqrt(2.0)
+
+
+def pyramid_height(shape, filter_size=5):
+    """Número de niveles que genera pt.pyramids.LaplacianPyramid con height='auto'"""
+    rows, cols = shape[:2]
+    height = 1
+    while min(rows, cols) >= filter_size:
+        height += 1
+        rows //= 2
+        cols //= 2
+    return height
+
+
+def upsample(image, out_shape, gain=1.0):
+    """
+    Sobremuestrea x2 insertando ceros y filtra con el binomial separable.
+    Los bordes usan BORDER_REFLECT_101 (equivale a 'reflect1' de pyrtools).
+    """
+    up = np.zeros(out_shape, dtype=image.dtype)
+    up[::2, ::2] = image
+    kernel = BINOM5 * gain
+    return cv2.sepFilter2D(up, -1, kernel, kernel, borderType=cv2.BORDER_REFLECT_101)
+
+
+def build_laplacian_pyramid(image, height=None):
+    """
+    Construye la pirámide Laplaciana de image con cv2.pyrDown.
+    Devuelve una lista de niveles (0 = más fino, el último es el residuo pasa-bajo),
+    numéricamente equivalente a pyr_coeffs[(lev, 0)] de pyrtools.
+    """
+    gauss = np.asarray(image, dtype=np.float64)
+    if height is None:
+        height = pyramid_height(gauss.shape)
+    pyr = []
+    for lev in range(height - 1):
+        # pyrDown normaliza el filtro a suma 1; pyrtools gana x2 por nivel
+        gauss_next = cv2.pyrDown(gauss)
+        gauss_next *= PYRTOOLS_GAIN ** 2
+        pyr.append(gauss - upsample(gauss_next, gauss.shape, PYRTOOLS_GAIN))
+        gauss = gauss_next
+    pyr.append(gauss)
+    return pyr
+
+
+def recon_laplacian_pyramid(pyr):
+    """Equivalente vectorizado de reconPyr (binomial de suma 1 por eje al expandir)"""
+    res = pyr[-1]
+    for band in reversed(pyr[:-1]):
+        res = upsample(res, band.shape) + band
+    return res
+
+
+class LaplacianPyramidBuffers(object):
+    """
+    Pirámide Laplaciana OpenCV con todos los niveles preasignados.
+    build() y recon() escriben en buffers propios, sin asignaciones por frame.
+    Los arrays devueltos se reutilizan en la siguiente llamada.
+    """
+    def __init__(self, shape, dtype=np.float64, height=None):
+        if height is None:
+            height = pyramid_height(shape)
+        shapes = [tuple(shape[:2])]
+        for _ in range(height - 1):
+            rows, cols = shapes[-1]
+            shapes.append(((rows + 1) // 2, (cols + 1) // 2))
+        self.height = height
+        self.shapes = shapes
+        self.dtype = np.dtype(dtype)
+        # Niveles gaussianos 1..height-1 (el nivel 0 es la imagen de entrada)
+        self.gauss = [np.zeros(s, dtype=dtype) for s in shapes[1:]]
+        # El último nivel de la pirámide es el propio residuo gaussiano
+        self.bands = [np.zeros(s, dtype=dtype) for s in shapes[:-1]] + [self.gauss[-1]]
+        self.recon_levels = [np.zeros(s, dtype=dtype) for s in shapes[:-1]]
+        self._zero_inserted = [np.zeros(s, dtype=dtype) for s in shapes[:-1]]
+        self._smoothed = [np.zeros(s, dtype=dtype) for s in shapes[:-1]]
+        self._kernel_build = (BINOM5 * PYRTOOLS_GAIN).astype(dtype)
+        self._kernel_recon = BINOM5.astype(dtype)
+
+    def _upsample(self, image, lev, kernel):
+        """Expande image al tamaño del nivel lev dentro de self._smoothed[lev]"""
+        # Solo se escriben las posiciones pares: el resto del buffer sigue en cero
+        self._zero_inserted[lev][::2, ::2] = image
+        return cv2.sepFilter2D(self._zero_inserted[lev], -1, kernel, kernel,
+                               dst=self._smoothed[lev], borderType=cv2.BORDER_REFLECT_101)
+
+    def build(self, image):
+        """Descompone image (float, mismo dtype) en self.bands y devuelve la lista de niveles"""
+        gauss = image
+        for lev in range(self.height - 1):
+            gauss_next = cv2.pyrDown(gauss, dst=self.gauss[lev])
+            gauss_next *= PYRTOOLS_GAIN ** 2
+            np.subtract(gauss, self._upsample(gauss_next, lev, self._kernel_build),
+                        out=self.bands[lev])
+            gauss = gauss_next
+        return self.bands
+
+    def recon(self, pyr):
+        """Colapsa pyr (misma geometría que build) igual que reconPyr"""
+        res = pyr[-1]
+        for lev in range(self.height - 2, -1, -1):
+            res = np.add(self._upsample(res, lev, self._kernel_recon), pyr[lev],
+                         out=self.recon_levels[lev])
+        return res
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Grabación binaria del historial de vibración
+Las muestras se acumulan en memoria y se escriben por bloques como arrays .npy
+estructurados concatenados en un único archivo (.vibrec), con fsync periódico.
+Un conversor genera el CSV de historiales/ para las herramientas existentes.
+
+Uso del conversor:
+    python -m src.recorder historiales/vibration_recording_20250101_120000.vibrec
+"""
+
+import argparse
+import csv
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+RECORDING_EXTENSION = '.vibrec'
+
+# Columnas de las grabaciones de la GUI (mismas que el CSV)
+COLUMNS = ["frame", "timestamp", "mean_magnitude_px_frame", "mean_signal"]
+CALIBRATED_COLUMNS = ["frame", "timestamp", "mean_magnitude_px_frame",
+                      "velocity_mm_s", "mean_signal", "mm_per_pixel"]
+
+# Formato de timestamp del CSV de historiales
+CSV_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def recording_dtype(columns):
+    """dtype estructurado: 'frame' entero, el resto float64 (timestamp en segundos epoch)"""
+    return np.dtype([(name, np.int64 if name == 'frame' else np.float64) for name in columns])
+
+
+class BinaryRecorder(object):
+    """
+    Grabador por bloques. append() solo copia la muestra al bloque en memoria;
+    cada chunk_size muestras, o al pasar fsync_interval segundos desde el último
+    fsync, se escribe el bloque .npy (aunque esté incompleto) y se fuerza a disco.
+    append() (hilo del pipeline) y close() (hilo de Tk) se serializan con un lock:
+    las muestras que lleguen tras close() se descartan.
+    """
+    def __init__(self, path, columns=COLUMNS, chunk_size=1024, fsync_interval=10.0):
+        self.path = path
+        self.columns = list(columns)
+        self.chunk_size = chunk_size
+        self.fsync_interval = fsync_interval
+        self._chunk = np.zeros(chunk_size, dtype=recording_dtype(self.columns))
+        self._count = 0
+        self._file = open(path, 'wb')
+        self._lock = threading.Lock()
+        self._last_fsync = time.monotonic()
+        self.samples_written = 0
+        self.chunks_written = 0
+
+    def append(self, *values):
+        """
+        Añade una muestra con un valor por columna (timestamp como float epoch).
+        Returns:
+            False si la grabación ya está cerrada (la muestra se descarta)
+        """
+        with self._lock:
+            if self._file is None:
+                return False
+            self._chunk[self._count] = values
+            self._count += 1
+            if self._count == self.chunk_size:
+                self._flush()
+            elif time.monotonic() - self._last_fsync >= self.fsync_interval:
+                # A pocas muestras/s un bloque completo tarda mucho: se escribe el parcial
+                self._flush(sync=True)
+            return True
+
+    def flush(self, sync=False):
+        """Escribe el bloque pendiente; sync=True fuerza el fsync inmediato"""
+        with self._lock:
+            if self._file is not None:
+                self._flush(sync)
+
+    def _flush(self, sync=False):
+        if self._count:
+            np.save(self._file, self._chunk[:self._count], allow_pickle=False)
+            self.samples_written += self._count
+            self.chunks_written += 1
+            self._count = 0
+            self._file.flush()
+        if sync or time.monotonic() - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush(sync=True)
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_recording_chunks(path):
+    """Itera los bloques de una grabación; tolera un último bloque truncado (corte de energía)"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        while f.tell() < size:
+            try:
+                yield np.load(f, allow_pickle=False)
+            except (ValueError, EOFError):
+                break
+
+
+def read_recording(path):
+    """Grabación completa como array estructurado"""
+    chunks = list(iter_recording_chunks(path))
+    if not chunks:
+        return np.zeros(0, dtype=recording_dtype(COLUMNS))
+    return np.concatenate(chunks)
+
+
+def recording_to_csv(path, csv_path=None):
+    """Convierte una grabación .vibrec al CSV de historiales; devuelve la ruta del CSV"""
+    if csv_path is None:
+        csv_path = os.path.splitext(path)[0] + '.csv'
+    with open(csv_path, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        header_written = False
+        for chunk in iter_recording_chunks(path):
+            columns = chunk.dtype.names
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            for row in chunk.tolist():
+                row = list(row)
+                row[1] = datetime.fromtimestamp(row[1]).strftime(CSV_TIMESTAMP_FORMAT)
+                writer.writerow(row)
+        if not header_written:
+            writer.writerow(COLUMNS)
+    return csv_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte grabaciones binarias .vibrec al CSV de historiales")
+    parser.add_argument('recordings', nargs='+', help="Archivos .vibrec")
+    parser.add_argument('--output', help="CSV de salida (solo con una grabación)")
+    args = parser.parse_args()
+    if args.output and len(args.recordings) > 1:
+        parser.error("--output solo admite una grabación")
+    for path in args.recordings:
+        csv_path = recording_to_csv(path, args.output)
+        print(f"{path} -> {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
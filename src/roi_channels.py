@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Canales de análisis por ROI
+Cada ROI monitorizada tiene su propio motor Magnify, buffer de señal, espectro
+incremental y archivos de grabación. La conversión a gris se hace una sola vez
+por frame para todas las ROIs (roi_grays): sobre el rectángulo que las engloba
+si es compacto, o ROI a ROI si están muy separadas.
+"""
+
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+from src.spectrum import SlidingSpectrum
+
+# Área máxima del rectángulo englobante, relativa a la suma de áreas de las ROIs,
+# para convertir a gris de una vez en lugar de ROI a ROI
+MAX_UNION_RATIO = 2.0
+
+
+class ClipCapture(object):
+    """
+    Clip de entradas del motor para el optimizador alpha/lambda. El hilo de cálculo
+    copia el motor justo antes de procesar el primer frame del clip, así que el clip
+    se reproduce desde el mismo estado IIR con el que se procesó; done se activa al
+    completar n_frames.
+    """
+    def __init__(self, n_frames):
+        self.n_frames = n_frames
+        self.engine = None
+        self.frames = []
+        self.done = threading.Event()
+
+
+class RoiChannel(object):
+    """Estado de una ROI: motor, señal, espectro, clip del optimizador y grabación propios"""
+    def __init__(self, name, roi, engine, buffer_size=300, clip_frames=30, tracker=None):
+        self.name = name
+        self.roi = tuple(int(v) for v in roi)
+        self.engine = engine
+        self.tracker = tracker  # SparseTracker del método 'flujo_sparse' (opcional)
+        self.signal_buffer = deque(maxlen=buffer_size)
+        self.spectrum = SlidingSpectrum(buffer_size)
+        # Clip pedido por el optimizador (ClipCapture) y brillo medio de las entradas (auto-ajuste de fl/fh)
+        self.clip_frames = clip_frames
+        self._clip_capture = None
+        self.roi_mean_buffer = deque(maxlen=buffer_size)
+        self.prev_out = None  # Última salida magnificada (referencia del flujo óptico)
+        self.csv_file = None
+        self.csv_writer = None
+        self.recorder = None
+
+    def request_clip(self, n_frames=None):
+        """Pide un clip de los próximos n_frames (por defecto clip_frames) con la copia del motor previa"""
+        capture = ClipCapture(n_frames or self.clip_frames)
+        self._clip_capture = capture
+        return capture
+
+    def record_input(self, gray):
+        """
+        Registra la entrada del motor. Se llama en el hilo de cálculo justo antes de
+        engine.Magnify(gray), sin otro Magnify del canal en curso: la copia del motor es coherente.
+        """
+        self.roi_mean_buffer.append(float(np.mean(gray)))
+        capture = self._clip_capture
+        if capture is None:
+            return
+        if capture.engine is None:
+            capture.engine = self.engine.clone()
+        # Copia: gray puede ser una vista del gris compartido
+        capture.frames.append(gray.copy())
+        if len(capture.frames) >= capture.n_frames:
+            self._clip_capture = None
+            capture.done.set()
+
+    def push_sample(self, value):
+        self.signal_buffer.append(value)
+        self.spectrum.push(value)
+
+    def reset_signal(self):
+        self.signal_buffer.clear()
+        self.spectrum.reset()
+        self.roi_mean_buffer.clear()
+        self.prev_out = None
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    def close_recording(self):
+        """Cierra CSV y grabador binario; devuelve el grabador cerrado (o None)"""
+        if self.csv_file:
+            self.csv_file.close()
+        self.csv_file = None
+        self.csv_writer = None
+        recorder, self.recorder = self.recorder, None
+        if recorder:
+            recorder.close()
+        return recorder
+
+
+def union_bbox(rois):
+    """Rectángulo (x, y, w, h) que engloba todas las ROIs"""
+    x0 = min(x for x, _, _, _ in rois)
+    y0 = min(y for _, y, _, _ in rois)
+    x1 = max(x + w for x, _, w, _ in rois)
+    y1 = max(y + h for _, y, _, h in rois)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _to_gray(image):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+
+def roi_grays(frame, rois, max_union_ratio=MAX_UNION_RATIO):
+    """
+    Una imagen en gris por ROI (alineadas con rois) con una sola conversión de color
+    por píxel y frame.
+    Si el rectángulo englobante no supera max_union_ratio veces la suma de áreas se
+    convierte una vez y cada ROI es una vista de ese resultado (solo lectura).
+    """
+    if not rois:
+        return []
+    ux, uy, uw, uh = union_bbox(rois)
+    if uw * uh > max_union_ratio * sum(w * h for _, _, w, h in rois):
+        return [_to_gray(frame[y:y+h, x:x+w]) for x, y, w, h in rois]
+    gray = _to_gray(frame[uy:uy+uh, ux:ux+uw])
+    return [gray[y-uy:y-uy+h, x-ux:x-ux+w] for x, y, w, h in rois]
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(720, 1280, 3), dtype=np.uint8)
+    rois = [(100 + 130 * i, 200, 120, 160) for i in range(6)]
+    shared = roi_grays(frame, rois)
+    separate = [cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY) for x, y, w, h in rois]
+    assert all(np.array_equal(a, b) for a, b in zip(shared, separate))
+    far = roi_grays(frame, [(0, 0, 50, 50), (1200, 600, 50, 50)])
+    assert far[1].shape == (50, 50) and np.array_equal(far[1], _to_gray(frame[600:650, 1200:1250]))
+
+    n = 300
+    t0 = time.perf_counter()
+    for _ in range(n):
+        roi_grays(frame, rois)
+    t_shared = (time.perf_counter() - t0) / n * 1000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        # Camino anterior: gris de cada ROI para Magnify y otra vez para el flujo óptico
+        for x, y, w, h in rois + rois:
+            cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY)
+    t_separate = (time.perf_counter() - t0) / n * 1000
+    print(f"{len(rois)} ROIs: gris compartido {t_shared:.3f} ms/frame vs {t_separate:.3f} ms/frame por ROI y tarea")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Flujo óptico disperso (Lucas-Kanade piramidal) para el método 'flujo_sparse'
+En lugar del flujo denso Farneback de toda la ROI se siguen unas decenas de
+esquinas (goodFeaturesToTrack, re-detectadas periódicamente o cuando se pierden
+puntos). El resultado es el desplazamiento medio con signo por eje (px/frame),
+descartando los puntos cuyo desplazamiento se aleja de la mediana.
+"""
+
+import cv2
+import numpy as np
+
+# Parámetros por defecto (processing_settings.sparse_flow_params en config.json)
+DEFAULT_PARAMS = {
+    'max_corners': 60,
+    'quality_level': 0.01,
+    'min_distance': 5,
+    'redetect_interval': 30,
+    'min_points': 8,
+    'win_size': 15,
+    'max_level': 2,
+    'outlier_k': 3.0,
+}
+
+# Dispersión mínima (px) para el rechazo de outliers: evita descartar todo con movimiento casi nulo
+MIN_SPREAD = 0.05
+
+
+def reject_outliers(displacements, k=3.0):
+    """
+    Máscara de inliers de un array (N, 2) de desplazamientos: puntos a menos de k
+    desviaciones robustas (MAD escalada) de la mediana en ambos ejes.
+    """
+    median = np.median(displacements, axis=0)
+    deviation = np.abs(displacements - median)
+    spread = np.maximum(1.4826 * np.median(deviation, axis=0), MIN_SPREAD)
+    return np.all(deviation <= k * spread, axis=1)
+
+
+class SparseTracker(object):
+    """
+    Seguimiento Lucas-Kanade de esquinas de una ROI entre frames consecutivos.
+    Guarda los puntos del frame anterior: update() se llama una vez por frame y
+    en orden (un tracker por ROI).
+    """
+    def __init__(self, max_corners=60, quality_level=0.01, min_distance=5, redetect_interval=30,
+                 min_points=8, win_size=15, max_level=2, outlier_k=3.0):
+        self.max_corners = max_corners
+        self.quality_level = quality_level
+        self.min_distance = min_distance
+        self.redetect_interval = redetect_interval
+        self.min_points = min_points
+        self.win_size = (win_size, win_size)
+        self.max_level = max_level
+        self.outlier_k = outlier_k
+        self.criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        self.tracked = 0  # Puntos aceptados en el último frame
+        self.reset()
+
+    def reset(self):
+        self._points = None
+        self._age = 0
+
+    def detect(self, gray):
+        """Detecta nuevas esquinas en gray (reinicia el contador de re-detección)"""
+        self._points = cv2.goodFeaturesToTrack(gray, self.max_corners, self.quality_level,
+                                               self.min_distance, blockSize=7)
+        self._age = 0
+
+    def update(self, prev_gray, gray):
+        """
+        Desplazamiento medio con signo de prev_gray a gray.
+        Returns:
+            (dx, dy) en px/frame; (0.0, 0.0) si no hay puntos que seguir
+        """
+        if prev_gray is None or prev_gray.shape != gray.shape:
+            self.reset()
+            return 0.0, 0.0
+        if (self._points is None or len(self._points) < self.min_points
+                or self._age >= self.redetect_interval):
+            self.detect(prev_gray)
+            if self._points is None:
+                self.tracked = 0
+                return 0.0, 0.0
+        points, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, self._points, None,
+                                                     winSize=self.win_size, maxLevel=self.max_level,
+                                                     criteria=self.criteria)
+        h, w = gray.shape[:2]
+        new = points.reshape(-1, 2)
+        ok = ((status.ravel() == 1) & (new[:, 0] >= 0) & (new[:, 0] < w)
+              & (new[:, 1] >= 0) & (new[:, 1] < h))
+        if not ok.any():
+            self.reset()
+            self.tracked = 0
+            return 0.0, 0.0
+        displacements = (new - self._points.reshape(-1, 2))[ok]
+        inliers = reject_outliers(displacements, self.outlier_k)
+        # Solo los inliers siguen al frame siguiente
+        self._points = points[ok][inliers]
+        self._age += 1
+        self.tracked = int(inliers.sum())
+        dx, dy = displacements[inliers].mean(axis=0)
+        return float(dx), float(dy)
+
+
+if __name__ == "__main__":
+    import time
+    from src.sources import vibration_texture, shifted_texture
+    from src.utils import vibration_sample
+
+    fs, freq, amplitude = 30.0, 4.0, 0.5
+    rng = np.random.default_rng(0)
+    for shape in ((120, 160), (240, 320), (480, 640)):
+        texture, margin = vibration_texture(shape, amplitude, seed=0)
+        frames = [shifted_texture(texture, margin, shape, amplitude * np.sin(2 * np.pi * freq * i / fs))
+                  for i in range(150)]
+        tracker = SparseTracker(**DEFAULT_PARAMS)
+        t0 = time.perf_counter()
+        dx = [tracker.update(prev, cur)[0] for prev, cur in zip(frames[:-1], frames[1:])]
+        t_sparse = (time.perf_counter() - t0) / (len(frames) - 1) * 1000
+        params = {'pyr_scale': 0.5, 'levels': 3, 'winsize': 15, 'iterations': 3,
+                  'poly_n': 5, 'poly_sigma': 1.2, 'flags': 0}
+        t0 = time.perf_counter()
+        for prev, cur in zip(frames[:-1], frames[1:]):
+            vibration_sample(prev, cur, params)
+        t_dense = (time.perf_counter() - t0) / (len(frames) - 1) * 1000
+        # Velocidad esperada (px/frame) = derivada discreta del desplazamiento inyectado
+        positions = amplitude * np.sin(2 * np.pi * freq * np.arange(150) / fs)
+        error = np.max(np.abs(np.array(dx) - np.diff(positions)))
+        print(f"{shape[0]}x{shape[1]}: LK {t_sparse:.2f} ms/frame ({tracker.tracked} puntos) vs "
+              f"Farneback {t_dense:.2f} ms/frame ({t_dense / t_sparse:.0f}x); error máx {error:.3f} px/frame")
+        assert error < 0.05
+
+    # Puntos espurios: el rechazo de outliers debe descartarlos
+    cloud = np.vstack([rng.normal([0.3, -0.1], 0.01, (40, 2)), [[5.0, 5.0], [-4.0, 0.0]]])
+    mask = reject_outliers(cloud)
+    assert mask[:40].all() and not mask[40:].any()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Espectro incremental para la gráfica FFT en vivo
+DFT deslizante sobre las últimas N muestras: cada muestra nueva actualiza los
+bins en O(N) en lugar de recalcular la FFT completa en cada refresco.
+"""
+
+import threading
+
+import numpy as np
+
+
+class SlidingSpectrum(object):
+    """
+    DFT deslizante (rfft) de una ventana de las últimas `window` muestras.
+    Mientras la ventana se llena el espectro se calcula directamente con la
+    longitud actual, igual que np.fft.rfft sobre el buffer de señal.
+    """
+    def __init__(self, window, resync_interval=None):
+        if window < 2:
+            raise ValueError("La ventana del espectro debe tener al menos 2 muestras")
+        self.window = window
+        # Recalcular la DFT exacta cada resync_interval muestras para acotar el error acumulado
+        self.resync_interval = resync_interval or window
+        self._samples = np.zeros(window, dtype=np.float64)
+        self._bins = np.zeros(window // 2 + 1, dtype=np.complex128)
+        self._twiddle = np.exp(2j * np.pi * np.arange(window // 2 + 1) / window)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._samples[:] = 0
+            self._bins[:] = 0
+            self._head = 0  # Posición de la muestra más antigua
+            self._count = 0
+            self._since_resync = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def full(self):
+        return self._count == self.window
+
+    def _ordered_samples(self):
+        return np.roll(self._samples, -self._head)
+
+    def push(self, value):
+        """Añade una muestra y actualiza el espectro de la ventana"""
+        with self._lock:
+            if self._count < self.window:
+                self._samples[self._count] = value
+                self._count += 1
+                if self._count == self.window:
+                    self._bins[:] = np.fft.rfft(self._samples)
+                return
+            oldest = self._samples[self._head]
+            self._samples[self._head] = value
+            self._head = (self._head + 1) % self.window
+            # X_k <- (X_k - x_antigua + x_nueva) * e^{j2πk/N}
+            self._bins += value - oldest
+            self._bins *= self._twiddle
+            self._since_resync += 1
+            if self._since_resync >= self.resync_interval:
+                self._bins[:] = np.fft.rfft(self._ordered_samples())
+                self._since_resync = 0
+
+    def magnitude(self, fs=1.0):
+        """
+        (freqs, |rfft|) de la señal sin media (el bin 0 vale 0); freqs en Hz para fs.
+        Devuelve copias; longitud len(self) // 2 + 1.
+        """
+        with self._lock:
+            n = max(self._count, 1)
+            if self._count < self.window:
+                segment = self._samples[:n]
+                fft_vals = np.abs(np.fft.rfft(segment - segment.mean()))
+            else:
+                fft_vals = np.abs(self._bins)
+                # Restar la media solo afecta al bin de continua
+                fft_vals[0] = 0.0
+        return np.fft.rfftfreq(n, d=1.0 / fs), fft_vals
+
+
+class HighpassWeights(object):
+    """
+    Respuesta en magnitud de un Butterworth pasa-alta aplicado con filtfilt (|H|^2),
+    evaluada en los bins del espectro. Se recalcula solo si cambian corte, fs o número de bins.
+    """
+    def __init__(self, order=2):
+        self.order = order
+        self._key = None
+        self._weights = None
+
+    def weights(self, freqs, cutoff, fs):
+        """Pesos para los bins freqs (Hz), o None si el corte no es válido"""
+        key = (cutoff, fs, len(freqs), float(freqs[-1]))
+        if key != self._key:
+            self._key = key
+            wn = cutoff / (0.5 * fs)
+            if 0 < wn < 1.0:
+                from scipy.signal import butter, freqz
+                b, a = butter(self.order, wn, btype='high')
+                _, response = freqz(b, a, worN=freqs, fs=fs)
+                self._weights = np.abs(response) ** 2
+            else:
+                self._weights = None
+        return self._weights
+
+    def apply(self, freqs, fft_vals, cutoff, fs):
+        """Devuelve fft_vals filtrado (en sitio) o sin cambios si el corte no es válido"""
+        weights = self.weights(freqs, cutoff, fs)
+        if weights is not None:
+            fft_vals *= weights
+        return fft_vals
+
+
+if __name__ == "__main__":
+    import time
+
+    fs = 30.0
+    n = 300
+    t = np.arange(5000) / fs
+    rng = np.random.default_rng(0)
+    signal_data = 2.0 + np.sin(2 * np.pi * 4.0 * t) + 0.3 * rng.standard_normal(len(t))
+
+    spectrum = SlidingSpectrum(n)
+    max_err = 0.0
+    for i, value in enumerate(signal_data):
+        spectrum.push(value)
+        if i % 97 == 0 or i == len(signal_data) - 1:
+            window = signal_data[max(0, i + 1 - n):i + 1]
+            expected = np.abs(np.fft.rfft(window - window.mean()))
+            max_err = max(max_err, np.max(np.abs(spectrum.magnitude(fs)[1] - expected)))
+    print(f"Error máximo frente a rfft: {max_err:.2e}")
+    assert max_err < 1e-9
+
+    # Coste por muestra (DFT deslizante) frente a rfft completa por refresco, ventana de minutos
+    big = 30 * 60 * 5  # 5 minutos a 30 FPS
+    spectrum = SlidingSpectrum(big)
+    for value in rng.standard_normal(big):
+        spectrum.push(value)
+    t0 = time.perf_counter()
+    for value in rng.standard_normal(1000):
+        spectrum.push(value)
+    push_us = (time.perf_counter() - t0) / 1000 * 1e6
+    buf = rng.standard_normal(big)
+    t0 = time.perf_counter()
+    for _ in range(100):
+        np.abs(np.fft.rfft(np.array(list(buf)) - buf.mean()))
+    full_us = (time.perf_counter() - t0) / 100 * 1e6
+    print(f"Ventana {big}: push {push_us:.0f} us/muestra | rfft completa {full_us:.0f} us/refresco")
+
+    # Pasa-alta en frecuencia frente a butter + filtfilt
+    try:
+        from scipy.signal import butter, filtfilt
+        hp = HighpassWeights()
+        window = signal_data[-n:] - signal_data[-n:].mean()
+        b, a = butter(2, 0.5 / (0.5 * fs), btype='high')
+        ref = np.abs(np.fft.rfft(filtfilt(b, a, window)))
+        approx = hp.apply(np.fft.rfftfreq(n, d=1.0 / fs), np.abs(np.fft.rfft(window)), 0.5, fs)
+        peak_ref = np.argmax(ref[1:]) + 1
+        peak_approx = np.argmax(approx[1:]) + 1
+        print(f"Pico filtfilt: {peak_ref * fs / n:.2f} Hz | pico incremental: {peak_approx * fs / n:.2f} Hz")
+        assert peak_ref == peak_approx
+    except ImportError:
+        print("scipy no disponible: se omite la comparación del pasa-alta")
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Banco de filtros temporales paso banda sobre la pirámide apilada
+En lugar de filtrar nivel a nivel en un bucle de Python, los niveles amplificables
+de la pirámide viven en un único array contiguo y cada frame se filtra con unas
+pocas operaciones vectorizadas sobre todo él:
+    'butterworth', 'chebyshev'   IIR paso banda en secciones de segundo orden (SOS,
+                                 forma directa II transpuesta), orden configurable
+    'ventana'                    FIR paso banda ideal enventanado (firwin), con un
+                                 buffer circular de los últimos frames
+'primer_orden' es el filtro original de Magnify (diferencia de dos paso bajo de
+primer orden por nivel) y no usa este módulo.
+La banda [fl, fh] está en Hz reales y debe quedar por debajo de Nyquist (fs/2).
+"""
+
+import numpy as np
+import scipy.signal as signal
+
+# Tipos de filtro temporal ('processing_settings.temporal_filter' en config.json)
+TEMPORAL_FILTERS = ('primer_orden', 'butterworth', 'chebyshev', 'ventana')
+
+# Rizado en la banda de paso del Chebyshev tipo I (dB)
+CHEBYSHEV_RIPPLE_DB = 0.5
+
+
+def design_bandpass(kind, order, fl, fh, fs, taps=31):
+    """
+    Coeficientes del paso banda [fl, fh] Hz a fs: matriz SOS (n, 6) para los IIR o
+    vector de coeficientes FIR para 'ventana'.
+    Raises:
+        ValueError si el tipo o la banda no son válidos
+    """
+    if not 0 < fl < fh < fs / 2:
+        raise ValueError(f"Banda no válida para el filtro {kind}: fl={fl}, fh={fh} (Nyquist {fs / 2:g} Hz)")
+    if kind == 'butterworth':
+        return signal.butter(order, [fl, fh], btype='bandpass', fs=fs, output='sos')
+    if kind == 'chebyshev':
+        return signal.cheby1(order, CHEBYSHEV_RIPPLE_DB, [fl, fh], btype='bandpass', fs=fs, output='sos')
+    if kind == 'ventana':
+        return signal.firwin(taps | 1, [fl, fh], pass_zero=False, fs=fs, window='hamming')
+    raise ValueError(f"Filtro temporal desconocido: {kind}")
+
+
+class TemporalFilterBank(object):
+    """
+    Filtro paso banda temporal de un conjunto de arrays (niveles de pirámide) apilados
+    en un array contiguo. Cada frame se escribe en input (o en sus vistas por nivel),
+    step() deja el resultado en output.
+    Args:
+        shapes: forma de cada nivel
+        kind, order, taps: tipo, orden IIR (el paso banda tiene 2*order polos) y coeficientes FIR
+        dtype: precisión de estado y salida
+    """
+    def __init__(self, shapes, kind, order, fl, fh, fs, dtype=np.float64, taps=31):
+        self.shapes = [tuple(shape) for shape in shapes]
+        sizes = [int(np.prod(shape)) for shape in self.shapes]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(int)
+        self.size = int(self.offsets[-1])
+        self.kind = kind
+        self.order = order
+        self.taps = taps
+        self.fs = fs
+        self.dtype = np.dtype(dtype)
+        self.input = np.zeros(self.size, dtype=self.dtype)
+        self.output = np.zeros(self.size, dtype=self.dtype)
+        self._scratch = np.zeros(self.size, dtype=self.dtype)
+        self.set_band(fl, fh)
+        if kind == 'ventana':
+            # Buffer circular de los últimos frames (una fila por coeficiente)
+            self._history = np.zeros((len(self._coeffs), self.size), dtype=self.dtype)
+            self._pos = 0
+        else:
+            # Estado z por sección (forma directa II transpuesta)
+            self._state = np.zeros((len(self._coeffs), 2, self.size), dtype=self.dtype)
+            self._section_out = np.zeros(self.size, dtype=self.dtype)
+            self._product = np.zeros(self.size, dtype=self.dtype)
+
+    def views(self, array):
+        """Vistas por nivel (con su forma) de un array apilado (input u output)"""
+        return [array[start:end].reshape(shape)
+                for start, end, shape in zip(self.offsets[:-1], self.offsets[1:], self.shapes)]
+
+    def set_band(self, fl, fh):
+        """Cambia la banda conservando el estado (sin transitorio de arranque). ValueError: no cambia nada"""
+        coeffs = design_bandpass(self.kind, self.order, fl, fh, self.fs, self.taps)
+        if self.kind == 'ventana':
+            self._coeffs = coeffs.astype(self.dtype)
+            # Invertidos: el último se aplica al frame más reciente
+            self._reversed = self._coeffs[::-1].copy()
+        else:
+            # Normalizados por a0 (1 en las SOS de scipy): b0, b1, b2, a1, a2 por sección
+            self._coeffs = [tuple(float(v) for v in section[[0, 1, 2, 4, 5]]) for section in coeffs]
+            self._sos = coeffs
+        self.fl = fl
+        self.fh = fh
+
+    def reset(self, value=None):
+        """Estado estacionario para una entrada constante value (por defecto input): salida nula"""
+        value = self.input if value is None else value
+        if self.kind == 'ventana':
+            self._history[:] = value
+            self._pos = 0
+        else:
+            zi = signal.sosfilt_zi(self._sos)
+            # sosfilt_zi es el estado para un escalón unidad a la entrada de la primera sección
+            self._state[:] = zi[:, :, None] * value
+        self.output.fill(0)
+
+    def step(self):
+        """Filtra un frame: lee input y escribe output (en el sitio, sin asignaciones)"""
+        if self.kind == 'ventana':
+            pos, n = self._pos, len(self._coeffs)
+            self._history[pos] = self.input
+            # Coeficiente k para el frame de hace k pasos: fila (pos - k) del buffer circular.
+            # Filas 0..pos (pos frames atrás hasta el actual) y pos+1.. (los más antiguos)
+            np.dot(self._reversed[n - 1 - pos:], self._history[:pos + 1], out=self.output)
+            if pos < n - 1:
+                self.output += np.dot(self._reversed[:n - 1 - pos], self._history[pos + 1:], out=self._scratch)
+            self._pos = (pos + 1) % n
+            return self.output
+        x = self.input
+        scratch, product = self._scratch, self._product
+        n_sections = len(self._coeffs)
+        for i, (b0, b1, b2, a1, a2) in enumerate(self._coeffs):
+            z0, z1 = self._state[i]
+            y = self.output if i == n_sections - 1 else (self._section_out if i % 2 == 0 else scratch)
+            if y is x:
+                y = self._section_out
+            # y = b0*x + z0;  z0 = b1*x - a1*y + z1;  z1 = b2*x - a2*y
+            np.multiply(x, b0, out=y)
+            y += z0
+            np.multiply(x, b1, out=z0)
+            z0 += z1
+            z0 -= np.multiply(y, a1, out=product)
+            np.multiply(x, b2, out=z1)
+            z1 -= np.multiply(y, a2, out=product)
+            x = y
+        return self.output
+
+
+if __name__ == "__main__":
+    import time
+
+    from src.magnify import Magnify
+    from src.pyramid import LaplacianPyramidBuffers
+
+    fs = 30.0
+    rng = np.random.default_rng(0)
+    # Equivalencia con scipy.signal.sosfilt y lfilter (FIR) sobre varias series a la vez
+    shapes = [(30, 40), (15, 20), (8, 10)]
+    series = rng.normal(0, 1, (200, sum(int(np.prod(s)) for s in shapes)))
+    for kind in TEMPORAL_FILTERS[1:]:
+        bank = TemporalFilterBank(shapes, kind, 2, 2.0, 6.0, fs)
+        out = []
+        for frame in series:
+            bank.input[:] = frame
+            out.append(bank.step().copy())
+        coeffs = design_bandpass(kind, 2, 2.0, 6.0, fs)
+        ref = (signal.lfilter(coeffs, [1.0], series, axis=0) if kind == 'ventana'
+               else signal.sosfilt(coeffs, series, axis=0))
+        error = np.max(np.abs(np.array(out) - ref))
+        assert error < 1e-10, (kind, error)
+    print("Banco apilado equivalente a scipy (sosfilt / lfilter) en los tres tipos")
+
+    # step() sin asignar buffers por frame: ni del tamaño del banco ni del vector de coeficientes FIR
+    import tracemalloc
+    for kind in TEMPORAL_FILTERS[1:]:
+        bank = TemporalFilterBank(shapes, kind, 2, 2.0, 6.0, fs, taps=301)
+        bank.step()
+        tracemalloc.start()
+        for _ in range(50):
+            bank.step()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        limit = len(bank._coeffs) if kind == 'ventana' else bank.size
+        assert peak < limit * bank.dtype.itemsize, (kind, peak)
+    print("step() sin asignar buffers por frame en los tres tipos")
+
+    # Selectividad: ganancia a la frecuencia de giro (4 Hz) frente a armónicos cercanos
+    t = np.arange(600) / fs
+    print(f"{'filtro':>13} | ganancia 4 Hz | 2 Hz (fuera) | 8 Hz (fuera)")
+    for kind, order in (('butterworth', 1), ('butterworth', 3), ('chebyshev', 3), ('ventana', 2)):
+        gains = []
+        for freq in (4.0, 2.0, 8.0):
+            bank = TemporalFilterBank([(1,)], kind, order, 3.0, 5.0, fs, taps=61)
+            out = []
+            for value in np.sin(2 * np.pi * freq * t):
+                bank.input[0] = value
+                out.append(bank.step()[0])
+            gains.append(np.std(out[300:]) / np.std(np.sin(2 * np.pi * freq * t[300:])))
+        print(f"{kind + ' ' + str(order):>13} | {gains[0]:13.2f} | {gains[1]:12.3f} | {gains[2]:12.3f}")
+
+    # Motores con el banco apilado: el clon es independiente y la banda cambia en caliente
+    from src.riesz import RieszMagnify
+    base = rng.integers(0, 256, size=(120, 160)).astype(np.float64)
+    frames = [np.clip(base + 20 * np.sin(2 * np.pi * 4.0 * i / fs), 0, 255).astype(np.uint8) for i in range(60)]
+    for engine_cls in (Magnify, RieszMagnify):
+        engine = engine_cls(frames[0], 50, 80, 3.0, 5.0, fs, pyramid_backend='opencv',
+                            temporal_filter='butterworth', filter_order=3)
+        for frame in frames[:30]:
+            engine.Magnify(frame)
+        twin = engine.clone()
+        assert all(np.array_equal(engine.Magnify(f), twin.Magnify(f)) for f in frames[30:40])
+        assert all(np.shares_memory(engine.filtered[u], engine.temporal.output) for u in engine._stacked_levels)
+        assert not np.shares_memory(twin.temporal.output, engine.temporal.output)
+        engine.set_params(fl=2.0, fh=6.0)
+        assert (engine.temporal.fl, engine.temporal.fh) == (2.0, 6.0)
+        try:
+            engine.set_params(fh=fs / 2)
+            raise AssertionError("Banda por encima de Nyquist aceptada")
+        except ValueError:
+            assert engine.fh == 6.0
+        engine.Magnify(frames[40])
+    print("Magnify y RieszMagnify con banco apilado: clon independiente y cambio de banda en caliente")
+
+    # Coste por frame: bucle por nivel de Magnify frente al banco apilado, misma pirámide
+    shape = (480, 640)
+    frame = rng.integers(0, 256, size=shape).astype(np.float64) / 255
+    pyramid = LaplacianPyramidBuffers(shape)
+    levels = [level.copy() for level in pyramid.build(frame)]
+    engine = Magnify(levels[0], 200, 80, 0.5, 9, fs, pyramid_backend='opencv')
+    active = list(range(1, len(levels) - 1))
+    n = 200
+    t0 = time.perf_counter()
+    for _ in range(n):
+        for u in active:
+            scratch = engine._scratch[u]
+            engine._iir_step(engine.lowpass1[u], levels[u], engine.pyr_prev[u], engine._high_coeffs, scratch)
+            engine._iir_step(engine.lowpass2[u], levels[u], engine.pyr_prev[u], engine._low_coeffs, scratch)
+            np.copyto(engine.pyr_prev[u], levels[u])
+            np.subtract(engine.lowpass1[u], engine.lowpass2[u], out=engine.filtered[u])
+    t_loop = (time.perf_counter() - t0) / n * 1000
+    for kind, order in (('butterworth', 1), ('butterworth', 2), ('chebyshev', 3)):
+        bank = TemporalFilterBank([levels[u].shape for u in active], kind, order, 1.0, 9.0, fs)
+        inputs = bank.views(bank.input)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            for view, u in zip(inputs, active):
+                np.copyto(view, levels[u])
+            bank.step()
+        t_bank = (time.perf_counter() - t0) / n * 1000
+        print(f"{shape[0]}x{shape[1]}: primer orden por nivel {t_loop:.2f} ms vs {kind} orden {order} "
+              f"apilado {t_bank:.2f} ms ({len(bank._coeffs)} secciones, {bank.size} muestras)")
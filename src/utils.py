@@ -7,6 +7,7 @@ Funciones auxiliares y configuración
 import json
 import os
 import logging
+from collections import deque
 from datetime import datetime
 
 def load_config(config_file='config.json'):
@@ -20,17 +21,36 @@ def load_config(config_file='config.json'):
             "fl": 0.07,
             "fh": 3.0,
             "buffer_size": 300,
-            "auto_tune_duration": 5
+            "auto_tune_duration": 5,
+            "frame_source": "",
+            "source_rate": None,
+            "source_loop": True,
+            "sparse_flow_axis": "y",
+            "capture_mode": "",
+            "capture_roi_window": False,
+            "capture_roi_padding": 32
         },
         "gui_settings": {
             "window_width": 1200,
             "window_height": 800,
             "graph_update_interval": 100,
-            "console_max_lines": 1000
+            "fast_plotting": True,
+            "console_max_lines": 1000,
+            "preview_fps": 20
         },
         "processing_settings": {
             "roi_min_size": 50,
             "gaussian_blur_kernel": [5, 5],
+            "pyramid_backend": "pyrtools",
+            "magnification_engine": "lineal",
+            "precision": "float64",
+            "temporal_filter": "primer_orden",
+            "temporal_filter_order": 2,
+            "temporal_filter_taps": 31,
+            "optimizer_clip_frames": 30,
+            "max_rois": 8,
+            "profiling_window": 1000,
+            "frame_pool_size": None,
             "optical_flow_params": {
                 "pyr_scale": 0.5,
                 "levels": 3,
@@ -39,12 +59,25 @@ def load_config(config_file='config.json'):
                 "poly_n": 5,
                 "poly_sigma": 1.2,
                 "flags": 0
+            },
+            "sparse_flow_params": {
+                "max_corners": 60,
+                "quality_level": 0.01,
+                "min_distance": 5,
+                "redetect_interval": 30,
+                "min_points": 8,
+                "win_size": 15,
+                "max_level": 2,
+                "outlier_k": 3.0
             }
         },
         "file_settings": {
             "csv_output_dir": "historiales",
             "csv_filename_format": "vibration_history_%Y%m%d_%H%M%S.csv",
-            "auto_save": True
+            "auto_save": True,
+            "recording_format": "csv",
+            "recording_chunk_size": 1024,
+            "recording_fsync_interval": 10.0
         }
     }
     
@@ -147,6 +180,22 @@ def get_available_cameras(max_cameras=10):
     
     return available_cameras
 
+def vibration_sample(prev_gray, gray, flow_params):
+    """
+    Muestra de vibración de un frame magnificado del ROI.
+    Returns:
+        (mean_magnitude, mean_signal): magnitud media del flujo óptico Farneback respecto
+        al frame anterior (0 si no hay) y brillo medio del ROI
+    """
+    import cv2
+    import numpy as np
+    
+    mean_magnitude = 0.0
+    if prev_gray is not None and prev_gray.shape == gray.shape:
+        flow = cv2.calcOpticalFlowFarneback(prev_gray, gray, None, **flow_params)
+        mean_magnitude = float(np.mean(cv2.magnitude(flow[..., 0], flow[..., 1])))
+    return mean_magnitude, float(np.mean(gray))
+
 def calculate_memory_usage():
     """Calcular uso de memoria de la aplicación"""
     try:
@@ -186,23 +235,19 @@ class PerformanceMonitor:
     
     def __init__(self):
         self.start_time = datetime.now()
-        self.frame_times = []
-        self.processing_times = []
+        # Solo los últimos 100 valores (deque acotado: sin pop(0) O(n))
+        self.frame_times = deque(maxlen=100)
+        self.processing_times = deque(maxlen=100)
+        self.total_frames = 0
         
     def record_frame_time(self, frame_time):
         """Registrar tiempo de procesamiento de frame"""
         self.frame_times.append(frame_time)
-        
-        # Mantener solo los últimos 100 frames
-        if len(self.frame_times) > 100:
-            self.frame_times.pop(0)
+        self.total_frames += 1
     
     def record_processing_time(self, processing_time):
         """Registrar tiempo de procesamiento general"""
         self.processing_times.append(processing_time)
-        
-        if len(self.processing_times) > 100:
-            self.processing_times.pop(0)
     
     def get_average_fps(self):
         """Obtener FPS promedio"""
@@ -217,7 +262,7 @@ class PerformanceMonitor:
         return {
             'uptime': (datetime.now() - self.start_time).total_seconds(),
             'avg_fps': self.get_average_fps(),
-            'total_frames': len(self.frame_times),
+            'total_frames': self.total_frames,
             'avg_processing_time': sum(self.processing_times) / len(self.processing_times) if self.processing_times else 0
         }
 
@@ -1,11 +1,13 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-import csv
 import os
 
+from src.long_signal import load_column, welch_amplitude, highpass_blocks, filtered_path
+from src.decimation import MinMaxPyramid
+
 class VibrationAnalyzerApp:
     def __init__(self, root):
         self.root = root
@@ -14,6 +16,7 @@ class VibrationAnalyzerApp:
         
         self.file_path = None
         self.signal_data = None
+        self.plot_pyramid = None
         
         self.create_widgets()
         
@@ -55,6 +58,13 @@ class VibrationAnalyzerApp:
         self.column_var = tk.StringVar(value="2")
         ttk.Entry(param_frame, textvariable=self.column_var, width=10).grid(row=1, column=3, sticky=tk.W, padx=5, pady=5)
         
+        # Welch segment length (frequency resolution = 1 / segment)
+        ttk.Label(param_frame, text="Welch Segment (s):").grid(row=2, column=0, sticky=tk.W, padx=5, pady=5)
+        self.segment_var = tk.StringVar(value="60")
+        ttk.Entry(param_frame, textvariable=self.segment_var, width=10).grid(row=2, column=1, sticky=tk.W, padx=5, pady=5)
+        ttk.Label(param_frame, text="(longer = finer resolution, noisier)").grid(
+            row=2, column=2, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        
         # NEW: Low Frequency Filter
         filter_frame = ttk.LabelFrame(main_frame, text="Frequency Filtering", padding="10")
         filter_frame.pack(fill=tk.X, pady=5)
@@ -80,6 +90,10 @@ class VibrationAnalyzerApp:
         self.fig, (self.ax1, self.ax2) = plt.subplots(2, 1, figsize=(8, 6))
         self.canvas = FigureCanvasTkAgg(self.fig, master=main_frame)
         self.canvas.draw()
+        # Zoom/pan toolbar: the time plot is re-decimated for each visible range
+        toolbar = NavigationToolbar2Tk(self.canvas, main_frame, pack_toolbar=False)
+        toolbar.update()
+        toolbar.pack(side=tk.BOTTOM, fill=tk.X)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, pady=10)
         
         # Status bar
@@ -98,6 +112,20 @@ class VibrationAnalyzerApp:
             self.file_label.config(text=os.path.basename(file_path))
             self.status_var.set(f"File loaded: {os.path.basename(file_path)}")
     
+    def update_time_plot(self):
+        """Redraw the time-domain line for the visible range from the min/max pyramid"""
+        x_min, x_max = self.ax1.get_xlim()
+        start = (x_min - self.plot_t0) * self.plot_fs
+        stop = (x_max - self.plot_t0) * self.plot_fs
+        n_pixels = max(100, int(self.ax1.bbox.width))
+        idx, values = self.plot_pyramid.query(start, stop + 1, n_pixels)
+        self.time_line.set_data(idx / self.plot_fs + self.plot_t0, values)
+    
+    def on_time_xlim_changed(self, ax):
+        if self.plot_pyramid is not None:
+            self.update_time_plot()
+            self.canvas.draw_idle()
+    
     def analyze_signal(self):
         if not self.file_path:
             messagebox.showerror("Error", "Please select a file first.")
@@ -109,6 +137,7 @@ class VibrationAnalyzerApp:
             cutoff_time = float(self.cutoff_var.get())
             max_freq = float(self.max_freq_var.get())
             column_idx = int(self.column_var.get())
+            segment_time = float(self.segment_var.get())
             
             # Get filter parameters
             highpass_enabled = self.highpass_enabled.get()
@@ -122,15 +151,12 @@ class VibrationAnalyzerApp:
                     messagebox.showerror("Error", "Invalid high-pass cutoff frequency.")
                     return
             
-            # Load data
-            with open(self.file_path, newline='') as f:
-                reader = csv.reader(f)
-                data = list(reader)
-            
-            # Extract signal
+            # Load data: chunked CSV parse on first use, memory-mapped sidecar cache afterwards
+            self.status_var.set("Loading data...")
+            self.root.update_idletasks()
             try:
-                signal_array = np.array([float(row[column_idx]) for row in data[1:]])
-            except (IndexError, ValueError):
+                signal_array = load_column(self.file_path, column_idx)
+            except ValueError:
                 messagebox.showerror("Error", f"Could not read column {column_idx} from the data file.")
                 return
                 
@@ -141,34 +167,21 @@ class VibrationAnalyzerApp:
                 return
                 
             signal_array_cortada = signal_array[muestras_corte:]
-            N = len(signal_array_cortada)
             
-            # FFT calculation
-            X = np.fft.fft(signal_array_cortada)
+            # Welch-averaged rfft amplitude spectrum, streamed in blocks
+            # (bins below the high-pass cutoff are zeroed)
+            nperseg = max(2, int(segment_time * fs))
+            f_plot, X_mag_plot = welch_amplitude(
+                signal_array_cortada, fs, nperseg,
+                highpass_cutoff=highpass_cutoff if highpass_enabled else None)
             
-            # Apply high-pass filter if enabled
+            # Filtered time domain signal: block-wise Butterworth high-pass,
+            # written block by block to a memory-mapped sidecar next to the CSV
             if highpass_enabled:
-                # Calculate the bin index corresponding to the cutoff frequency
-                bin_cutoff = int(np.ceil(highpass_cutoff * N / fs))
-                
-                # Zero out frequencies below the cutoff (and corresponding negative frequencies)
-                if bin_cutoff > 0:
-                    X[:bin_cutoff] = 0
-                    X[N-bin_cutoff+1:] = 0  # Symmetric negative frequencies
-                    
+                self.plot_pyramid = None  # Release the previous sidecar before overwriting it
+                signal_filtered = highpass_blocks(signal_array_cortada, fs, highpass_cutoff,
+                                                  out_path=filtered_path(self.file_path, column_idx))
                 self.status_var.set(f"Analysis complete with high-pass filter at {highpass_cutoff} Hz")
-            
-            # Calculate magnitude spectrum
-            X_mag = np.abs(X) / N
-            X_mag_plot = 2 * X_mag[:N//2+1]
-            X_mag_plot[0] = X_mag_plot[0] / 2  # Correct DC component
-            
-            # Frequency axis
-            f_plot = np.linspace(0, fs/2, N//2+1)
-            
-            # Reconstruct filtered time domain signal if needed
-            if highpass_enabled:
-                signal_filtered = np.real(np.fft.ifft(X))
             else:
                 signal_filtered = signal_array_cortada
             
@@ -176,12 +189,18 @@ class VibrationAnalyzerApp:
             self.ax1.clear()
             self.ax2.clear()
             
-            # Plot time domain
-            self.ax1.plot(
-                np.arange(len(signal_filtered)) / fs + cutoff_time,
-                signal_filtered,
-                'b'
-            )
+            # Plot time domain: min/max envelope at screen resolution, refreshed on zoom/pan
+            self.plot_pyramid = MinMaxPyramid(signal_filtered)
+            self.plot_fs = fs
+            self.plot_t0 = cutoff_time
+            self.time_line, = self.ax1.plot([], [], 'b')
+            self.ax1.set_xlim(cutoff_time, cutoff_time + len(signal_filtered) / fs)
+            self.update_time_plot()
+            # The full-range envelope holds the exact global min/max
+            y_env = self.time_line.get_ydata()
+            y_pad = (np.max(y_env) - np.min(y_env)) * 0.05 or 1
+            self.ax1.set_ylim(np.min(y_env) - y_pad, np.max(y_env) + y_pad)
+            self.ax1.callbacks.connect('xlim_changed', self.on_time_xlim_changed)
             title_suffix = " (High-pass Filtered)" if highpass_enabled else " (after cut-off)"
             self.ax1.set_title('Signal' + title_suffix)
             self.ax1.set_ylabel('Amplitude')
@@ -190,7 +209,7 @@ class VibrationAnalyzerApp:
             
             # Plot frequency domain
             self.ax2.plot(f_plot, X_mag_plot, 'r')
-            self.ax2.set_title('FFT Magnitude' + title_suffix)
+            self.ax2.set_title('FFT Magnitude (Welch)' + title_suffix)
             self.ax2.set_ylabel('Magnitude')
             self.ax2.set_xlabel('Frequency (Hz)')
             self.ax2.set_xlim(-0.1, max_freq)  # Configurable max frequency display